@@ -0,0 +1,37 @@
+"""Add denormalized item_count to tag
+
+Revision ID: 8b1f3c2a9d4e
+Revises: 2d5247c9791d
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1f3c2a9d4e'
+down_revision = '2d5247c9791d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tag') as batch_op:
+        batch_op.add_column(
+            sa.Column('item_count', sa.Integer(), nullable=False, server_default='0')
+        )
+        batch_op.create_index(batch_op.f('ix_tag_item_count'), ['item_count'], unique=False)
+
+    # Backfill counts for tags that already have items
+    op.execute(
+        "UPDATE tag SET item_count = "
+        "(SELECT COUNT(*) FROM itemtag WHERE itemtag.tag_id = tag.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('tag') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tag_item_count'))
+        batch_op.drop_column('item_count')
@@ -1,17 +1,20 @@
+import functools
+import ipaddress
 from collections.abc import Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlmodel import Session, SQLModel
 
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
-from app.models import TokenPayload, User
+from app.core.rate_limit import rate_limiter
+from app.models import ItemPublic, TagPublic, TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -55,3 +58,86 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+class FieldSelector:
+    """
+    Parse a comma separated `fields` query parameter against a response model.
+
+    Resolves to None when the parameter is not sent, so routes keep returning
+    complete objects by default.
+    """
+
+    def __init__(self, model: type[SQLModel]) -> None:
+        self.allowed = list(model.model_fields)
+
+    def __call__(self, fields: str | None = None) -> list[str] | None:
+        if fields is None:
+            return None
+        selected = list(
+            dict.fromkeys(name.strip() for name in fields.split(",") if name.strip())
+        )
+        unknown = [name for name in selected if name not in self.allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        if not selected:
+            raise HTTPException(status_code=400, detail="No fields selected")
+        return selected
+
+
+ItemFieldsDep = Annotated[list[str] | None, Depends(FieldSelector(ItemPublic))]
+TagFieldsDep = Annotated[list[str] | None, Depends(FieldSelector(TagPublic))]
+
+
+@functools.lru_cache
+def trusted_networks(
+    proxies: tuple[str, ...],
+) -> list[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+    return [ipaddress.ip_network(proxy, strict=False) for proxy in proxies]
+
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        ip in network for network in trusted_networks(tuple(settings.TRUSTED_PROXIES))
+    )
+
+
+def client_ip(request: Request) -> str:
+    """
+    Address of the client, behind trusted proxies the one they forwarded for.
+    """
+    host = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(host):
+        return host
+    forwarded = request.headers.get("x-forwarded-for", "")
+    addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+    # Each proxy appends the address it got the request from, anything left
+    # of the last one our proxies didn't send could be made up by the client
+    for address in reversed(addresses):
+        if not is_trusted_proxy(address):
+            return address
+    return addresses[0] if addresses else host
+
+
+def rate_limit(scope: str, key: str, *, limit: int, count: bool = True) -> None:
+    """
+    Reject with 429 once key went over limit in the window, else count this
+    request unless count is False, e.g. to only count failures.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    wait = rate_limiter.check(scope, key, limit=limit)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(wait)},
+        )
+    if count:
+        rate_limiter.hit(scope, key)
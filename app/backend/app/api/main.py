@@ -1,6 +1,17 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, tags, users, utils
+from app.api.routes import (
+    emails,
+    health,
+    items,
+    login,
+    media,
+    private,
+    tags,
+    users,
+    utils,
+    videos,
+)
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -9,6 +20,10 @@ api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(items.router)
 api_router.include_router(tags.router)
+api_router.include_router(videos.router)
+api_router.include_router(media.router)
+api_router.include_router(emails.router)
+api_router.include_router(health.router)
 
 
 if settings.ENVIRONMENT == "local":
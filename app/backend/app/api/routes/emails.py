@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.core.config import settings
+from app.email_batches import count_recipients, email_batch_sender
+from app.models import EmailBatch, EmailBatchCreate, EmailBatchPublic
+from app.utils import email_template_exists
+
+router = APIRouter(
+    prefix="/emails",
+    tags=["emails"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.post("/batches", response_model=EmailBatchPublic, status_code=202)
+def create_email_batch(
+    session: SessionDep, current_user: CurrentUser, batch_in: EmailBatchCreate
+) -> EmailBatch:
+    """
+    Email every user matching `recipients` with a built template.
+
+    Sending happens in the background, poll the returned batch for progress.
+    """
+    if not settings.emails_enabled:
+        raise HTTPException(status_code=503, detail="Emails are not configured")
+    if not email_template_exists(batch_in.template_name):
+        raise HTTPException(status_code=400, detail="Unknown email template")
+
+    batch = EmailBatch(
+        template_name=batch_in.template_name,
+        subject=batch_in.subject,
+        context=batch_in.context,
+        recipients=batch_in.recipients.model_dump(mode="json"),
+        total=count_recipients(session, batch_in.recipients),
+        created_by_id=current_user.id,
+    )
+    session.add(batch)
+    session.commit()
+    session.refresh(batch)
+    email_batch_sender.start(batch.id)
+    return batch
+
+
+@router.get("/batches/{batch_id}", response_model=EmailBatchPublic)
+def read_email_batch(session: SessionDep, batch_id: str) -> EmailBatch:
+    """
+    Get the progress of a batch email.
+    """
+    batch = session.get(EmailBatch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Email batch not found")
+    return batch
@@ -0,0 +1,32 @@
+from typing import Any
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.health import readiness
+from app.models import HealthReport, Message
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live", response_model=Message)
+async def liveness() -> Any:
+    """
+    The worker is up and its event loop is responding.
+    """
+    return Message(message="OK")
+
+
+@router.get(
+    "/ready",
+    response_model=HealthReport,
+    responses={503: {"model": HealthReport}},
+)
+def readiness_check() -> Any:
+    """
+    Whether the worker should get traffic, 503 while warming up or saturated.
+    """
+    report = readiness.get()
+    if report.status != "ok":
+        return JSONResponse(status_code=503, content=report.model_dump())
+    return report
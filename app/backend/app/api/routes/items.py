@@ -2,47 +2,92 @@ import uuid
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select, desc
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlmodel import func, select
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app.api.deps import CurrentUser, ItemFieldsDep, SessionDep
+from app.models import (
+    Item,
+    ItemBatchEntry,
+    ItemCreate,
+    ItemPublic,
+    ItemsBatchGet,
+    ItemsBatchPublic,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    fields: ItemFieldsDep,
+    skip: int = 0,
+    limit: int = 100,
 ) -> Any:
     """
     Retrieve items.
+
+    Pass `fields` (e.g. `fields=id,title,image_url`) to only select and return
+    those fields.
     """
+    owner_id = None if current_user.is_superuser else current_user.id
+    count_statement = select(func.count()).select_from(Item)
+    if owner_id is not None:
+        count_statement = count_statement.where(Item.owner_id == owner_id)
+    count = session.exec(count_statement).one()
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).order_by(desc(Item.created_at)).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
+    if fields is not None:
+        rows_statement = crud.filter_items(
+            crud.select_item_fields(fields), owner_id=owner_id, skip=skip, limit=limit
         )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .order_by(desc(Item.created_at))
-            .offset(skip)
-            .limit(limit)
+        rows = crud.get_item_rows(
+            session=session, statement=rows_statement, fields=fields
         )
-        items = session.exec(statement).all()
+        return JSONResponse(content=jsonable_encoder({"data": rows, "count": count}))
 
+    statement = crud.filter_items(
+        select(Item), owner_id=owner_id, skip=skip, limit=limit
+    )
+    items = session.exec(statement).all()
     return ItemsPublic(data=items, count=count)
 
 
+@router.post("/batch-get", response_model=ItemsBatchPublic)
+def read_items_batch(
+    session: SessionDep, current_user: CurrentUser, batch_in: ItemsBatchGet
+) -> Any:
+    """
+    Get several items by ID in one request.
+
+    Each requested ID gets an entry with status "ok", "not_found" or "forbidden".
+    """
+    ids = list(dict.fromkeys(batch_in.ids))
+    items = {
+        item.id: item for item in crud.get_items_by_ids(session=session, ids=ids)
+    }
+    entries = []
+    for item_id in ids:
+        item = items.get(item_id)
+        if not item:
+            entries.append(ItemBatchEntry(id=item_id, status="not_found"))
+        elif not current_user.is_superuser and (item.owner_id != current_user.id):
+            entries.append(ItemBatchEntry(id=item_id, status="forbidden"))
+        else:
+            entries.append(
+                ItemBatchEntry(
+                    id=item_id, status="ok", item=ItemPublic.model_validate(item)
+                )
+            )
+    return ItemsBatchPublic(data=entries, count=len(entries))
+
+
 @router.get("/{id}", response_model=ItemPublic)
 def read_item(session: SessionDep, current_user: CurrentUser, id: str) -> Any:
     """
@@ -99,6 +144,5 @@ def delete_item(
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
+    crud.delete_item(session=session, db_item=item)
     return Message(message="Item deleted successfully")
@@ -1,40 +1,79 @@
 from datetime import timedelta
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import Session
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    CurrentUser,
+    SessionDep,
+    client_ip,
+    get_current_active_superuser,
+    rate_limit,
+)
 from app.core import security
 from app.core.config import settings
+from app.core.db import engine
+from app.core.rate_limit import rate_limiter
 from app.core.security import get_password_hash
+from app.email_queue import email_queue
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
-    send_email,
     verify_password_reset_token,
 )
 
 router = APIRouter(tags=["login"])
 
 
+def upgrade_password_hash(user_id: str, password: str, hashed_password: str) -> None:
+    with Session(engine) as session:
+        crud.upgrade_password_hash(
+            session=session,
+            user_id=user_id,
+            password=password,
+            hashed_password=hashed_password,
+        )
+
+
 @router.post("/login/access-token")
 def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: SessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
+    ip = client_ip(request)
+    email = form_data.username.lower()
+    # Only failed attempts are counted, they are recorded below
+    rate_limit("login_ip", ip, limit=settings.RATE_LIMIT_LOGIN_PER_IP, count=False)
+    rate_limit(
+        "login_email", email, limit=settings.RATE_LIMIT_LOGIN_PER_EMAIL, count=False
+    )
     user = crud.authenticate(
         session=session, email=form_data.username, password=form_data.password
     )
     if not user:
+        if settings.RATE_LIMIT_ENABLED:
+            rate_limiter.hit("login_ip", ip)
+            rate_limiter.hit("login_email", email)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if settings.RATE_LIMIT_ENABLED:
+        rate_limiter.reset("login_email", email)
+    if security.password_needs_update(user.hashed_password):
+        # Rehashed after the response is sent, the login doesn't wait for it
+        background_tasks.add_task(
+            upgrade_password_hash, user.id, form_data.password, user.hashed_password
+        )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return Token(
         access_token=security.create_access_token(
@@ -52,10 +91,16 @@ def test_token(current_user: CurrentUser) -> Any:
 
 
 @router.post("/password-recovery/{email}")
-def recover_password(email: str, session: SessionDep) -> Message:
+def recover_password(email: str, request: Request, session: SessionDep) -> Message:
     """
     Password Recovery
     """
+    rate_limit(
+        "recovery_ip", client_ip(request), limit=settings.RATE_LIMIT_RECOVERY_PER_IP
+    )
+    rate_limit(
+        "recovery_email", email.lower(), limit=settings.RATE_LIMIT_RECOVERY_PER_EMAIL
+    )
     user = crud.get_user_by_email(session=session, email=email)
 
     if not user:
@@ -67,7 +112,7 @@ def recover_password(email: str, session: SessionDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    email_queue.enqueue(
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
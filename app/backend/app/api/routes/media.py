@@ -0,0 +1,143 @@
+import uuid
+from typing import Literal
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+
+from app import images, media, storage
+from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
+from app.core.ranges import RangeFileResponse
+from app.models import Item
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+# Only finished media is public, never upload parts or cached variants
+PUBLIC_MEDIA_PREFIXES = ("videos/", "thumbnails/", "images/")
+
+
+# HEAD is left out of the schema, it would repeat the GET operation's id
+@router.head(
+    "/files/{key:path}", response_class=RangeFileResponse, include_in_schema=False
+)
+@router.get("/files/{key:path}", status_code=200, response_class=RangeFileResponse)
+def read_media_file(key: str) -> Response:
+    """
+    Get an uploaded media file, such as an item's `video_url` or
+    `video_thumbnail_url`.
+
+    Supports `Range` requests for seeking, and revalidation with
+    `If-None-Match` or `If-Modified-Since`. Files kept in remote storage are
+    redirected to a short-lived presigned URL.
+    """
+    if not key.startswith(PUBLIC_MEDIA_PREFIXES):
+        raise HTTPException(status_code=404, detail="File not found")
+    backend = storage.get_storage()
+    try:
+        path = backend.local_path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if path is None:
+        if not backend.exists(key):
+            raise HTTPException(status_code=404, detail="File not found")
+        return RedirectResponse(backend.presign(key), status_code=307)
+    try:
+        stat_result = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    return RangeFileResponse(
+        path,
+        stat_result=stat_result,
+        # Keys are never reused for different content
+        headers={"Cache-Control": "public, max-age=604800"},
+    )
+
+
+@router.put("/files/{key:path}", status_code=204)
+async def upload_media_file(
+    request: Request,
+    key: str,
+    token: str,
+    content_type: str | None = Header(default=None),
+) -> Response:
+    """
+    Upload a file to a presigned upload URL, when media is stored locally.
+
+    The body is streamed to disk, it must match the size and type the URL
+    was signed for.
+    """
+    claims = storage.verify_upload_token(token, key)
+    if claims is None:
+        raise HTTPException(status_code=403, detail="Invalid or expired upload token")
+    if claims["content_type"] and content_type != claims["content_type"]:
+        raise HTTPException(
+            status_code=400, detail="Content-Type does not match the upload"
+        )
+    length = claims["content_length"]
+    upload_id = str(uuid.uuid4())
+    media.create_upload_part(upload_id)
+    try:
+        try:
+            offset = await media.append_upload_chunk(
+                upload_id,
+                offset=0,
+                length=int(length or settings.MEDIA_MAX_VIDEO_SIZE),
+                chunks=request.stream(),
+            )
+        except media.UploadTooLarge:
+            raise HTTPException(status_code=413, detail="File is too large")
+        if length is not None and offset != length:
+            raise HTTPException(
+                status_code=400, detail="Body does not match the upload size"
+            )
+        await run_in_threadpool(
+            storage.get_storage().put_file,
+            key,
+            media.upload_part_path(upload_id),
+            content_type=content_type,
+        )
+    finally:
+        media.delete_upload_part(upload_id)
+    return Response(status_code=204)
+
+
+@router.get("/{item_id}/image", response_class=FileResponse)
+def read_item_image(
+    session: SessionDep,
+    current_user: CurrentUser,
+    item_id: str,
+    w: int | None = Query(default=None, ge=1, le=2048),
+    h: int | None = Query(default=None, ge=1, le=2048),
+    fmt: Literal["webp", "jpeg", "png"] = "webp",
+) -> FileResponse:
+    """
+    Get the item's image resized to fit within `w` x `h`, in format `fmt`.
+
+    Variants are generated on first request and cached on disk.
+    """
+    item = session.get(Item, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    if not item.image_url:
+        raise HTTPException(status_code=404, detail="Item has no image")
+    if not images.images_enabled():
+        raise HTTPException(status_code=501, detail="Image resizing is not installed")
+
+    try:
+        path = images.get_image_variant(
+            images.get_image_cache(), item.image_url, width=w, height=h, fmt=fmt
+        )
+    except images.ImageUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    _, media_type = images.IMAGE_FORMATS[fmt]
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers={"Cache-Control": "private, max-age=86400"},
+    )
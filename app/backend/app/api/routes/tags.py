@@ -1,36 +1,66 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import CurrentUser, ItemFieldsDep, SessionDep, TagFieldsDep
 from app.crud import (
     create_tag,
     delete_tag,
+    get_item_rows_by_tag,
+    get_items_by_tag,
+    get_popular_tags,
     get_tag,
+    get_tag_rows,
     get_tags,
     update_tag,
-    get_items_by_tag,
 )
-from app.models import Tag, TagCreate, TagPublic, TagsPublic, TagUpdate, Item, ItemPublic, ItemsPublic, Message, ItemTag
+from app.models import (
+    ItemsPublic,
+    Message,
+    Tag,
+    TagCreate,
+    TagPublic,
+    TagsPublic,
+    TagUpdate,
+)
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
 
 @router.get("/", response_model=TagsPublic)
 def read_tags(
-    session: SessionDep, skip: int = 0, limit: int = 100
+    session: SessionDep, fields: TagFieldsDep, skip: int = 0, limit: int = 100
 ) -> Any:
     """
     Retrieve all tags.
+
+    Pass `fields` (e.g. `fields=id,name,color`) to only select and return
+    those fields.
     """
     count_statement = select(func.count()).select_from(Tag)
     count = session.exec(count_statement).one()
+    if fields is not None:
+        rows = get_tag_rows(session=session, fields=fields, skip=skip, limit=limit)
+        return JSONResponse(content=jsonable_encoder({"data": rows, "count": count}))
     tags = get_tags(session=session, skip=skip, limit=limit)
     return TagsPublic(data=tags, count=count)
 
 
+@router.get("/popular", response_model=TagsPublic)
+def read_popular_tags(
+    session: SessionDep, limit: int = Query(20, ge=1, le=100)
+) -> Any:
+    """
+    Retrieve the most used tags, ordered by item count.
+    """
+    tags = get_popular_tags(session=session, limit=limit)
+    return TagsPublic(data=tags, count=len(tags))
+
+
 @router.get("/{tag_id}", response_model=TagPublic)
 def read_tag(session: SessionDep, tag_id: str) -> Any:
     """
@@ -107,25 +137,30 @@ def delete_existing_tag(
 
 @router.get("/{tag_id}/items", response_model=ItemsPublic)
 def read_items_by_tag(
-    session: SessionDep, tag_id: str, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    tag_id: str,
+    fields: ItemFieldsDep,
+    skip: int = 0,
+    limit: int = 100,
 ) -> Any:
     """
     Get all items tagged with a specific tag.
+
+    Pass `fields` to only select and return those item fields.
     """
     tag = get_tag(session=session, tag_id=tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     
+    if fields is not None:
+        rows = get_item_rows_by_tag(
+            session=session, tag_id=tag_id, fields=fields, skip=skip, limit=limit
+        )
+        return JSONResponse(
+            content=jsonable_encoder({"data": rows, "count": tag.item_count})
+        )
+
     items = get_items_by_tag(session=session, tag_id=tag_id, skip=skip, limit=limit)
     
-    # Count total items for this tag
-    count_statement = (
-        select(func.count())
-        .select_from(Item)
-        .join(ItemTag)
-        .where(ItemTag.item_id == Item.id)
-        .where(ItemTag.tag_id == tag_id)
-    )
-    count = session.exec(count_statement).one()
-    
-    return ItemsPublic(data=items, count=count)
+    # Total items for this tag come from the denormalized counter
+    return ItemsPublic(data=items, count=tag.item_count)
@@ -1,18 +1,20 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel import func, select
 
 from app import crud
 from app.api.deps import (
     CurrentUser,
     SessionDep,
+    client_ip,
     get_current_active_superuser,
+    rate_limit,
 )
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
+from app.email_queue import email_queue
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
@@ -23,7 +25,7 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -66,7 +68,7 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        email_queue.enqueue(
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -133,16 +135,18 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
+    crud.delete_items_by_owner(session=session, owner_id=current_user.id)
     session.delete(current_user)
     session.commit()
     return Message(message="User deleted successfully")
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+def register_user(request: Request, session: SessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
+    rate_limit("signup_ip", client_ip(request), limit=settings.RATE_LIMIT_SIGNUP_PER_IP)
     user = crud.get_user_by_email(session=session, email=user_in.email)
     if user:
         raise HTTPException(
@@ -218,8 +222,7 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
+    crud.delete_items_by_owner(session=session, owner_id=user_id)
     session.delete(user)
     session.commit()
     return Message(message="User deleted successfully")
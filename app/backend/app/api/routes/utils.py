@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
-from app.models import Message
-from app.utils import generate_test_email, send_email
+from app.core.config import settings
+from app.email_queue import email_queue
+from app.models import Message, ProfileStart, ProfileStatus
+from app.profiler import profiler
+from app.utils import generate_test_email
+from app.warmup import warmup
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -18,7 +23,7 @@ def test_email(email_to: EmailStr) -> Message:
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    email_queue.enqueue(
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -28,4 +33,68 @@ def test_email(email_to: EmailStr) -> Message:
 
 @router.get("/health-check/")
 async def health_check() -> bool:
+    """
+    Fails until the worker's warmup is done.
+    """
+    if settings.WARMUP_ENABLED and not warmup.done.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
     return True
+
+
+def profiler_enabled() -> None:
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+
+
+profile_dependencies = [
+    Depends(get_current_active_superuser),
+    Depends(profiler_enabled),
+]
+
+
+@router.post("/profile/", dependencies=profile_dependencies, status_code=201)
+def start_profile(profile_in: ProfileStart) -> ProfileStatus:
+    """
+    Profile a share of the requests, or every request to a route, in every worker.
+    """
+    profiler.start(
+        percent=profile_in.percent,
+        route=profile_in.route,
+        duration=profile_in.duration_seconds,
+    )
+    return profiler.status()
+
+
+@router.get("/profile/status/", dependencies=profile_dependencies)
+def profile_status() -> ProfileStatus:
+    """
+    Status of the profile, with the requests and samples of every worker.
+    """
+    return profiler.status()
+
+
+@router.get(
+    "/profile/",
+    dependencies=profile_dependencies,
+    response_class=PlainTextResponse,
+)
+def download_profile() -> PlainTextResponse:
+    """
+    The stacks sampled by every worker, in the collapsed format of flame graph
+    tools.
+    """
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{profiler.profile_id}.folded"'
+        },
+    )
+
+
+@router.delete("/profile/", dependencies=profile_dependencies)
+def stop_profile() -> ProfileStatus:
+    """
+    Stop profiling, the stacks stay available for download.
+    """
+    profiler.stop()
+    return profiler.status()
@@ -0,0 +1,261 @@
+import base64
+import binascii
+import datetime
+import uuid
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app import crud, media, storage
+from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
+from app.models import (
+    Item,
+    ItemPublic,
+    ItemUpdate,
+    User,
+    VideoAttach,
+    VideoPresignPublic,
+    VideoPresignRequest,
+    VideoUpload,
+)
+from app.thumbnails import thumbnail_queue
+
+router = APIRouter(prefix="/items", tags=["videos"])
+
+TUS_VERSION = "1.0.0"
+TUS_HEADERS = {"Tus-Resumable": TUS_VERSION}
+
+
+def parse_upload_metadata(value: str | None) -> dict[str, str]:
+    """
+    Parse a tus Upload-Metadata header: comma separated "key base64(value)" pairs.
+    """
+    metadata: dict[str, str] = {}
+    if not value:
+        return metadata
+    for pair in value.split(","):
+        key, _, encoded = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(encoded, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Invalid Upload-Metadata")
+    return metadata
+
+
+def get_owned_item(session: SessionDep, current_user: User, id: str) -> Item:
+    item = session.get(Item, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return item
+
+
+def attach_video(session: SessionDep, item: Item, key: str) -> None:
+    """
+    Point the item's video_url at a stored video and queue its thumbnail.
+    """
+    crud.update_item(
+        session=session,
+        db_item=item,
+        item_in=ItemUpdate(video_url=media.media_url(key)),
+    )
+    if settings.THUMBNAILS_ENABLED:
+        thumbnail_queue.enqueue(item.id, key)
+
+
+def get_upload(session: SessionDep, item: Item, upload_id: str) -> VideoUpload:
+    upload = session.get(VideoUpload, upload_id)
+    if not upload or upload.item_id != item.id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+@router.post("/{id}/video", status_code=201)
+def create_video_upload(
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: str,
+    upload_length: int = Header(ge=1),
+    upload_metadata: str | None = Header(default=None),
+) -> Response:
+    """
+    Start a resumable video upload for an item.
+
+    Send the total size in `Upload-Length`, and optionally `filename` and
+    `filetype` in `Upload-Metadata`. Chunks are then sent with PATCH to the
+    URL returned in `Location`.
+    """
+    item = get_owned_item(session, current_user, id)
+    if upload_length > settings.MEDIA_MAX_VIDEO_SIZE:
+        raise HTTPException(status_code=413, detail="Video is too large")
+    metadata = parse_upload_metadata(upload_metadata)
+    content_type = metadata.get("filetype")
+    if content_type and not content_type.startswith("video/"):
+        raise HTTPException(status_code=415, detail="Only videos can be uploaded")
+
+    upload = VideoUpload(
+        item_id=item.id,
+        length=upload_length,
+        filename=metadata.get("filename", "")[:255] or None,
+        content_type=content_type,
+    )
+    session.add(upload)
+    session.commit()
+    media.create_upload_part(upload.id)
+
+    return Response(
+        status_code=201,
+        headers={
+            **TUS_HEADERS,
+            "Location": f"{settings.API_V1_STR}/items/{item.id}/video/{upload.id}",
+            "Upload-Offset": "0",
+        },
+    )
+
+
+@router.post("/{id}/video/presign", response_model=VideoPresignPublic)
+def presign_video_upload(
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: str,
+    upload_in: VideoPresignRequest,
+) -> VideoPresignPublic:
+    """
+    Get a URL to upload an item's video directly to storage.
+
+    PUT the video to `upload_url` with the returned `headers`, then attach it
+    with POST /items/{id}/video/attach and the returned `key`. With S3 storage
+    the bytes never pass through the API.
+    """
+    item = get_owned_item(session, current_user, id)
+    if upload_in.length > settings.MEDIA_MAX_VIDEO_SIZE:
+        raise HTTPException(status_code=413, detail="Video is too large")
+    if not upload_in.content_type.startswith("video/"):
+        raise HTTPException(status_code=415, detail="Only videos can be uploaded")
+
+    extension = media.guess_extension(upload_in.filename, upload_in.content_type)
+    key = f"videos/{item.id}/{uuid.uuid4()}{extension}"
+    upload_url = storage.get_storage().presign(
+        key,
+        method="PUT",
+        content_type=upload_in.content_type,
+        content_length=upload_in.length,
+    )
+    return VideoPresignPublic(
+        key=key,
+        upload_url=upload_url,
+        headers={"Content-Type": upload_in.content_type},
+        expires_in=settings.STORAGE_PRESIGN_EXPIRE_SECONDS,
+    )
+
+
+@router.post("/{id}/video/attach", response_model=ItemPublic)
+def attach_uploaded_video(
+    session: SessionDep, current_user: CurrentUser, id: str, attach_in: VideoAttach
+) -> Item:
+    """
+    Attach a video uploaded to a presigned URL to its item.
+    """
+    item = get_owned_item(session, current_user, id)
+    if not attach_in.key.startswith(f"videos/{item.id}/"):
+        raise HTTPException(status_code=400, detail="Key does not belong to this item")
+    backend = storage.get_storage()
+    try:
+        stored = backend.stat(attach_in.key)
+    except (storage.ObjectNotFound, ValueError):
+        raise HTTPException(status_code=404, detail="Video not uploaded")
+    if stored.size > settings.MEDIA_MAX_VIDEO_SIZE:
+        backend.delete(attach_in.key)
+        raise HTTPException(status_code=413, detail="Video is too large")
+    attach_video(session, item, attach_in.key)
+    return item
+
+
+@router.head("/{id}/video/{upload_id}")
+def read_video_upload_status(
+    session: SessionDep, current_user: CurrentUser, id: str, upload_id: str
+) -> Response:
+    """
+    Get how many bytes of a video upload have been received.
+    """
+    item = get_owned_item(session, current_user, id)
+    upload = get_upload(session, item, upload_id)
+    offset = (
+        upload.length if upload.completed_at else media.get_upload_offset(upload.id)
+    )
+    return Response(
+        status_code=200,
+        headers={
+            **TUS_HEADERS,
+            "Upload-Offset": str(offset),
+            "Upload-Length": str(upload.length),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@router.patch("/{id}/video/{upload_id}", status_code=204)
+async def upload_video_chunk(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: str,
+    upload_id: str,
+    upload_offset: int = Header(ge=0),
+    content_type: str = Header(),
+) -> Response:
+    """
+    Append a chunk to a video upload at `Upload-Offset`.
+
+    The body is streamed to disk as it arrives. Once all bytes are received the
+    video is stored, the item's `video_url` points to it and a thumbnail is
+    generated in the background.
+    """
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=415,
+            detail="Content-Type must be application/offset+octet-stream",
+        )
+    item = get_owned_item(session, current_user, id)
+    upload = get_upload(session, item, upload_id)
+    if upload.completed_at:
+        raise HTTPException(status_code=409, detail="Upload already completed")
+
+    try:
+        offset = await media.append_upload_chunk(
+            upload.id,
+            offset=upload_offset,
+            length=upload.length,
+            chunks=request.stream(),
+        )
+    except media.UploadOffsetMismatch as e:
+        raise HTTPException(
+            status_code=409,
+            detail="Upload-Offset does not match the upload",
+            headers={**TUS_HEADERS, "Upload-Offset": str(e.offset)},
+        )
+    except media.UploadLocked:
+        raise HTTPException(status_code=423, detail="Upload is being written")
+    except media.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Chunk exceeds Upload-Length")
+
+    if offset == upload.length:
+        extension = media.guess_extension(upload.filename, upload.content_type)
+        key = f"videos/{item.id}/{upload.id}{extension}"
+        await run_in_threadpool(
+            storage.get_storage().put_file,
+            key,
+            media.upload_part_path(upload.id),
+            content_type=upload.content_type,
+        )
+        upload.completed_at = datetime.datetime.now(datetime.timezone.utc)
+        session.add(upload)
+        await run_in_threadpool(attach_video, session, item, key)
+
+    return Response(
+        status_code=204, headers={**TUS_HEADERS, "Upload-Offset": str(offset)}
+    )
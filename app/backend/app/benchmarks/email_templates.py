@@ -0,0 +1,67 @@
+"""
+Render password reset emails, with the template parsed on every call as
+before and with the compiled template cache.
+
+    python -m app.benchmarks.email_templates [--count 10000]
+"""
+
+import argparse
+import time
+
+from jinja2 import Template
+
+from app.utils import (
+    EMAIL_TEMPLATES_DIR,
+    generate_password_reset_token,
+    generate_reset_password_email,
+    precompile_email_templates,
+)
+
+
+def render_uncached(email: str, token: str) -> str:
+    template_str = (EMAIL_TEMPLATES_DIR / "reset_password.html").read_text()
+    html_content: str = Template(template_str).render(
+        project_name="Benchmark",
+        username=email,
+        email=email,
+        valid_hours=48,
+        link=token,
+    )
+    return html_content
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+
+    emails = [f"user{i}@example.com" for i in range(args.count)]
+    token = generate_password_reset_token(email=emails[0])
+
+    start = time.perf_counter()
+    for email in emails:
+        render_uncached(email, token)
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    precompile_email_templates()
+    precompile = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for email in emails:
+        generate_reset_password_email(email_to=email, email=email, token=token)
+    cached = time.perf_counter() - start
+
+    print(f"{args.count} reset emails")
+    print(
+        f"  parsed per render: {uncached:.3f}s ({uncached / args.count * 1e6:.0f}us each)"
+    )
+    print(f"  precompile:        {precompile:.3f}s")
+    print(
+        f"  compiled cache:    {cached:.3f}s ({cached / args.count * 1e6:.0f}us each)"
+    )
+    print(f"  speedup:           {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Load test of the API with a realistic mix of requests: logins, item lists,
+items by tag, item creation with tags and tag updates.
+
+By default it seeds a temporary SQLite database with --users users, --tags
+tags and --items items using app.seed_data's bulk mode, and drives the app
+in-process over ASGI. With --url it drives a running server over HTTP
+instead; seed that server's database first with --seed-only --database. An
+existing --database is only deleted and seeded again with --recreate.
+
+    python -m app.benchmarks.load [--duration 30] [--concurrency 16]
+        [--users 100] [--tags 200] [--items 10000] [--seed 42]
+        [--mix login=5,list_items=40,items_by_tag=30,create_item=15,update_tags=10]
+        [--url http://localhost:8000] [--save-baseline] [--tolerance 0.25]
+
+Throughput and p50/p95/p99 latencies are reported per operation and compared
+with the baseline stored in app/benchmarks/baselines/ for the mode. A p95 or
+throughput worse than the baseline by more than --tolerance is reported as a
+regression and the script exits with an error. Baselines depend on the
+machine, refresh them with --save-baseline when it changes.
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+LOAD_PASSWORD = "Load-test-passw0rd!"
+LOAD_EMAIL = "load{}@example.com"
+
+DEFAULT_MIX = "login=5,list_items=40,items_by_tag=30,create_item=15,update_tags=10"
+
+
+def load_email(index: int) -> str:
+    return LOAD_EMAIL.format(index)
+
+
+def percentile(latencies: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted latencies.
+    """
+    if not latencies:
+        return 0.0
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        email: str,
+        tag_ids: list[str],
+        rng: random.Random,
+    ) -> None:
+        self.client = client
+        self.email = email
+        self.tag_ids = tag_ids
+        self.rng = rng
+        self.headers: dict[str, str] = {}
+        self.item_ids: list[str] = []
+
+    def random_tag_ids(self) -> list[str]:
+        return self.rng.sample(
+            self.tag_ids, min(len(self.tag_ids), self.rng.randint(0, 3))
+        )
+
+    async def login(self) -> httpx.Response:
+        r = await self.client.post(
+            "/api/v1/login/access-token",
+            data={"username": self.email, "password": LOAD_PASSWORD},
+        )
+        if r.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        return r
+
+    async def list_items(self) -> httpx.Response:
+        r = await self.client.get(
+            "/api/v1/items/",
+            params={"skip": self.rng.randrange(3) * 20, "limit": 20},
+            headers=self.headers,
+        )
+        if r.status_code == 200 and not self.item_ids:
+            self.item_ids = [item["id"] for item in r.json()["data"]]
+        return r
+
+    async def items_by_tag(self) -> httpx.Response:
+        return await self.client.get(
+            f"/api/v1/tags/{self.rng.choice(self.tag_ids)}/items",
+            params={"limit": 20},
+            headers=self.headers,
+        )
+
+    async def create_item(self) -> httpx.Response:
+        r = await self.client.post(
+            "/api/v1/items/",
+            json={
+                "title": f"Created by {self.email}",
+                "description": "Created during a load test",
+                "tag_ids": self.random_tag_ids(),
+            },
+            headers=self.headers,
+        )
+        if r.status_code == 200:
+            self.item_ids.append(r.json()["id"])
+        return r
+
+    async def update_tags(self) -> httpx.Response:
+        if not self.item_ids:
+            return await self.create_item()
+        return await self.client.put(
+            f"/api/v1/items/{self.rng.choice(self.item_ids)}",
+            json={"tag_ids": self.random_tag_ids()},
+            headers=self.headers,
+        )
+
+    def operations(self) -> dict[str, Callable[[], Awaitable[httpx.Response]]]:
+        return {
+            "login": self.login,
+            "list_items": self.list_items,
+            "items_by_tag": self.items_by_tag,
+            "create_item": self.create_item,
+            "update_tags": self.update_tags,
+        }
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        weights[name.strip()] = int(weight)
+    return weights
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    *,
+    users: int,
+    concurrency: int,
+    duration: float,
+    mix: dict[str, int],
+    seed: int,
+) -> dict[str, Any]:
+    results: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    # Tag ids are needed for the requests, read them like a client would
+    first = VirtualUser(client, load_email(0), [], random.Random(seed))
+    r = await first.login()
+    r.raise_for_status()
+    r = await client.get("/api/v1/tags/", params={"limit": 1000}, headers=first.headers)
+    r.raise_for_status()
+    tag_ids = [tag["id"] for tag in r.json()["data"]]
+
+    virtual_users = [
+        VirtualUser(client, load_email(i % users), tag_ids, random.Random(seed + i))
+        for i in range(concurrency)
+    ]
+    # Not measured, every virtual user starts logged in
+    await asyncio.gather(*(user.login() for user in virtual_users))
+
+    async def worker(user: VirtualUser, deadline: float) -> None:
+        operations = user.operations()
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await operations[name]()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                results[name].append(time.perf_counter() - start)
+            else:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(user, deadline) for user in virtual_users))
+    elapsed = time.perf_counter() - start
+
+    operations = {}
+    for name in mix:
+        latencies = sorted(results[name])
+        operations[name] = {
+            "count": len(latencies),
+            "errors": errors[name],
+            "throughput": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        }
+    total = sum(operation["count"] for operation in operations.values())
+    return {
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput": round(total / elapsed, 2),
+        "operations": operations,
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"{report['requests']} requests in {report['duration']}s with "
+        f"{report['concurrency']} virtual users: {report['throughput']}/s, "
+        f"{report['errors']} errors"
+    )
+    print(
+        f"  {'operation':<14} {'count':>7} {'errors':>7} {'req/s':>9} "
+        f"{'p50':>9} {'p95':>9} {'p99':>9}"
+    )
+    for name, op in report["operations"].items():
+        print(
+            f"  {name:<14} {op['count']:>7} {op['errors']:>7} {op['throughput']:>9.1f} "
+            f"{op['p50_ms']:>7.1f}ms {op['p95_ms']:>7.1f}ms {op['p99_ms']:>7.1f}ms"
+        )
+
+
+def regressions(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    found = []
+    if report["throughput"] < baseline["throughput"] * (1 - tolerance):
+        found.append(
+            f"throughput {report['throughput']}/s, baseline {baseline['throughput']}/s"
+        )
+    for name, base in baseline["operations"].items():
+        op = report["operations"].get(name)
+        if op is None or not base["count"]:
+            continue
+        if op["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{name} p95 {op['p95_ms']}ms, baseline {base['p95_ms']}ms")
+        if op["errors"] > base["errors"]:
+            found.append(f"{name} errors {op['errors']}, baseline {base['errors']}")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--url", help="Base URL of a running server, in-process if not set"
+    )
+    parser.add_argument("--database", help="SQLite file to seed, temporary if not set")
+    parser.add_argument(
+        "--recreate", action="store_true", help="Delete an existing --database first"
+    )
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # A log line per request would be part of the timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    mode = "http" if args.url else "inprocess"
+    in_process = not args.url
+    if args.seed_only and not args.database:
+        parser.error("--seed-only needs the server's --database")
+    if in_process or args.seed_only:
+        database = args.database
+        if database is None:
+            directory = tempfile.mkdtemp(prefix="loadtest-")
+            atexit.register(shutil.rmtree, directory, ignore_errors=True)
+            database = os.path.join(directory, "loadtest.db")
+        elif os.path.exists(database):
+            # Never delete a database that may hold real data by accident
+            if not args.recreate:
+                parser.error(f"{database} exists, pass --recreate to replace it")
+            os.remove(database)
+        # Read by the settings, so before the app is imported
+        os.environ["SQLITE_DB_PATH"] = database
+        from sqlmodel import SQLModel
+
+        from app.core.db import engine
+        from app.seed_data import bulk_seed
+
+        # SQL echo outside production would dominate the timings
+        engine.echo = False
+        start = time.perf_counter()
+        SQLModel.metadata.create_all(engine)
+        bulk_seed(
+            users=args.users,
+            tags=args.tags,
+            items=args.items,
+            seed=args.seed,
+            password=LOAD_PASSWORD,
+            email_format=LOAD_EMAIL,
+        )
+        print(
+            f"Seeded {args.users} users, {args.tags} tags and {args.items} items "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        if args.seed_only:
+            return
+
+    if in_process:
+        from app.main import app
+
+        transport: httpx.AsyncBaseTransport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    else:
+        transport = httpx.AsyncHTTPTransport()
+        base_url = args.url
+
+    async def run() -> dict[str, Any]:
+        async with httpx.AsyncClient(
+            transport=transport, base_url=base_url, timeout=30.0
+        ) as client:
+            return await run_load(
+                client,
+                users=args.users,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                mix=parse_mix(args.mix),
+                seed=args.seed,
+            )
+
+    report = asyncio.run(run())
+    report.update(
+        mode=mode,
+        users=args.users,
+        tags=args.tags,
+        items=args.items,
+        machine=f"{platform.machine()} {platform.system()} Python {platform.python_version()}",
+    )
+    print_report(report)
+
+    baseline_path = BASELINES_DIR / f"load-{mode}.json"
+    if args.save_baseline:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}, save one with --save-baseline")
+        return
+    baseline = json.loads(baseline_path.read_text())
+    for key in ("concurrency", "users", "tags", "items"):
+        if baseline.get(key) != report[key]:
+            print(
+                f"warning: baseline {key} is {baseline.get(key)}, this run {report[key]}"
+            )
+    found = regressions(report, baseline, args.tolerance)
+    for regression in found:
+        print(f"regression: {regression}", file=sys.stderr)
+    if found:
+        sys.exit(1)
+    print(f"No regression against {baseline_path} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
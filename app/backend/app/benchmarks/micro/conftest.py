@@ -0,0 +1,76 @@
+"""
+Micro-benchmarks of the crud, serialization, security and email hot paths,
+run with pytest-benchmark against their own seeded SQLite database:
+
+    pytest app/benchmarks/micro --benchmark-autosave
+    pytest app/benchmarks/micro --benchmark-compare --benchmark-compare-fail=median:10%
+
+Autosaved runs are named after the commit, compare them with
+pytest-benchmark compare. They are not part of the test suite.
+"""
+
+import os
+import tempfile
+from collections.abc import Generator
+
+import pytest
+
+# Read by the settings, so before the app is imported
+os.environ["SQLITE_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "benchmarks.db")
+
+from sqlmodel import Session, SQLModel, col, select  # noqa: E402
+
+from app.core.db import engine  # noqa: E402
+from app.models import ItemTag, Tag, User  # noqa: E402
+from app.seed_data import BULK_USER_EMAIL, bulk_seed  # noqa: E402
+
+USERS = 20
+TAGS = 100
+ITEMS = 2000
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    # Calibration takes longer than the suite's per test timeout
+    for item in items:
+        item.add_marker(pytest.mark.timeout(300))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database() -> None:
+    # SQL echo outside production would dominate the timings
+    engine.echo = False
+    SQLModel.metadata.create_all(engine)
+    bulk_seed(users=USERS, tags=TAGS, items=ITEMS, seed=42)
+
+
+@pytest.fixture
+def session() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def user(session: Session) -> User:
+    return session.exec(
+        select(User).where(User.email == BULK_USER_EMAIL.format(0))
+    ).one()
+
+
+@pytest.fixture
+def tag(session: Session) -> Tag:
+    # The most used tag, the worst case of the by-tag queries
+    return session.exec(select(Tag).order_by(col(Tag.item_count).desc())).first()  # type: ignore[return-value]
+
+
+@pytest.fixture
+def tag_ids(session: Session) -> list[str]:
+    return list(session.exec(select(Tag.id).order_by(Tag.name).limit(5)).all())
+
+
+@pytest.fixture
+def item_ids(session: Session, tag: Tag) -> list[str]:
+    return list(
+        session.exec(
+            select(ItemTag.item_id).where(ItemTag.tag_id == tag.id).limit(20)
+        ).all()
+    )
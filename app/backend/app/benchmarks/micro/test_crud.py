@@ -0,0 +1,255 @@
+import itertools
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from pytest_benchmark.fixture import BenchmarkFixture
+from sqlmodel import Session, col
+
+from app import crud
+from app.core.security import create_password_context
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemUpdate,
+    Tag,
+    TagCreate,
+    TagUpdate,
+    User,
+    UserCreate,
+    UserUpdate,
+)
+from app.seed_data import BULK_USER_PASSWORD
+
+FIELDS = ["id", "title", "image_url", "tags"]
+
+# Unique names and emails across rounds and runs on the same database
+counter = itertools.count()
+
+T = TypeVar("T")
+
+
+def pedantic(
+    benchmark: BenchmarkFixture, function: Callable[..., T], **options: Any
+) -> T:
+    # BenchmarkFixture.pedantic isn't annotated
+    result: T = benchmark.pedantic(function, **options)  # type: ignore[no-untyped-call]
+    return result
+
+
+def test_create_user(benchmark: BenchmarkFixture, session: Session) -> None:
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        user_in = UserCreate(
+            email=f"bench{next(counter)}@example.com", password=BULK_USER_PASSWORD
+        )
+        return (), {"session": session, "user_create": user_in}
+
+    pedantic(benchmark, crud.create_user, setup=setup, rounds=5)
+
+
+def test_update_user(benchmark: BenchmarkFixture, session: Session, user: User) -> None:
+    benchmark(
+        crud.update_user,
+        session=session,
+        db_user=user,
+        user_in=UserUpdate(full_name="Benchmark User"),
+    )
+
+
+def test_get_user_by_email(
+    benchmark: BenchmarkFixture, session: Session, user: User
+) -> None:
+    benchmark(crud.get_user_by_email, session=session, email=user.email)
+
+
+def test_authenticate(
+    benchmark: BenchmarkFixture, session: Session, user: User
+) -> None:
+    result = pedantic(
+        benchmark,
+        crud.authenticate,
+        kwargs={
+            "session": session,
+            "email": user.email,
+            "password": BULK_USER_PASSWORD,
+        },
+        rounds=5,
+    )
+    assert result is not None
+
+
+def test_upgrade_password_hash(
+    benchmark: BenchmarkFixture, session: Session, user: User
+) -> None:
+    # A hash from before the cost was raised, so every round really upgrades it
+    old_hash = create_password_context("bcrypt", bcrypt_rounds=4).hash(
+        BULK_USER_PASSWORD
+    )
+
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        user.hashed_password = old_hash
+        session.add(user)
+        session.commit()
+        return (), {
+            "session": session,
+            "user_id": user.id,
+            "password": BULK_USER_PASSWORD,
+            "hashed_password": old_hash,
+        }
+
+    assert pedantic(benchmark, crud.upgrade_password_hash, setup=setup, rounds=5)
+
+
+def test_create_item(
+    benchmark: BenchmarkFixture, session: Session, user: User, tag_ids: list[str]
+) -> None:
+    benchmark(
+        crud.create_item,
+        session=session,
+        item_in=ItemCreate(title="Benchmark item", tag_ids=tag_ids[:3]),
+        owner_id=user.id,
+    )
+
+
+def test_update_item(
+    benchmark: BenchmarkFixture, session: Session, user: User, tag_ids: list[str]
+) -> None:
+    item = crud.create_item(
+        session=session, item_in=ItemCreate(title="Benchmark item"), owner_id=user.id
+    )
+    # Alternate between two tag sets, so every call adds and removes links
+    tag_sets = itertools.cycle([tag_ids[:3], tag_ids[2:]])
+
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        item_in = ItemUpdate(title="Benchmark item", tag_ids=next(tag_sets))
+        return (), {"session": session, "db_item": item, "item_in": item_in}
+
+    pedantic(benchmark, crud.update_item, setup=setup, rounds=100)
+
+
+def test_get_items_by_ids(
+    benchmark: BenchmarkFixture, session: Session, item_ids: list[str]
+) -> None:
+    items = benchmark(crud.get_items_by_ids, session=session, ids=item_ids)
+    assert len(items) == len(item_ids)
+
+
+def test_delete_item(
+    benchmark: BenchmarkFixture, session: Session, user: User, tag_ids: list[str]
+) -> None:
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        item = crud.create_item(
+            session=session,
+            item_in=ItemCreate(title="Benchmark item", tag_ids=tag_ids[:3]),
+            owner_id=user.id,
+        )
+        return (), {"session": session, "db_item": item}
+
+    pedantic(benchmark, crud.delete_item, setup=setup, rounds=100)
+
+
+def test_delete_items_by_owner(
+    benchmark: BenchmarkFixture, session: Session, tag_ids: list[str]
+) -> None:
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        # Commits the previous round's deletes
+        session.commit()
+        owner = User(email=f"bench{next(counter)}@example.com", hashed_password="-")
+        session.add(owner)
+        session.commit()
+        for _ in range(20):
+            crud.create_item(
+                session=session,
+                item_in=ItemCreate(title="Benchmark item", tag_ids=tag_ids[:3]),
+                owner_id=owner.id,
+            )
+        return (), {"session": session, "owner_id": owner.id}
+
+    pedantic(benchmark, crud.delete_items_by_owner, setup=setup, rounds=20)
+    session.commit()
+
+
+def test_create_tag(benchmark: BenchmarkFixture, session: Session) -> None:
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        tag_in = TagCreate(name=f"bench-{next(counter)}", color="#336699")
+        return (), {"session": session, "tag_in": tag_in}
+
+    pedantic(benchmark, crud.create_tag, setup=setup, rounds=100)
+
+
+def test_update_tag(benchmark: BenchmarkFixture, session: Session, tag: Tag) -> None:
+    benchmark(
+        crud.update_tag,
+        session=session,
+        db_tag=tag,
+        tag_in=TagUpdate(description="Updated by a benchmark"),
+    )
+
+
+def test_get_tag(benchmark: BenchmarkFixture, session: Session, tag: Tag) -> None:
+    def get_tag() -> Tag | None:
+        # Otherwise it is returned from the session's identity map
+        session.expunge_all()
+        return crud.get_tag(session=session, tag_id=tag.id)
+
+    assert benchmark(get_tag) is not None
+
+
+def test_get_tag_by_name(
+    benchmark: BenchmarkFixture, session: Session, tag: Tag
+) -> None:
+    assert benchmark(crud.get_tag_by_name, session=session, name=tag.name) is not None
+
+
+def test_get_tags(benchmark: BenchmarkFixture, session: Session) -> None:
+    benchmark(crud.get_tags, session=session)
+
+
+def test_delete_tag(benchmark: BenchmarkFixture, session: Session) -> None:
+    def setup() -> tuple[tuple[Any, ...], dict[str, Any]]:
+        tag = crud.create_tag(
+            session=session, tag_in=TagCreate(name=f"bench-{next(counter)}")
+        )
+        return (), {"session": session, "tag_id": tag.id}
+
+    pedantic(benchmark, crud.delete_tag, setup=setup, rounds=100)
+
+
+def test_get_popular_tags(benchmark: BenchmarkFixture, session: Session) -> None:
+    benchmark(crud.get_popular_tags, session=session)
+
+
+def test_recount_tag_item_counts(benchmark: BenchmarkFixture, session: Session) -> None:
+    benchmark(crud.recount_tag_item_counts, session=session)
+
+
+def test_get_items_by_tag(
+    benchmark: BenchmarkFixture, session: Session, tag: Tag
+) -> None:
+    benchmark(crud.get_items_by_tag, session=session, tag_id=tag.id)
+
+
+def test_select_item_fields(benchmark: BenchmarkFixture) -> None:
+    benchmark(crud.select_item_fields, FIELDS)
+
+
+def test_get_tags_by_item_ids(
+    benchmark: BenchmarkFixture, session: Session, item_ids: list[str]
+) -> None:
+    benchmark(crud.get_tags_by_item_ids, session=session, item_ids=item_ids)
+
+
+def test_get_item_rows(benchmark: BenchmarkFixture, session: Session) -> None:
+    statement = (
+        crud.select_item_fields(FIELDS).order_by(col(Item.created_at).desc()).limit(100)
+    )
+    benchmark(crud.get_item_rows, session=session, statement=statement, fields=FIELDS)
+
+
+def test_get_item_rows_by_tag(
+    benchmark: BenchmarkFixture, session: Session, tag: Tag
+) -> None:
+    benchmark(crud.get_item_rows_by_tag, session=session, tag_id=tag.id, fields=FIELDS)
+
+
+def test_get_tag_rows(benchmark: BenchmarkFixture, session: Session) -> None:
+    benchmark(crud.get_tag_rows, session=session, fields=["id", "name", "item_count"])
@@ -0,0 +1,16 @@
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from app.utils import render_email_template
+
+
+def test_render_email_template(benchmark: BenchmarkFixture) -> None:
+    context = {
+        "project_name": "Benchmark",
+        "username": "user@example.com",
+        "email": "user@example.com",
+        "valid_hours": 48,
+        "link": "https://example.com/reset-password?token=benchmark",
+    }
+    benchmark(
+        render_email_template, template_name="reset_password.html", context=context
+    )
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from pytest_benchmark.fixture import BenchmarkFixture
+from sqlmodel import Session
+
+from app.api.deps import get_current_user
+from app.core.security import create_access_token
+from app.models import User, validate_password_strength
+
+
+def test_get_current_user(
+    benchmark: BenchmarkFixture, session: Session, user: User
+) -> None:
+    token = create_access_token(user.id, timedelta(minutes=5))
+
+    def current_user() -> User:
+        # A new session per request, as with SessionDep
+        session.expunge_all()
+        return get_current_user(session, token)
+
+    assert benchmark(current_user).id == user.id
+
+
+def test_validate_password_strength(benchmark: BenchmarkFixture) -> None:
+    benchmark(validate_password_strength, "Benchmark-Passw0rd!")
+
+
+def test_create_access_token(benchmark: BenchmarkFixture, user: User) -> None:
+    benchmark(create_access_token, user.id, timedelta(minutes=5))
@@ -0,0 +1,21 @@
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import Item, ItemsPublic
+
+
+@pytest.mark.parametrize("size", [10, 100, 1000])
+def test_items_public(benchmark: BenchmarkFixture, session: Session, size: int) -> None:
+    ids = session.exec(select(Item.id).limit(size)).all()
+    # Tags loaded up front, only the serialization is measured
+    items = crud.get_items_by_ids(session=session, ids=ids)
+
+    def serialize() -> bytes:
+        public = ItemsPublic.model_validate(
+            {"data": items, "count": len(items)}, from_attributes=True
+        )
+        return public.model_dump_json().encode()
+
+    benchmark(serialize)
@@ -0,0 +1,74 @@
+"""
+Verify latency and throughput of password hashes for several costs, to pick
+BCRYPT_ROUNDS or the ARGON2_* settings that fit the login latency budget.
+
+    python -m app.benchmarks.password_hashing [--count 20] [--threads 4]
+        [--bcrypt-rounds 10,11,12,13] [--argon2 19456:2,47104:1,65536:3]
+
+argon2 costs are memory in KiB and time cost, they are skipped unless
+argon2-cffi is installed (uv sync --extra argon2).
+"""
+
+import argparse
+import importlib.util
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.security import create_password_context
+
+PASSWORD = "Benchmark-Passw0rd!"
+
+
+def measure(name: str, context: CryptContext, count: int, threads: int) -> None:
+    hashed = context.hash(PASSWORD)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(
+            pool.map(lambda _: context.verify(PASSWORD, hashed), range(count * threads))
+        )
+    throughput = count * threads / (time.perf_counter() - start)
+
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    print(f"  {name:<24} {p50:8.1f}ms {p95:8.1f}ms {throughput:10.1f}/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--bcrypt-rounds", default="10,11,12,13")
+    parser.add_argument("--argon2", default="19456:2,47104:1,65536:3")
+    args = parser.parse_args()
+
+    print(f"{args.count} verifies per setting, throughput with {args.threads} threads")
+    print(f"  {'setting':<24} {'p50':>10} {'p95':>10} {'throughput':>12}")
+    for rounds in args.bcrypt_rounds.split(","):
+        context = create_password_context("bcrypt", bcrypt_rounds=int(rounds))
+        measure(f"bcrypt rounds={rounds}", context, args.count, args.threads)
+    if importlib.util.find_spec("argon2") is None:
+        print("  argon2 skipped, install it with: uv sync --extra argon2")
+        return
+    for costs in args.argon2.split(","):
+        memory_cost, time_cost = (int(value) for value in costs.split(":"))
+        context = create_password_context(
+            "argon2", argon2_memory_cost=memory_cost, argon2_time_cost=time_cost
+        )
+        measure(
+            f"argon2id m={memory_cost} t={time_cost}", context, args.count, args.threads
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Import time of the app in a fresh interpreter, as reported by
+python -X importtime, with the packages that take the longest.
+
+Exits with an error when the fastest run is over the budget, or when a module
+that should only load with its feature enabled (emails, templating, Sentry,
+Turso) was imported, so CI catches startup regressions. Run it with those
+features disabled, as in the test environment.
+
+    python -m app.benchmarks.startup [--runs 5] [--budget-ms 3000] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter
+
+# Every worker pays for the app import at boot. About 1.1s when this budget
+# was set, the rest is headroom for slower machines
+STARTUP_BUDGET_MS = 3000
+
+LAZY_MODULES = ("emails", "jinja2", "sentry_sdk", "sqlalchemy_libsql")
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """
+    Self and cumulative import time in microseconds per imported module.
+    """
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("SENTRY_DSN", "SMTP_HOST", "TURSO_DATABASE_URL")
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # The fastest run is the least disturbed by the rest of the machine
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    times = min(runs, key=lambda run: run[args.module][1])
+    total_ms = times[args.module][1] / 1000
+
+    packages: Counter[str] = Counter()
+    for name, (self_us, _) in times.items():
+        packages[name.split(".")[0]] += self_us
+    print(f"import {args.module}: {total_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    for package, self_us in packages.most_common(args.top):
+        print(f"  {package:<24} {self_us / 1000:8.1f}ms")
+
+    errors = []
+    if total_ms > args.budget_ms:
+        errors.append(
+            f"startup took {total_ms:.0f}ms, over the {args.budget_ms:.0f}ms budget"
+        )
+    eager = [
+        name for name in LAZY_MODULES if any(n.split(".")[0] == name for n in times)
+    ]
+    if eager:
+        errors.append(f"imported at startup though disabled: {', '.join(eager)}")
+    for error in errors:
+        print(f"error: {error}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
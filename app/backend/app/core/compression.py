@@ -0,0 +1,153 @@
+"""
+Response compression middleware.
+
+Compresses complete (non-streaming) responses with brotli or gzip, depending on
+what the client accepts, once they pass a minimum size and their content type is
+in the allow-list. Responses for a small set of static paths (the OpenAPI
+document by default) are compressed once per encoding and replayed from memory.
+"""
+
+import gzip
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import record_cache
+
+# brotli is optional, install it with: uv sync --extra compression
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+
+def parse_accept_encoding(value: str) -> dict[str, float]:
+    encodings: dict[str, float] = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        content_types: list[str] | None = None,
+        cached_paths: list[str] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = content_types or ["application/json", "text/html"]
+        self.cached_paths = set(cached_paths or [])
+        # (path, encoding) -> (status, raw headers, body)
+        self._cache: dict[tuple[str, str], tuple[int, list[Any], bytes]] = {}
+
+    def choose_encoding(self, accept_encoding: str) -> str | None:
+        accepted = parse_accept_encoding(accept_encoding)
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return bytes(brotli.compress(body, quality=self.brotli_quality))
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def should_compress(self, status: int, headers: Headers, body: bytes) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers or len(body) < self.minimum_size:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        return content_type in self.content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = self.choose_encoding(request_headers.get("accept-encoding", ""))
+        path = scope["path"]
+        cache_key = None
+        if scope["method"] == "GET" and path in self.cached_paths:
+            cache_key = (path, encoding or "identity")
+            cached = self._cache.get(cache_key)
+            record_cache("compressed_responses", cached is not None)
+            if cached is not None:
+                status, raw_headers, body = cached
+                etag = Headers(raw=raw_headers).get("etag")
+                if etag and request_headers.get("if-none-match") == etag:
+                    status, body = 304, b""
+                    raw_headers = [(b"etag", etag.encode())]
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": status,
+                        "headers": raw_headers,
+                    }
+                )
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        if encoding is None and cache_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body gets compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming:
+                if start_message is not None and not streaming:
+                    # pathsend and zerocopy responses are passed through as-is
+                    streaming = True
+                    await send(start_message)
+                await send(message)
+                return
+            assert start_message is not None
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming responses (files, ranges) are passed through as-is
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+
+            status = start_message["status"]
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            if encoding is not None and self.should_compress(status, headers, body):
+                body = self.compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+            if cache_key is not None and status == 200:
+                self._cache[cache_key] = (status, headers.raw, body)
+            await send({**start_message, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -62,6 +62,143 @@ class Settings(BaseSettings):
             db_path = Path.cwd() / db_path
         return f"sqlite:///{db_path}"
 
+    # Prometheus metrics at /metrics, only served with this bearer token when
+    # set. Outside local they are off unless the token is set, enabling them
+    # without it is an error. Set PROMETHEUS_MULTIPROC_DIR to aggregate several
+    # workers
+    METRICS_ENABLED: bool | None = None
+    METRICS_TOKEN: str | None = None
+
+    @model_validator(mode="after")
+    def _check_metrics_token(self) -> Self:
+        local = self.ENVIRONMENT == "local"
+        if self.METRICS_ENABLED is None:
+            self.METRICS_ENABLED = local or bool(self.METRICS_TOKEN)
+        elif self.METRICS_ENABLED and not self.METRICS_TOKEN and not local:
+            raise ValueError(
+                "METRICS_TOKEN is required to serve /metrics outside local, "
+                "or set METRICS_ENABLED=false"
+            )
+        return self
+
+    # Sampling profiler started by superusers from /utils/profile, off unless
+    # enabled. Stacks are sampled every PROFILER_INTERVAL_MS while a profiled
+    # request is in flight, at most PROFILER_MAX_STACKS distinct ones are kept.
+    # The workers of an instance share the profile through PROFILER_DIR, by
+    # default a directory only this user can read in the temp directory
+    PROFILER_ENABLED: bool = False
+    PROFILER_INTERVAL_MS: float = 10.0
+    PROFILER_MAX_STACKS: int = 20_000
+    PROFILER_DIR: str | None = None
+
+    # Warm each worker up in the background when it starts, the readiness
+    # check fails until it is done
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 4
+
+    # /health/ready fails when a database round trip is slower than this, when
+    # the connection pool or the password hashing queue are this full, or while
+    # warming up. Results are reused for HEALTH_CACHE_SECONDS
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_DB_MAX_LATENCY_MS: float = 500.0
+    HEALTH_POOL_MAX_SATURATION: float = 0.9
+    HEALTH_PASSWORD_HASH_MAX_QUEUE: int = 100
+
+    # Upload parts, locally stored media and caches live under MEDIA_ROOT
+    MEDIA_ROOT: str = "media"
+    MEDIA_MAX_VIDEO_SIZE: int = 2 * 1024 * 1024 * 1024  # 2 GiB
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def media_root_path(self) -> Path:
+        media_root = Path(self.MEDIA_ROOT)
+        if not media_root.is_absolute():
+            media_root = Path.cwd() / media_root
+        return media_root
+
+    # Finished media is stored locally under MEDIA_ROOT or in an S3-compatible
+    # bucket, upload parts always stay local
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    STORAGE_PRESIGN_EXPIRE_SECONDS: int = 3600
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    S3_ACCESS_KEY_ID: str | None = None
+    S3_SECRET_ACCESS_KEY: str | None = None
+
+    @model_validator(mode="after")
+    def _check_storage_backend(self) -> Self:
+        if self.STORAGE_BACKEND == "s3" and not self.S3_BUCKET:
+            raise ValueError("S3_BUCKET is required when STORAGE_BACKEND is s3")
+        return self
+
+    # New passwords are hashed with PASSWORD_HASH_SCHEME, hashes made with the
+    # other scheme or other parameters are upgraded on the next login. argon2
+    # (argon2id) needs: uv sync --extra argon2
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_MEMORY_COST: int = 19 * 1024  # KiB
+    ARGON2_TIME_COST: int = 2
+    ARGON2_PARALLELISM: int = 1
+    # Hashing runs on a dedicated pool of this many threads
+    PASSWORD_HASH_WORKERS: int = 4
+    # Logins check a bloom filter of user emails before the database, unknown
+    # emails are verified against a dummy hash instead. Emails added by other
+    # workers are read from a log every refresh, so they can be missed for that
+    # long, and the filter is rebuilt to drop deleted ones
+    USER_EMAIL_FILTER_ENABLED: bool = True
+    USER_EMAIL_FILTER_REFRESH_SECONDS: float = 2.0
+    USER_EMAIL_FILTER_REBUILD_SECONDS: float = 600.0
+    USER_EMAIL_FILTER_FALSE_POSITIVE_RATE: float = 0.01
+
+    # Sliding-window limits checked before any password hashing, per client IP
+    # and per email. Logins only count failures. Use the redis backend to share
+    # the counts between workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_REDIS_URL: str | None = None
+    RATE_LIMIT_WINDOW_SECONDS: int = 300
+    RATE_LIMIT_LOGIN_PER_IP: int = 30
+    RATE_LIMIT_LOGIN_PER_EMAIL: int = 10
+    RATE_LIMIT_RECOVERY_PER_IP: int = 10
+    RATE_LIMIT_RECOVERY_PER_EMAIL: int = 3
+    RATE_LIMIT_SIGNUP_PER_IP: int = 10
+    # Reverse proxies in front of the app, as addresses or networks. Behind
+    # them the client IP is read from X-Forwarded-For, not the connection
+    TRUSTED_PROXIES: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+
+    @model_validator(mode="after")
+    def _check_rate_limit_backend(self) -> Self:
+        if self.RATE_LIMIT_BACKEND == "redis" and not self.RATE_LIMIT_REDIS_URL:
+            raise ValueError(
+                "RATE_LIMIT_REDIS_URL is required when RATE_LIMIT_BACKEND is redis"
+            )
+        return self
+
+    # Resized item image variants, cached under MEDIA_ROOT/cache/images
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    IMAGE_MAX_SOURCE_BYTES: int = 20 * 1024 * 1024
+    # Remote item images are only fetched from public addresses, and only from
+    # these hosts when set (a comma separated list or a JSON array)
+    IMAGE_REMOTE_HOSTS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    IMAGE_MAX_REDIRECTS: int = 3
+
+    # Poster frames for uploaded videos are extracted with ffmpeg in the background
+    THUMBNAILS_ENABLED: bool = True
+    THUMBNAIL_WORKERS: int = 1
+    FFMPEG_PATH: str = "ffmpeg"
+
+    # Response compression, brotli is used when installed and accepted
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_CONTENT_TYPES: list[str] = [
+        "application/json",
+        "text/html",
+        "text/plain",
+    ]
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -78,6 +215,14 @@ class Settings(BaseSettings):
         return self
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # Emails are queued in the database and sent by background workers, each
+    # keeping its own SMTP connection open while there is work
+    EMAIL_WORKERS: int = 2
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_DELAY: float = 30.0
+    # Batch emails are sent by this many threads, each with its own connection
+    EMAIL_BATCH_CONCURRENCY: int = 4
+    EMAIL_BATCH_PAGE_SIZE: int = 200
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -3,19 +3,9 @@ from sqlalchemy import event
 import datetime
 from typing import Any
 
-# Import libsql dialect to register it with SQLAlchemy (only if using Turso)
-# This must be imported before creating the engine with sqlite+libsql:// URLs
-# The sqlalchemy-libsql package should auto-register via setuptools entry points
-# when the package is installed. Importing it here ensures the entry point is loaded.
-try:
-    import sqlalchemy_libsql  # noqa: F401
-except ImportError:
-    # Package not installed - this is fine if not using Turso
-    # Will fail at engine creation with a clear error if Turso is configured
-    pass
-
 from app import crud
 from app.core.config import settings
+from app.core.metrics import instrument_pool
 from app.models import User, UserCreate
 
 
@@ -41,7 +31,9 @@ def get_engine_config():
     
     if has_turso_url and has_turso_token:
         # Use Turso Remote
-        # Check if sqlalchemy-libsql is installed
+        # Check if sqlalchemy-libsql is installed, importing it also registers
+        # the sqlite+libsql:// dialect before the engine is created. It is only
+        # imported here so local SQLite doesn't pay for it at startup
         try:
             import sqlalchemy_libsql  # noqa: F401
         except ImportError:
@@ -90,6 +82,7 @@ engine = create_engine(
     echo=settings.ENVIRONMENT != "production",
     connect_args=engine_config["connect_args"],
 )
+instrument_pool(engine)
 
 
 # Event listeners to automatically update updated_at field
@@ -0,0 +1,217 @@
+"""
+Prometheus metrics, exposed at /metrics.
+
+Requests are timed per route template (/api/v1/items/{id}, not every item
+id) by a small ASGI middleware. The database pool gauges are updated on
+checkout and checkin, so they are current in every worker without polling.
+
+With several workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+shared by the workers of one instance: each worker writes its values to files
+there and a scrape of any worker reports the sum over all of them. The live
+gauges of a worker are dropped when it shuts down, and at the next scrape if
+it died without shutting down, so they only add up running workers.
+"""
+
+import glob
+import os
+import secrets
+import time
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROCESS_DIR:
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to send the complete response, per route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Connections the pool keeps open", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections in use", multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size, negative while the pool is not full",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts", "Connections taken from the pool")
+PASSWORD_HASH_QUEUE = Gauge(
+    "password_hash_queue_depth",
+    "Hash and verify calls waiting for a password hashing thread",
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests", "Cache lookups by cache and result", ["cache", "result"]
+)
+RATE_LIMIT_CHECKS = Counter(
+    "rate_limit_checks", "Rate limit checks by scope and outcome", ["scope", "outcome"]
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def instrument_pool(engine: Any) -> None:
+    """
+    Keep the pool gauges up to date from the engine's pool events.
+    """
+    from sqlalchemy import event
+
+    pool = engine.pool
+    size = getattr(pool, "size", None)
+    if not callable(size):
+        # NullPool and StaticPool have nothing to report
+        return
+    DB_POOL_SIZE.set(size())
+
+    def update(*_: Any) -> None:
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(pool.overflow())
+
+    def checkout(*_: Any) -> None:
+        DB_POOL_CHECKOUTS.inc()
+        update()
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", update)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the route that handled the request, with its prefix.
+    """
+    # Set by the router on the scope once a route matched
+    route = scope.get("route")
+    template: str | None = getattr(route, "path", None)
+    regex = getattr(route, "path_regex", None)
+    if template is None or regex is None:
+        return "unmatched"
+    # Depending on the FastAPI version the route's path may not include the
+    # prefixes of the routers it was included with, they are the part of the
+    # request path in front of what the route matches
+    path: str = scope["path"]
+    for start, char in enumerate(path):
+        if char == "/" and regex.match(path[start:]):
+            return path[:start] + template
+    return template
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            REQUEST_DURATION.labels(method, route_template(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running as another user
+        return True
+    return True
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """
+    Drop the live gauges of a worker that exited, by default this one.
+    """
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), MULTIPROCESS_DIR)  # type: ignore[no-untyped-call]
+
+
+def remove_dead_processes(directory: str) -> list[int]:
+    """
+    Drop the live gauges of workers that died, returns their pids.
+    """
+    dead = set()
+    for path in glob.glob(os.path.join(directory, "gauge_live*_*.db")):
+        pid = int(os.path.basename(path)[: -len(".db")].rsplit("_", 1)[1])
+        if not process_alive(pid):
+            dead.add(pid)
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, directory)  # type: ignore[no-untyped-call]
+    return sorted(dead)
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    """
+    Current metrics in the text exposition format, with their content type.
+    """
+    if MULTIPROCESS_DIR:
+        # uvicorn has no hook for its workers exiting, those killed without
+        # shutting down are found here
+        remove_dead_processes(MULTIPROCESS_DIR)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        authorization = request.headers.get("authorization", "")
+        if not secrets.compare_digest(authorization.encode(), expected.encode()):
+            return PlainTextResponse(
+                "Not authenticated",
+                status_code=401,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    # Reading the multiprocess files is blocking
+    body, content_type = await run_in_threadpool(generate_metrics)
+    return Response(body, media_type=content_type)
@@ -0,0 +1,148 @@
+"""
+Precomputed OpenAPI schema.
+
+`python -m app.export_openapi` writes the schema to `app/openapi.json` once, at
+deploy time (see scripts/prestart.sh). Workers load that file on the first
+request instead of generating the schema from every route, and serve it with an
+ETag so clients can revalidate with If-None-Match.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+OPENAPI_ARTIFACT_PATH = Path(__file__).parent.parent / "openapi.json"
+
+# Root extension of the artifact holding the fingerprint it was written for
+FINGERPRINT_KEY = "x-schema-fingerprint"
+
+
+def schema_fingerprint(app: FastAPI) -> str:
+    """
+    Hash of what the schema is generated from: the route table, and the
+    source of the endpoints and of the models they use.
+    """
+    digest = hashlib.sha256()
+    sources: set[str] = set()
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        methods = ",".join(sorted(getattr(route, "methods", None) or ()))
+        name = getattr(endpoint, "__qualname__", "")
+        digest.update(f"{methods} {getattr(route, 'path', '')} {name}\n".encode())
+        if endpoint is not None:
+            module = sys.modules.get(endpoint.__module__)
+            if module is not None and getattr(module, "__file__", None):
+                sources.add(module.__file__)  # type: ignore[arg-type]
+    models = sys.modules.get("app.models")
+    if models is not None:
+        sources.add(inspect.getfile(models))
+    for source in sorted(sources):
+        digest.update(Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+def generate_openapi_schema(app: FastAPI) -> dict[str, Any]:
+    return get_openapi(
+        title=app.title,
+        version=app.version,
+        openapi_version=app.openapi_version,
+        summary=app.summary,
+        description=app.description,
+        routes=app.routes,
+        tags=app.openapi_tags,
+        servers=app.servers,
+    )
+
+
+def dump_openapi_schema(schema: dict[str, Any]) -> bytes:
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def write_openapi_artifact(app: FastAPI, path: Path = OPENAPI_ARTIFACT_PATH) -> Path:
+    schema = generate_openapi_schema(app)
+    schema[FINGERPRINT_KEY] = schema_fingerprint(app)
+    path.write_bytes(dump_openapi_schema(schema))
+    return path
+
+
+class OpenAPISchema:
+    """
+    Lazily load the schema from the artifact, falling back to generating it.
+
+    The artifact is ignored when it was written for other routes, endpoint or
+    model code, or another title or version, so a file left over from a
+    previous release is never served.
+    """
+
+    def __init__(
+        self, app: FastAPI, *, artifact_path: Path | None = OPENAPI_ARTIFACT_PATH
+    ) -> None:
+        self.app = app
+        self.artifact_path = artifact_path
+        self._schema: dict[str, Any] | None = None
+        self._body: bytes | None = None
+        self._etag: str | None = None
+
+    def _load_artifact(self) -> tuple[dict[str, Any], bytes] | None:
+        if self.artifact_path is None or not self.artifact_path.is_file():
+            return None
+        body = self.artifact_path.read_bytes()
+        schema = json.loads(body)
+        info = schema.get("info", {})
+        if (
+            info.get("title") != self.app.title
+            or info.get("version") != self.app.version
+            or schema.get(FINGERPRINT_KEY) != schema_fingerprint(self.app)
+        ):
+            logger.warning(f"Ignoring stale OpenAPI artifact {self.artifact_path}")
+            return None
+        return schema, body
+
+    def _load(self) -> None:
+        loaded = self._load_artifact()
+        if loaded is None:
+            schema = generate_openapi_schema(self.app)
+            loaded = schema, dump_openapi_schema(schema)
+        self._schema, self._body = loaded
+        self._etag = f'"{hashlib.sha256(self._body).hexdigest()[:32]}"'
+
+    def get(self) -> dict[str, Any]:
+        if self._schema is None:
+            self._load()
+        assert self._schema is not None
+        return self._schema
+
+    async def endpoint(self, request: Request) -> Response:
+        if self._body is None:
+            self._load()
+        assert self._body is not None and self._etag is not None
+        headers = {"ETag": self._etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == self._etag:
+            return Response(status_code=304, headers=headers)
+        return Response(self._body, media_type="application/json", headers=headers)
+
+
+def install_openapi_schema(app: FastAPI, schema: OpenAPISchema) -> None:
+    """
+    Serve app.openapi_url from the precomputed schema, with ETag support.
+    """
+    assert app.openapi_url
+    app.openapi = schema.get  # type: ignore[method-assign]
+    # Replace the route FastAPI registers for openapi_url on creation
+    app.router.routes = [
+        route
+        for route in app.router.routes
+        if getattr(route, "path", None) != app.openapi_url
+    ]
+    app.add_route(app.openapi_url, schema.endpoint, include_in_schema=False)
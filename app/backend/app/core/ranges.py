@@ -0,0 +1,205 @@
+"""
+File responses with HTTP Range and conditional request support.
+
+Serves a single byte range with 206 Partial Content, answers If-None-Match and
+If-Modified-Since with 304 and honours If-Range. The body is never read into
+memory: when the server supports the ASGI zero-copy or pathsend extensions the
+file is handed to it, otherwise it is streamed in chunks.
+
+Multiple ranges in one request are ignored and the whole file is sent, which
+the RFC allows and which is all a media player needs.
+"""
+
+import mimetypes
+import os
+from collections.abc import Mapping
+from email.utils import formatdate, parsedate_to_datetime
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(value: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a Range header into a (start, end) slice with end exclusive.
+
+    Returns None when the header should be ignored: another unit, several
+    ranges or invalid syntax.
+    """
+    unit, _, ranges = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, sep, last = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            # bytes=-N is the last N bytes
+            suffix = int(last)
+            if suffix < 0:
+                return None
+            if suffix == 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else None
+    except ValueError:
+        return None
+    if start < 0 or (end is not None and end <= start):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, size if end is None else min(end, size)
+
+
+def _etag_matches(etag: str, values: str, *, weak: bool) -> bool:
+    for value in values.split(","):
+        value = value.strip()
+        if value == "*":
+            return True
+        if weak:
+            value = value.removeprefix("W/")
+        if value == etag:
+            return True
+    return False
+
+
+def _not_modified_since(value: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified only has second precision
+    return int(mtime) <= since.timestamp()
+
+
+class RangeFileResponse(Response):
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        *,
+        media_type: str | None = None,
+        headers: Mapping[str, str] | None = None,
+        stat_result: os.stat_result | None = None,
+    ) -> None:
+        self.path = path
+        self.status_code = 200
+        self.media_type = (
+            media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        )
+        self.background = None
+        self.init_headers(headers)
+        self.stat_result = stat_result or os.stat(path)
+        self.etag = f'"{self.stat_result.st_mtime_ns:x}-{self.stat_result.st_size:x}"'
+        self.last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+        self.headers.setdefault("accept-ranges", "bytes")
+        self.headers.setdefault("etag", self.etag)
+        self.headers.setdefault("last-modified", self.last_modified)
+
+    def is_not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(self.etag, if_none_match, weak=True)
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None:
+            return _not_modified_since(if_modified_since, self.stat_result.st_mtime)
+        return False
+
+    def if_range_matches(self, value: str | None) -> bool:
+        if value is None:
+            return True
+        if value.startswith('"'):
+            # If-Range needs a strong comparison
+            return value == self.etag
+        return value == self.last_modified
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        size = self.stat_result.st_size
+        headers = MutableHeaders(raw=list(self.raw_headers))
+
+        if self.is_not_modified(request_headers):
+            not_modified = MutableHeaders()
+            for name in ("etag", "last-modified", "cache-control"):
+                if name in headers:
+                    not_modified[name] = headers[name]
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": not_modified.raw,
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        byte_range = None
+        range_header = request_headers.get("range")
+        if range_header and self.if_range_matches(request_headers.get("if-range")):
+            try:
+                byte_range = parse_range_header(range_header, size)
+            except RangeNotSatisfiable:
+                await Response(
+                    status_code=416, headers={"Content-Range": f"bytes */{size}"}
+                )(scope, receive, send)
+                return
+
+        status = 200
+        start, end = byte_range or (0, size)
+        if byte_range is not None:
+            status = 206
+            headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+        headers["content-length"] = str(end - start)
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers.raw}
+        )
+
+        extensions = scope.get("extensions") or {}
+        if scope["method"] == "HEAD" or start == end:
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.zerocopy" in extensions:
+            file = await run_in_threadpool(open, self.path, "rb")
+            try:
+                await send(
+                    {
+                        "type": "http.response.zerocopy",
+                        "file": file,
+                        "offset": start,
+                        "count": end - start,
+                    }
+                )
+            finally:
+                await run_in_threadpool(file.close)
+        elif "http.response.pathsend" in extensions and status == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            await self.stream_file(send, start, end)
+
+    async def stream_file(self, send: Send, start: int, end: int) -> None:
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    # The file was truncated while we were sending it
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,221 @@
+"""
+Sliding-window rate limits for the credential endpoints.
+
+Each limit counts events per key (client IP, email...) in fixed windows and
+estimates the count over the last window by weighting the previous window
+with the part of it that still overlaps, which needs two counters per key
+instead of one timestamp per event. Limits are checked before any password
+hashing, so a blocked client costs us a dictionary lookup, not a bcrypt round.
+
+The counts live in process memory by default. With several workers or
+instances, use the Redis backend so they are shared.
+"""
+
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_CHECKS
+
+# redis is optional, install it with: uv sync --extra redis
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def counts(self, key: str, window: int, now: float) -> tuple[int, int]:
+        """
+        Events for key in the previous and the current window.
+        """
+
+    @abstractmethod
+    def add(self, key: str, window: int, now: float) -> None:
+        """
+        Count an event for key in the current window.
+        """
+
+    @abstractmethod
+    def reset(self, key: str, window: int, now: float) -> None:
+        """
+        Forget the events counted for key.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Forget every count.
+        """
+
+
+class MemoryBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [window, window index, current count, previous count]
+        self._entries: dict[str, list[int]] = {}
+
+    def _roll(self, entry: list[int], index: int) -> None:
+        if entry[1] == index:
+            return
+        entry[3] = entry[2] if entry[1] == index - 1 else 0
+        entry[2] = 0
+        entry[1] = index
+
+    def counts(self, key: str, window: int, now: float) -> tuple[int, int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0, 0
+            self._roll(entry, int(now // window))
+            return entry[3], entry[2]
+
+    def add(self, key: str, window: int, now: float) -> None:
+        index = int(now // window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_keys:
+                    self._prune(now)
+                entry = self._entries[key] = [window, index, 0, 0]
+            self._roll(entry, index)
+            entry[2] += 1
+
+    def _prune(self, now: float) -> None:
+        # Keys idle for two windows count nothing anymore
+        stale = [
+            key
+            for key, (window, index, _, _) in self._entries.items()
+            if int(now // window) - index > 1
+        ]
+        for key in stale:
+            del self._entries[key]
+        if len(self._entries) >= self.max_keys:
+            # Still full, e.g. under a spray of spoofed keys, forget the oldest
+            for key in list(self._entries)[: len(self._entries) // 10 or 1]:
+                del self._entries[key]
+
+    def reset(self, key: str, window: int, now: float) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend(RateLimitBackend):
+    def __init__(self, url: str, prefix: str = "ratelimit:") -> None:
+        if redis is None:
+            raise RuntimeError(
+                "The redis rate limit backend needs redis: uv sync --extra redis"
+            )
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, key: str, index: int) -> str:
+        return f"{self.prefix}{key}:{index}"
+
+    def counts(self, key: str, window: int, now: float) -> tuple[int, int]:
+        index = int(now // window)
+        previous, current = self.client.mget(
+            self._key(key, index - 1), self._key(key, index)
+        )
+        return int(previous or 0), int(current or 0)
+
+    def add(self, key: str, window: int, now: float) -> None:
+        redis_key = self._key(key, int(now // window))
+        pipeline = self.client.pipeline()
+        pipeline.incr(redis_key)
+        # Kept while it is the current or the previous window
+        pipeline.expire(redis_key, window * 2)
+        pipeline.execute()
+
+    def reset(self, key: str, window: int, now: float) -> None:
+        # Only the current and the previous window count, older keys expired
+        index = int(now // window)
+        self.client.delete(self._key(key, index - 1), self._key(key, index))
+
+    def clear(self) -> None:
+        for redis_key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(redis_key)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, backend: RateLimitBackend | None = None) -> None:
+        self._backend = backend
+        self._lock = threading.Lock()
+        # (scope, "allowed" | "rejected") -> number of checks
+        self.stats: Counter[tuple[str, str]] = Counter()
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        if self._backend is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                assert settings.RATE_LIMIT_REDIS_URL
+                self._backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+            else:
+                self._backend = MemoryBackend()
+        return self._backend
+
+    def retry_after(
+        self, scope: str, key: str, *, limit: int, window: int | None = None
+    ) -> int:
+        """
+        Seconds until key may be let through again, 0 if it is under the limit.
+        """
+        window = window or settings.RATE_LIMIT_WINDOW_SECONDS
+        now = time.time()
+        previous, current = self.backend.counts(f"{scope}:{key}", window, now)
+        elapsed = (now % window) / window
+        if previous * (1 - elapsed) + current < limit:
+            return 0
+        if current >= limit:
+            # Blocked for the rest of this window, then until its weight fades
+            wait = window * (1 - elapsed) + window * (1 - limit / current)
+        else:
+            # The previous window's weight has to fade below what is left
+            wait = window * (1 - (limit - current) / previous - elapsed)
+        return max(1, math.ceil(wait))
+
+    def check(
+        self, scope: str, key: str, *, limit: int, window: int | None = None
+    ) -> int:
+        """
+        Like retry_after, also counting the outcome in stats.
+        """
+        wait = self.retry_after(scope, key, limit=limit, window=window)
+        outcome = "rejected" if wait else "allowed"
+        with self._lock:
+            self.stats[scope, outcome] += 1
+        RATE_LIMIT_CHECKS.labels(scope, outcome).inc()
+        if wait:
+            logger.warning(f"Rate limit {scope} reached for {key}")
+        return wait
+
+    def hit(self, scope: str, key: str, *, window: int | None = None) -> None:
+        """
+        Count one event for key.
+        """
+        window = window or settings.RATE_LIMIT_WINDOW_SECONDS
+        self.backend.add(f"{scope}:{key}", window, time.time())
+
+    def reset(self, scope: str, key: str, *, window: int | None = None) -> None:
+        window = window or settings.RATE_LIMIT_WINDOW_SECONDS
+        self.backend.reset(f"{scope}:{key}", window, time.time())
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.stats.clear()
+
+
+rate_limiter = SlidingWindowLimiter()
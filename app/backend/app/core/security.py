@@ -1,3 +1,6 @@
+import secrets
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -5,13 +8,63 @@ import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_QUEUE
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2-cffi is optional, install it with: uv sync --extra argon2
+try:
+    import argon2  # type: ignore
+except ImportError:
+    argon2 = None
+
+
+def create_password_context(
+    scheme: str | None = None,
+    *,
+    bcrypt_rounds: int | None = None,
+    argon2_memory_cost: int | None = None,
+    argon2_time_cost: int | None = None,
+    argon2_parallelism: int | None = None,
+) -> CryptContext:
+    """
+    Context hashing with scheme and the given costs, defaulting to the settings.
+    """
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    if scheme == "argon2" and argon2 is None:
+        raise RuntimeError(
+            "argon2 password hashes need argon2-cffi: uv sync --extra argon2"
+        )
+    return CryptContext(
+        schemes=["bcrypt", "argon2"],
+        default=scheme,
+        # Hashes from the other scheme still verify and are flagged for update
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds or settings.BCRYPT_ROUNDS,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memory_cost or settings.ARGON2_MEMORY_COST,
+        argon2__time_cost=argon2_time_cost or settings.ARGON2_TIME_COST,
+        argon2__parallelism=argon2_parallelism or settings.ARGON2_PARALLELISM,
+    )
+
+
+pwd_context = create_password_context()
+
+# Hashing runs on its own small pool, so a burst of logins can't take every
+# request thread, and known and unknown emails wait in the same queue
+password_hasher = ThreadPoolExecutor(
+    settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 
 ALGORITHM = "HS256"
 
 
+def password_hash_queue_depth() -> int:
+    """
+    Hash and verify calls waiting for a free password_hasher thread.
+    """
+    return password_hasher._work_queue.qsize()
+
+
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode = {"exp": expire, "sub": str(subject)}
@@ -19,9 +72,43 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+def _run_hasher(function: Callable[..., Any], *args: Any) -> Any:
+    future = password_hasher.submit(function, *args)
+    PASSWORD_HASH_QUEUE.set(password_hash_queue_depth())
+    try:
+        return future.result()
+    finally:
+        PASSWORD_HASH_QUEUE.set(password_hash_queue_depth())
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return bool(_run_hasher(pwd_context.verify, plain_password, hashed_password))
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return str(_run_hasher(pwd_context.hash, password))
+
+
+def password_needs_update(hashed_password: str) -> bool:
+    """
+    Whether the hash was made with another scheme or other costs than the settings.
+    """
+    return bool(pwd_context.needs_update(hashed_password))
+
+
+# Hashed on the password_hasher as soon as the module is imported, so no
+# login pays for it and every unknown email takes the same time
+_dummy_password_hash = password_hasher.submit(
+    pwd_context.hash, secrets.token_urlsafe(32)
+)
+
+
+def get_dummy_password_hash() -> str:
+    return str(_dummy_password_hash.result())
+
+
+def verify_dummy_password(plain_password: str) -> None:
+    """
+    Same work as verify_password, for logins with no matching user.
+    """
+    verify_password(plain_password, get_dummy_password_hash())
@@ -1,10 +1,29 @@
 import uuid
-from typing import Any
+from collections.abc import Iterable
+from typing import Any, TypeVar
 
-from sqlmodel import Session, select, desc
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, col, delete, desc, func, select, update
+from sqlmodel.sql.expression import Select, SelectOfScalar
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, ItemUpdate, User, UserCreate, UserUpdate, Tag, TagCreate, TagUpdate, ItemTag
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_dummy_password, verify_password
+from app.known_emails import known_emails
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemTag,
+    ItemUpdate,
+    Tag,
+    TagCreate,
+    TagPublic,
+    TagUpdate,
+    User,
+    UserCreate,
+    UserUpdate,
+)
+
+ItemSelect = TypeVar("ItemSelect", Select[Any], SelectOfScalar[Item])
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -44,14 +63,61 @@ def get_user_by_email(*, session: Session, email: str) -> User | None:
 
 
 def authenticate(*, session: Session, email: str, password: str) -> User | None:
+    # Unknown emails pay the same bcrypt cost as a wrong password, so the
+    # response time doesn't tell which emails have an account
+    if settings.USER_EMAIL_FILTER_ENABLED and not known_emails.might_exist(email):
+        verify_dummy_password(password)
+        return None
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
+        verify_dummy_password(password)
         return None
     if not verify_password(password, db_user.hashed_password):
         return None
     return db_user
 
 
+def upgrade_password_hash(
+    *, session: Session, user_id: str, password: str, hashed_password: str
+) -> bool:
+    """
+    Rehash the password with the current settings, unless it changed meanwhile.
+    """
+    result = session.execute(
+        update(User)
+        .where(col(User.id) == user_id, col(User.hashed_password) == hashed_password)
+        .values(hashed_password=get_password_hash(password))
+    )
+    session.commit()
+    rowcount: int = result.rowcount  # type: ignore[attr-defined]
+    return rowcount == 1
+
+
+def _adjust_tag_item_counts(
+    *, session: Session, tag_ids: Iterable[str], delta: int
+) -> None:
+    # Counters are bumped in SQL so concurrent writers don't lose updates,
+    # and the change is committed together with the ItemTag rows.
+    tag_ids = list(tag_ids)
+    if not tag_ids or not delta:
+        return
+    statement = (
+        update(Tag)
+        .where(col(Tag.id).in_(tag_ids))
+        .values(item_count=Tag.item_count + delta)
+    )
+    session.exec(statement)
+
+
+def _existing_tag_ids(*, session: Session, tag_ids: Iterable[str]) -> list[str]:
+    # Preserve the requested order, drop duplicates and unknown tags
+    requested = list(dict.fromkeys(tag_ids))
+    if not requested:
+        return []
+    found = set(session.exec(select(Tag.id).where(col(Tag.id).in_(requested))).all())
+    return [tag_id for tag_id in requested if tag_id in found]
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: str) -> Item:
     # Extract tag_ids from item_in
     tag_ids = item_in.tag_ids if item_in.tag_ids else []
@@ -65,12 +131,12 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: str) -> Item
     
     # Add tags if provided
     if tag_ids:
-        for tag_id in tag_ids:
-            # Verify tag exists
-            tag = session.get(Tag, tag_id)
-            if tag:
-                item_tag = ItemTag(item_id=db_item.id, tag_id=tag_id)
-                session.add(item_tag)
+        # Verify tags exist
+        valid_tag_ids = _existing_tag_ids(session=session, tag_ids=tag_ids)
+        for tag_id in valid_tag_ids:
+            item_tag = ItemTag(item_id=db_item.id, tag_id=tag_id)
+            session.add(item_tag)
+        _adjust_tag_item_counts(session=session, tag_ids=valid_tag_ids, delta=1)
         session.commit()
         session.refresh(db_item)
     
@@ -88,25 +154,73 @@ def update_item(*, session: Session, db_item: Item, item_in: ItemUpdate) -> Item
     
     # Update tags if provided
     if tag_ids is not None:
-        # Remove existing tag relationships
-        existing_tags = session.exec(
+        existing_links = session.exec(
             select(ItemTag).where(ItemTag.item_id == db_item.id)
         ).all()
-        for existing_tag in existing_tags:
-            session.delete(existing_tag)
-        
+        existing_tag_ids = {link.tag_id for link in existing_links}
+        new_tag_ids = _existing_tag_ids(session=session, tag_ids=tag_ids)
+
+        # Remove tag relationships that are no longer requested
+        removed_tag_ids = [
+            link.tag_id for link in existing_links if link.tag_id not in new_tag_ids
+        ]
+        for link in existing_links:
+            if link.tag_id in removed_tag_ids:
+                session.delete(link)
+
         # Add new tag relationships
-        for tag_id in tag_ids:
-            tag = session.get(Tag, tag_id)
-            if tag:
-                item_tag = ItemTag(item_id=db_item.id, tag_id=tag_id)
-                session.add(item_tag)
+        added_tag_ids = [
+            tag_id for tag_id in new_tag_ids if tag_id not in existing_tag_ids
+        ]
+        for tag_id in added_tag_ids:
+            item_tag = ItemTag(item_id=db_item.id, tag_id=tag_id)
+            session.add(item_tag)
+
+        _adjust_tag_item_counts(session=session, tag_ids=removed_tag_ids, delta=-1)
+        _adjust_tag_item_counts(session=session, tag_ids=added_tag_ids, delta=1)
     
     session.commit()
     session.refresh(db_item)
     return db_item
 
 
+def get_items_by_ids(*, session: Session, ids: Iterable[str]) -> list[Item]:
+    # One query for the items plus one for all of their tags
+    statement = (
+        select(Item)
+        .where(col(Item.id).in_(list(ids)))
+        .options(selectinload(Item.tags))  # type: ignore
+    )
+    return list(session.exec(statement).all())
+
+
+def delete_item(*, session: Session, db_item: Item) -> None:
+    tag_ids = session.exec(
+        select(ItemTag.tag_id).where(ItemTag.item_id == db_item.id)
+    ).all()
+    _adjust_tag_item_counts(session=session, tag_ids=tag_ids, delta=-1)
+    session.delete(db_item)
+    session.commit()
+
+
+def delete_items_by_owner(*, session: Session, owner_id: str) -> None:
+    """
+    Delete every item of a user and release their tag counts.
+
+    Does not commit, so the caller can delete the owner in the same transaction.
+    """
+    owned_item_ids = select(Item.id).where(Item.owner_id == owner_id)
+    tag_usage = session.exec(
+        select(ItemTag.tag_id, func.count())
+        .where(col(ItemTag.item_id).in_(owned_item_ids))
+        .group_by(ItemTag.tag_id)
+    ).all()
+    for tag_id, usage in tag_usage:
+        _adjust_tag_item_counts(session=session, tag_ids=[tag_id], delta=-usage)
+    session.exec(delete(ItemTag).where(col(ItemTag.item_id).in_(owned_item_ids)))
+    session.exec(delete(Item).where(col(Item.owner_id) == owner_id))
+
+
 # Tag CRUD operations
 def create_tag(*, session: Session, tag_in: TagCreate) -> Tag:
     db_tag = Tag.model_validate(tag_in)
@@ -148,14 +262,121 @@ def delete_tag(*, session: Session, tag_id: str) -> bool:
     return True
 
 
-def get_items_by_tag(*, session: Session, tag_id: str, skip: int = 0, limit: int = 100) -> list[Item]:
+def get_popular_tags(*, session: Session, limit: int = 20) -> list[Tag]:
     statement = (
-        select(Item)
-        .join(ItemTag)
-        .where(ItemTag.item_id == Item.id)
+        select(Tag).order_by(desc(Tag.item_count), Tag.name).limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def recount_tag_item_counts(*, session: Session) -> int:
+    """
+    Recompute every tag's item_count from the itemtag table in one statement.
+
+    Returns the number of tags updated.
+    """
+    usage = (
+        select(func.count())
+        .select_from(ItemTag)
+        .where(ItemTag.tag_id == Tag.id)
+        .scalar_subquery()
+    )
+    result = session.exec(update(Tag).values(item_count=usage))
+    session.commit()
+    return int(result.rowcount)
+
+
+def filter_items(
+    statement: ItemSelect, *, owner_id: str | None, skip: int, limit: int
+) -> ItemSelect:
+    """
+    Restrict an item statement to an owner, unless None, newest first.
+    """
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    return statement.order_by(desc(Item.created_at)).offset(skip).limit(limit)
+
+
+def _filter_items_by_tag(
+    statement: ItemSelect, *, tag_id: str, skip: int, limit: int
+) -> ItemSelect:
+    return (
+        statement.join(ItemTag, col(ItemTag.item_id) == Item.id)
         .where(ItemTag.tag_id == tag_id)
         .order_by(desc(Item.created_at))
         .offset(skip)
         .limit(limit)
     )
+
+
+def get_items_by_tag(*, session: Session, tag_id: str, skip: int = 0, limit: int = 100) -> list[Item]:
+    statement = _filter_items_by_tag(select(Item), tag_id=tag_id, skip=skip, limit=limit)
     return list(session.exec(statement).all())
+
+
+# Sparse fieldsets: select only the requested columns and return plain dicts,
+# skipping ORM object hydration for fields the client didn't ask for
+def select_item_fields(fields: list[str]) -> Select[Any]:
+    # "tags" is not a column, it is loaded separately and keyed by "id".
+    # Select rather than select() so a single column still yields rows.
+    names = [name for name in dict.fromkeys(["id", *fields]) if name != "tags"]
+    return Select(*[getattr(Item, name) for name in names])
+
+
+def get_tags_by_item_ids(
+    *, session: Session, item_ids: list[str]
+) -> dict[str, list[Tag]]:
+    tags_by_item: dict[str, list[Tag]] = {item_id: [] for item_id in item_ids}
+    if not item_ids:
+        return tags_by_item
+    statement = (
+        select(ItemTag.item_id, Tag)
+        .join(Tag, col(Tag.id) == ItemTag.tag_id)
+        .where(col(ItemTag.item_id).in_(item_ids))
+        .order_by(Tag.name)
+    )
+    for item_id, tag in session.exec(statement).all():
+        tags_by_item[item_id].append(tag)
+    return tags_by_item
+
+
+def get_item_rows(
+    *, session: Session, statement: Select[Any], fields: list[str]
+) -> list[dict[str, Any]]:
+    """
+    Run a statement built from select_item_fields and shape its rows.
+    """
+    keys = statement.selected_columns.keys()
+    rows = [dict(zip(keys, row, strict=True)) for row in session.exec(statement).all()]
+    tags_by_item = (
+        get_tags_by_item_ids(session=session, item_ids=[row["id"] for row in rows])
+        if "tags" in fields
+        else {}
+    )
+    return [
+        {
+            name: [TagPublic.model_validate(tag) for tag in tags_by_item[row["id"]]]
+            if name == "tags"
+            else row[name]
+            for name in fields
+        }
+        for row in rows
+    ]
+
+
+def get_item_rows_by_tag(
+    *, session: Session, tag_id: str, fields: list[str], skip: int = 0, limit: int = 100
+) -> list[dict[str, Any]]:
+    statement = _filter_items_by_tag(
+        select_item_fields(fields), tag_id=tag_id, skip=skip, limit=limit
+    )
+    return get_item_rows(session=session, statement=statement, fields=fields)
+
+
+def get_tag_rows(
+    *, session: Session, fields: list[str], skip: int = 0, limit: int = 100
+) -> list[dict[str, Any]]:
+    statement: Select[Any] = Select(*[getattr(Tag, name) for name in fields])
+    statement = statement.order_by(Tag.name).offset(skip).limit(limit)
+    keys = statement.selected_columns.keys()
+    return [dict(zip(keys, row, strict=True)) for row in session.exec(statement).all()]
@@ -0,0 +1,274 @@
+"""
+Batch emails to many users, e.g. announcements.
+
+Each batch runs in its own thread. Recipients are read from the user table
+in id order, one page at a time, rendered with the compiled template cache
+and sent by a small pool of threads that each keep an SMTP connection open.
+Progress is saved after every page, so the status can be polled and a batch
+interrupted by a restart resumes where it stopped.
+
+Every worker process resumes batches when it starts, so a batch is claimed
+with a lease first: only the process that wins the compare-and-set sends it,
+renewing the lease with every page. A batch whose lease ran out belonged to
+a process that died and is taken over by the next one to resume it.
+"""
+
+import datetime
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from sqlalchemy import ColumnElement, Row, or_, update
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.email_queue import default_smtp_backend
+from app.models import EmailBatch, EmailBatchRecipients, User
+from app.utils import get_email_template_environment, send_email
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def recipient_filters(recipients: EmailBatchRecipients) -> list[ColumnElement[bool]]:
+    """
+    The WHERE clauses selecting the users the batch is sent to.
+    """
+    filters = []
+    if recipients.is_active is not None:
+        filters.append(col(User.is_active) == recipients.is_active)
+    if recipients.is_superuser is not None:
+        filters.append(col(User.is_superuser) == recipients.is_superuser)
+    if recipients.email_domain:
+        domain = recipients.email_domain.lower()
+        filters.append(col(User.email).endswith(f"@{domain}"))
+    if recipients.created_after:
+        filters.append(col(User.created_at) > recipients.created_after)
+    return filters
+
+
+def count_recipients(session: Session, recipients: EmailBatchRecipients) -> int:
+    statement = (
+        select(func.count()).select_from(User).where(*recipient_filters(recipients))
+    )
+    return session.exec(statement).one()
+
+
+class EmailBatchSender:
+    def __init__(
+        self,
+        *,
+        concurrency: int | None = None,
+        page_size: int | None = None,
+        lease: float = 300.0,
+        smtp_factory: Callable[[], Any] = default_smtp_backend,
+        send: Callable[..., Any] = send_email,
+    ) -> None:
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._smtp_factory = smtp_factory
+        self._send = send
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: dict[str, threading.Thread] = {}
+
+    def start(self, batch_id: str) -> bool:
+        """
+        Run a batch in the background, returns False if it is already running.
+        """
+        with self._lock:
+            thread = self._threads.get(batch_id)
+            if thread is not None and thread.is_alive():
+                return False
+            self._stop.clear()
+            thread = threading.Thread(
+                target=self.run,
+                args=(batch_id,),
+                name=f"email-batch-{batch_id}",
+                daemon=True,
+            )
+            self._threads[batch_id] = thread
+        thread.start()
+        return True
+
+    def resume(self) -> int:
+        """
+        Start every batch that has not completed, e.g. after a restart. Those
+        leased by another process are skipped when they are claimed.
+        """
+        with Session(engine) as session:
+            batch_ids = session.exec(
+                select(EmailBatch.id).where(
+                    col(EmailBatch.status).in_(["pending", "running"])
+                )
+            ).all()
+        return sum(self.start(batch_id) for batch_id in batch_ids)
+
+    def claim(self, batch_id: str) -> EmailBatch | None:
+        """
+        Take a pending batch, or a running one whose lease ran out.
+        """
+        now = _now()
+        with Session(engine) as session:
+            # Only one process wins the compare-and-set on status and lease
+            result = session.execute(
+                update(EmailBatch)
+                .where(
+                    col(EmailBatch.id) == batch_id,
+                    or_(
+                        col(EmailBatch.status) == "pending",
+                        (col(EmailBatch.status) == "running")
+                        & or_(
+                            col(EmailBatch.lease_expires_at).is_(None),
+                            col(EmailBatch.lease_expires_at) < now,
+                        ),
+                    ),
+                )
+                .values(
+                    status="running",
+                    owner=self.owner,
+                    lease_expires_at=now + datetime.timedelta(seconds=self.lease),
+                    started_at=func.coalesce(EmailBatch.started_at, now),
+                )
+            )
+            session.commit()
+            if result.rowcount != 1:  # type: ignore[attr-defined]
+                return None
+            batch = session.get_one(EmailBatch, batch_id)
+            session.expunge(batch)
+            return batch
+
+    def _next_page(self, batch: EmailBatch) -> list[Row[Any]]:
+        """
+        The next recipients after the batch's cursor, in id order.
+        """
+        page_size = self.page_size or settings.EMAIL_BATCH_PAGE_SIZE
+        recipients = EmailBatchRecipients.model_validate(batch.recipients)
+        statement = select(User.id, User.email, User.full_name).where(
+            *recipient_filters(recipients)
+        )
+        if batch.cursor is not None:
+            statement = statement.where(col(User.id) > batch.cursor)
+        statement = statement.order_by(col(User.id)).limit(page_size)
+        with Session(engine) as session:
+            return list(session.execute(statement))
+
+    def run(self, batch_id: str) -> None:
+        batch = self.claim(batch_id)
+        if batch is None:
+            # Completed, or being sent by another process
+            return
+
+        template = get_email_template_environment().get_template(batch.template_name)
+        local = threading.local()
+        connections: list[Any] = []
+
+        def send_one(recipient: Row[Any]) -> bool:
+            smtp = getattr(local, "smtp", None)
+            if smtp is None:
+                smtp = local.smtp = self._smtp_factory()
+                connections.append(smtp)
+            html_content = template.render(
+                {
+                    "project_name": settings.PROJECT_NAME,
+                    "email": recipient.email,
+                    "username": recipient.email,
+                    "full_name": recipient.full_name or "",
+                    "link": settings.FRONTEND_HOST,
+                    **batch.context,
+                }
+            )
+            try:
+                response = self._send(
+                    email_to=recipient.email,
+                    subject=batch.subject,
+                    html_content=html_content,
+                    smtp=smtp,
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Batch {batch_id} email to {recipient.email} failed: {e}"
+                )
+                smtp.close()
+                return False
+            return response is None or bool(response.success)
+
+        concurrency = self.concurrency or settings.EMAIL_BATCH_CONCURRENCY
+        try:
+            with ThreadPoolExecutor(
+                concurrency, thread_name_prefix="email-batch"
+            ) as pool:
+                while not self._stop.is_set():
+                    page = self._next_page(batch)
+                    if not page:
+                        break
+                    results = list(pool.map(send_one, page))
+                    batch.sent += sum(results)
+                    batch.failed += len(results) - sum(results)
+                    batch.cursor = page[-1].id
+                    if not self._save(batch):
+                        logger.warning(f"Batch {batch_id} lease was lost, stopping")
+                        return
+                else:
+                    # Stopped, released so the next process resumes it from the cursor
+                    self._save(batch, release=True)
+                    return
+            batch.status = "completed"
+            batch.finished_at = _now()
+            self._save(batch, release=True)
+        except Exception:
+            logger.exception(f"Batch {batch_id} stopped")
+        finally:
+            for smtp in connections:
+                smtp.close()
+
+    def _save(self, batch: EmailBatch, *, release: bool = False) -> bool:
+        """
+        Save the batch's progress and renew its lease, False if it was lost.
+        """
+        now = _now()
+        lease_expires_at = (
+            now if release else now + datetime.timedelta(seconds=self.lease)
+        )
+        with Session(engine) as session:
+            result = session.execute(
+                update(EmailBatch)
+                .where(
+                    col(EmailBatch.id) == batch.id, col(EmailBatch.owner) == self.owner
+                )
+                .values(
+                    status=batch.status,
+                    sent=batch.sent,
+                    failed=batch.failed,
+                    cursor=batch.cursor,
+                    finished_at=batch.finished_at,
+                    lease_expires_at=lease_expires_at,
+                )
+            )
+            session.commit()
+        rowcount: int = result.rowcount  # type: ignore[attr-defined]
+        return rowcount == 1
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop the running batches after the page being sent.
+        """
+        with self._lock:
+            self._stop.set()
+            for thread in self._threads.values():
+                thread.join(timeout)
+            self._threads.clear()
+
+
+email_batch_sender = EmailBatchSender()
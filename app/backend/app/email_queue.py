@@ -0,0 +1,238 @@
+"""
+Outgoing email queue.
+
+Routes store their emails as EmailJob rows and return right away. Worker
+threads claim due jobs, send them over an SMTP connection they keep open
+between messages, and retry failures with exponential backoff. Jobs live in
+the database, so they survive restarts, and a job whose worker died while
+sending it is taken over once its lease runs out.
+"""
+
+import datetime
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import update
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import EmailJob
+from app.utils import get_smtp_options, send_email
+
+if TYPE_CHECKING:
+    from emails.backend.smtp import SMTPBackend  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def default_smtp_backend() -> "SMTPBackend":
+    from emails.backend.smtp import SMTPBackend  # type: ignore
+
+    return SMTPBackend(**get_smtp_options())
+
+
+class EmailQueue:
+    def __init__(
+        self,
+        *,
+        workers: int | None = None,
+        max_attempts: int | None = None,
+        retry_delay: float | None = None,
+        poll_interval: float = 5.0,
+        lease: float = 300.0,
+        smtp_idle_timeout: float = 30.0,
+        smtp_factory: Callable[[], Any] = default_smtp_backend,
+        send: Callable[..., Any] = send_email,
+    ) -> None:
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.smtp_idle_timeout = smtp_idle_timeout
+        self._smtp_factory = smtp_factory
+        self._send = send
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def enqueue(self, *, email_to: str, subject: str, html_content: str) -> str:
+        """
+        Store an email to be sent by the workers, returns the job id.
+        """
+        assert settings.emails_enabled, "no provided configuration for email variables"
+        with Session(engine) as session:
+            job = EmailJob(
+                email_to=email_to, subject=subject, html_content=html_content
+            )
+            session.add(job)
+            session.commit()
+            job_id = job.id
+        self._wake.set()
+        return job_id
+
+    def claim(self) -> EmailJob | None:
+        """
+        Take the next due job, marking it as being sent for the lease duration.
+        """
+        now = _now()
+        with Session(engine) as session:
+            # Plain rows, so the values compared below are the ones read here
+            # and not reloaded after another worker's claim was committed
+            candidates = session.exec(
+                select(EmailJob.id, EmailJob.status, EmailJob.next_attempt_at)
+                # "sending" jobs past their lease belong to a worker that died
+                .where(col(EmailJob.status).in_(["pending", "sending"]))
+                .where(EmailJob.next_attempt_at <= now)
+                .order_by(col(EmailJob.next_attempt_at))
+                .limit(5)
+            ).all()
+            for job_id, status, next_attempt_at in candidates:
+                # Only one worker wins the compare-and-set on status and lease
+                result = session.execute(
+                    update(EmailJob)
+                    .where(
+                        col(EmailJob.id) == job_id,
+                        col(EmailJob.status) == status,
+                        col(EmailJob.next_attempt_at) == next_attempt_at,
+                    )
+                    .values(
+                        status="sending",
+                        attempts=EmailJob.attempts + 1,
+                        next_attempt_at=now + datetime.timedelta(seconds=self.lease),
+                    )
+                )
+                session.commit()
+                if result.rowcount == 1:  # type: ignore[attr-defined]
+                    job = session.get_one(EmailJob, job_id)
+                    session.expunge(job)
+                    return job
+        return None
+
+    def deliver(self, job: EmailJob, smtp: Any) -> str | None:
+        """
+        Send a claimed job, returns the error if it failed.
+        """
+        try:
+            response = self._send(
+                email_to=job.email_to,
+                subject=job.subject,
+                html_content=job.html_content,
+                smtp=smtp,
+            )
+        except Exception as e:
+            return str(e) or type(e).__name__
+        if response is not None and not response.success:
+            return str(response.error or response.status_text or "Email not accepted")
+        return None
+
+    def complete(self, job: EmailJob, error: str | None) -> None:
+        max_attempts = self.max_attempts
+        if max_attempts is None:
+            max_attempts = settings.EMAIL_MAX_ATTEMPTS
+        values: dict[str, Any]
+        if error is None:
+            # The body may hold reset links or passwords, keep it only until sent
+            values = {"status": "sent", "sent_at": _now(), "html_content": ""}
+        elif job.attempts >= max_attempts:
+            logger.error(f"Email {job.id} failed {job.attempts} times: {error}")
+            values = {
+                "status": "failed",
+                "last_error": error[:1024],
+                "html_content": "",
+            }
+        else:
+            retry_delay = self.retry_delay
+            if retry_delay is None:
+                retry_delay = settings.EMAIL_RETRY_DELAY
+            delay = retry_delay * 2 ** (job.attempts - 1)
+            logger.warning(f"Email {job.id} failed, retrying in {delay}s: {error}")
+            values = {
+                "status": "pending",
+                "last_error": error[:1024],
+                "next_attempt_at": _now() + datetime.timedelta(seconds=delay),
+            }
+        with Session(engine) as session:
+            # Left alone if the lease ran out and another worker took it over
+            session.execute(
+                update(EmailJob)
+                .where(
+                    col(EmailJob.id) == job.id,
+                    col(EmailJob.status) == "sending",
+                    col(EmailJob.attempts) == job.attempts,
+                )
+                .values(**values)
+            )
+            session.commit()
+
+    def process_next(self, smtp: Any) -> bool:
+        """
+        Send the next due job over smtp, returns False if there was none.
+        """
+        job = self.claim()
+        if job is None:
+            return False
+        error = self.deliver(job, smtp)
+        if error is not None and hasattr(smtp, "close"):
+            # Start over with a fresh connection for the next message
+            smtp.close()
+        self.complete(job, error)
+        return True
+
+    def _run(self) -> None:
+        # Each worker keeps its own connection, opened on first use
+        smtp = self._smtp_factory()
+        last_sent = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                # Cleared before looking for work, so no enqueue is missed
+                self._wake.clear()
+                try:
+                    sent = self.process_next(smtp)
+                except Exception:
+                    logger.exception("Email worker failed")
+                    sent = False
+                if sent:
+                    last_sent = time.monotonic()
+                    continue
+                if time.monotonic() - last_sent > self.smtp_idle_timeout:
+                    smtp.close()
+                if not self._stop.is_set():
+                    self._wake.wait(self.poll_interval)
+        finally:
+            smtp.close()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers or settings.EMAIL_WORKERS):
+                thread = threading.Thread(
+                    target=self._run, name=f"email-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop the workers, a message being sent is finished first.
+        """
+        with self._lock:
+            self._stop.set()
+            self._wake.set()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads.clear()
+
+
+email_queue = EmailQueue()
@@ -0,0 +1,29 @@
+"""
+Write the OpenAPI schema to a JSON file.
+
+By default it writes app/openapi.json, which the API serves instead of
+generating the schema in each worker. Pass --output to write it elsewhere,
+e.g. for client generation.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from app.core.openapi import OPENAPI_ARTIFACT_PATH, write_openapi_artifact
+from app.main import app
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", type=Path, default=OPENAPI_ARTIFACT_PATH)
+    args = parser.parse_args()
+    path = write_openapi_artifact(app, args.output)
+    logger.info(f"OpenAPI schema written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Readiness of a worker, for load balancer and orchestrator probes.
+
+A worker is ready once its warmup is done, while a database round trip stays
+under HEALTH_DB_MAX_LATENCY_MS and while its connection pool and password
+hashing queue have room, so a saturated worker is drained instead of being
+sent more requests. The report is reused for HEALTH_CACHE_SECONDS, so
+frequent probes from several balancers cost one check.
+"""
+
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import record_cache
+from app.core.security import password_hash_queue_depth
+from app.models import HealthCheck, HealthReport
+from app.warmup import warmup
+
+logger = logging.getLogger(__name__)
+
+
+def pool_saturation() -> float:
+    """
+    Share of the pool's connections, overflow included, that are checked out.
+    """
+    pool = engine.pool
+    size = getattr(pool, "size", None)
+    if not callable(size):
+        # e.g. NullPool or StaticPool, nothing to run out of
+        return 0.0
+    capacity = size() + max(getattr(pool, "_max_overflow", 0), 0)
+    return pool.checkedout() / capacity if capacity else 0.0  # type: ignore[attr-defined]
+
+
+def check_warmup() -> HealthCheck:
+    if not settings.WARMUP_ENABLED or warmup.done.is_set():
+        return HealthCheck(ok=True, value=round(sum(warmup.timings.values()), 3))
+    return HealthCheck(ok=False, detail="Warming up")
+
+
+def check_pool() -> HealthCheck:
+    saturation = pool_saturation()
+    return HealthCheck(
+        ok=saturation < settings.HEALTH_POOL_MAX_SATURATION, value=round(saturation, 3)
+    )
+
+
+def check_database() -> HealthCheck:
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Health check database query failed: {e}")
+        return HealthCheck(ok=False, detail=type(e).__name__)
+    latency_ms = (time.perf_counter() - start) * 1000
+    return HealthCheck(
+        ok=latency_ms <= settings.HEALTH_DB_MAX_LATENCY_MS, value=round(latency_ms, 2)
+    )
+
+
+def check_password_hasher() -> HealthCheck:
+    depth = password_hash_queue_depth()
+    return HealthCheck(ok=depth <= settings.HEALTH_PASSWORD_HASH_MAX_QUEUE, value=depth)
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._report: HealthReport | None = None
+        self._checked_at = 0.0
+
+    def check(self) -> HealthReport:
+        checks = {
+            "warmup": check_warmup(),
+            "pool": check_pool(),
+            "password_hasher": check_password_hasher(),
+        }
+        if checks["pool"].ok:
+            checks["database"] = check_database()
+        else:
+            # Waiting for a connection would hang the probe until the pool timeout
+            checks["database"] = HealthCheck(ok=False, detail="Pool saturated")
+        ok = all(check.ok for check in checks.values())
+        return HealthReport(status="ok" if ok else "unavailable", checks=checks)
+
+    def get(self) -> HealthReport:
+        """
+        The last report if it is recent enough, else a new one.
+        """
+        # Concurrent probes wait for the one running the checks
+        with self._lock:
+            now = time.monotonic()
+            stale = (
+                self._report is None
+                or now - self._checked_at >= settings.HEALTH_CACHE_SECONDS
+            )
+            record_cache("health_readiness", not stale)
+            if stale:
+                self._report = self.check()
+                self._checked_at = now
+            assert self._report is not None
+            return self._report
+
+    def clear(self) -> None:
+        with self._lock:
+            self._report = None
+
+
+readiness = Readiness()
@@ -0,0 +1,266 @@
+"""
+Resized image variants for item images, with an LRU disk cache.
+
+Variants are generated on first request and stored under
+MEDIA_ROOT/cache/images, named after a hash of the source and the requested
+size and format. A cache hit bumps the file's mtime, and when the cache grows
+past IMAGE_CACHE_MAX_BYTES the least recently used files are removed.
+"""
+
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from app import media, storage
+from app.core.config import settings
+from app.core.metrics import record_cache
+
+# Pillow is optional, install it with: uv sync --extra images
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None  # type: ignore
+    ImageOps = None  # type: ignore
+
+if TYPE_CHECKING:
+    import httpx
+
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+
+
+class ImageUnavailable(Exception):
+    pass
+
+
+def images_enabled() -> bool:
+    return Image is not None
+
+
+def _media_key(image_url: str) -> str | None:
+    prefix = media.media_url("")
+    if image_url.startswith(prefix):
+        return image_url.removeprefix(prefix)
+    return None
+
+
+def get_source_version(image_url: str) -> str:
+    """
+    Cheap version string of the source image, part of the cache key.
+    """
+    key = _media_key(image_url)
+    if key is not None:
+        try:
+            return storage.get_storage().stat(key).etag
+        except (storage.ObjectNotFound, ValueError):
+            raise ImageUnavailable("Image file is missing")
+    if image_url.startswith(("http://", "https://")):
+        # Remote images are treated as immutable per URL
+        return ""
+    # e.g. file:// URIs that only exist on the device that created the item
+    raise ImageUnavailable("Image is not stored on the server")
+
+
+def read_source_image(image_url: str) -> bytes:
+    key = _media_key(image_url)
+    if key is not None:
+        backend = storage.get_storage()
+        try:
+            if backend.stat(key).size > settings.IMAGE_MAX_SOURCE_BYTES:
+                raise ImageUnavailable("Image is too large")
+            return b"".join(backend.get_range(key))
+        except storage.ObjectNotFound:
+            raise ImageUnavailable("Image file is missing")
+    # Only needed for remote images, httpx is slow to import
+    import httpx
+
+    try:
+        with _http_client() as client:
+            for _ in range(settings.IMAGE_MAX_REDIRECTS + 1):
+                check_remote_url(image_url)
+                # Redirects are followed here, every hop is checked
+                with client.stream("GET", image_url) as response:
+                    if response.is_redirect:
+                        image_url = str(response.url.join(response.headers["location"]))
+                        continue
+                    response.raise_for_status()
+                    data = bytearray()
+                    for chunk in response.iter_bytes():
+                        data += chunk
+                        if len(data) > settings.IMAGE_MAX_SOURCE_BYTES:
+                            raise ImageUnavailable("Image is too large")
+                    return bytes(data)
+    except httpx.HTTPError as e:
+        raise ImageUnavailable(f"Could not fetch image: {e}")
+    raise ImageUnavailable("Too many redirects")
+
+
+def _http_client() -> "httpx.Client":
+    import httpx
+
+    return httpx.Client(follow_redirects=False, timeout=10)
+
+
+def check_remote_url(url: str) -> None:
+    """
+    Refuse URLs the server must not fetch for a user, e.g. the cloud metadata
+    service or anything else on a private network. The host is resolved
+    again to connect, set IMAGE_REMOTE_HOSTS to also rule out DNS rebinding.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if parts.scheme not in ("http", "https") or not host:
+        raise ImageUnavailable("Image URL is not supported")
+    if settings.IMAGE_REMOTE_HOSTS and host.lower() not in (
+        allowed.lower() for allowed in settings.IMAGE_REMOTE_HOSTS
+    ):
+        raise ImageUnavailable("Image host is not allowed")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError):
+        raise ImageUnavailable("Image host could not be resolved")
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # Loopback, private, link-local and reserved ranges are not global
+        if not address.is_global:
+            raise ImageUnavailable("Image host is not allowed")
+
+
+def resize_image(
+    data: bytes, *, width: int | None, height: int | None, fmt: str
+) -> bytes:
+    pil_format, _ = IMAGE_FORMATS[fmt]
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        # Fit inside the requested box, keeping the aspect ratio, never upscaling
+        image.thumbnail((width or image.width, height or image.height))
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format=pil_format, quality=80)
+    return output.getvalue()
+
+
+class ImageCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Estimated size on disk, rescanned whenever it passes max_bytes
+        self._size: int | None = None
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.root / key[:2] / f"{key}.{fmt}"
+
+    def get(self, key: str, fmt: str) -> Path | None:
+        path = self.path_for(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            record_cache("image_variants", False)
+            return None
+        record_cache("image_variants", True)
+        return path
+
+    def put(self, key: str, fmt: str, data: bytes) -> Path:
+        path = self.path_for(key, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """
+        (mtime, size, path) of every cached file.
+        """
+        if not self.root.exists():
+            return []
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        # Other workers share the directory, so start from what is on disk
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+
+def get_image_variant(
+    cache: ImageCache,
+    image_url: str,
+    *,
+    width: int | None,
+    height: int | None,
+    fmt: str,
+) -> Path:
+    """
+    Return the path of a cached variant, generating it on a miss.
+    """
+    version = get_source_version(image_url)
+    key = hashlib.sha256(
+        f"{image_url}\0{version}\0{width}x{height}\0{fmt}".encode()
+    ).hexdigest()
+    cached = cache.get(key, fmt)
+    if cached is not None:
+        return cached
+    data = read_source_image(image_url)
+    try:
+        variant = resize_image(data, width=width, height=height, fmt=fmt)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageUnavailable(f"Could not decode image: {e}")
+    return cache.put(key, fmt, variant)
+
+
+_image_caches: dict[Path, ImageCache] = {}
+
+
+def get_image_cache() -> ImageCache:
+    root = settings.media_root_path / "cache" / "images"
+    if root not in _image_caches:
+        _image_caches[root] = ImageCache(root, settings.IMAGE_CACHE_MAX_BYTES)
+    return _image_caches[root]
@@ -0,0 +1,225 @@
+"""
+Bloom filter of the emails in the user table.
+
+Logins for an email the filter has never seen skip the user lookup, and get
+the same bcrypt work as a wrong password against a dummy hash, so credential
+stuffing with unknown emails can't tell from the response time which emails
+exist.
+
+Every email added to the user table is also logged in UserEmailChange, in
+the same transaction. Users created or renamed by this process are added to
+the filter right away, those from other workers are read from the log by id
+every USER_EMAIL_FILTER_REFRESH_SECONDS. A miss never touches the database,
+so an email added by another worker is reported unknown for at most that
+long, e.g. a login right after signing up on another worker fails. Each
+worker also rebuilds the filter from scratch every
+USER_EMAIL_FILTER_REBUILD_SECONDS to drop deleted emails. Until the first
+build, every email is looked up.
+"""
+
+import datetime
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm.attributes import get_history
+from sqlmodel import Session, col, func, select
+
+from app.core import db
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.models import User, UserEmailChange
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1024)
+        self.size = math.ceil(
+            -capacity * math.log(false_positive_rate) / math.log(2) ** 2
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> list[int]:
+        # Double hashing, two 64 bit halves of one digest give all positions
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class KnownEmails:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._filter: BloomFilter | None = None
+        # Id of the last UserEmailChange in the filter
+        self._last_change_id = 0
+        self._built_at = 0.0
+        # Added while a rebuild reads the table, replayed into the new filter
+        self._pending: list[str] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def might_exist(self, email: str) -> bool:
+        """
+        False only if no user has this email.
+        """
+        bloom = self._filter
+        if bloom is None:
+            return True
+        found = email in bloom
+        # A hit is an email known to have no user, answered without the lookup
+        record_cache("user_email_filter", not found)
+        return found
+
+    def add(self, email: str) -> None:
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(email)
+            if self._pending is not None:
+                self._pending.append(email)
+
+    def _caught_up(self, change_id: int) -> None:
+        with self._lock:
+            self._last_change_id = max(self._last_change_id, change_id)
+
+    def rebuild(self) -> int:
+        """
+        Build a new filter from the user table, returns the number of emails.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            # Read first, emails logged during the scan are read again by the
+            # next refresh at worst
+            last_change_id = latest_change_id()
+            with Session(db.engine) as session:
+                count = session.exec(select(func.count()).select_from(User)).one()
+                bloom = BloomFilter(
+                    count * 2, settings.USER_EMAIL_FILTER_FALSE_POSITIVE_RATE
+                )
+                emails = session.execute(
+                    select(User.email).execution_options(yield_per=1000)
+                ).scalars()
+                for email in emails:
+                    bloom.add(email)
+                # Every worker rebuilt since, so none still needs these
+                now = datetime.datetime.now(datetime.timezone.utc)
+                keep = datetime.timedelta(
+                    seconds=2 * settings.USER_EMAIL_FILTER_REBUILD_SECONDS
+                )
+                cutoff = now - keep
+                session.execute(
+                    delete(UserEmailChange).where(
+                        col(UserEmailChange.created_at) < cutoff
+                    )
+                )
+                session.commit()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for email in self._pending:
+                bloom.add(email)
+            self._pending = None
+            self._filter = bloom
+            self._last_change_id = last_change_id
+            self._built_at = time.monotonic()
+        return count
+
+    def refresh(self) -> None:
+        """
+        Add the emails logged since the last refresh, e.g. by other workers.
+        """
+        if self._filter is None:
+            self.rebuild()
+            return
+        with Session(db.engine) as session:
+            rows = session.exec(
+                select(UserEmailChange.id, UserEmailChange.email)
+                .where(col(UserEmailChange.id) > self._last_change_id)
+                .order_by(col(UserEmailChange.id))
+            ).all()
+        for _, email in rows:
+            self.add(email)
+        if rows:
+            self._caught_up(rows[-1][0] or 0)
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.USER_EMAIL_FILTER_REFRESH_SECONDS):
+            try:
+                if (
+                    time.monotonic() - self._built_at
+                    > settings.USER_EMAIL_FILTER_REBUILD_SECONDS
+                ):
+                    self.rebuild()
+                else:
+                    self.refresh()
+            except Exception:
+                logger.exception("Refreshing the user email filter failed")
+
+    def start(self) -> None:
+        """
+        Build the filter and keep it up to date in the background.
+        """
+        if self._thread is not None:
+            return
+        self.rebuild()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="known-emails", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+known_emails = KnownEmails()
+
+
+def latest_change_id() -> int:
+    with Session(db.engine) as session:
+        return session.exec(select(func.max(UserEmailChange.id))).one() or 0
+
+
+def log_email(connection: Any, email: str) -> None:
+    # Part of the user's transaction, so logged exactly when it is committed
+    connection.execute(
+        insert(UserEmailChange).values(
+            email=email, created_at=datetime.datetime.now(datetime.timezone.utc)
+        )
+    )
+    # Added before the commit, a rolled back email only costs a lookup
+    known_emails.add(email)
+
+
+@event.listens_for(User, "after_insert")
+def add_user_email(_mapper: Any, connection: Any, target: User) -> None:
+    log_email(connection, target.email)
+
+
+@event.listens_for(User, "after_update")
+def update_user_email(_mapper: Any, connection: Any, target: User) -> None:
+    if get_history(target, "email").has_changes():
+        log_email(connection, target.email)
@@ -1,25 +1,77 @@
-import sentry_sdk
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, mark_process_dead, metrics_endpoint
+from app.core.openapi import (
+    OPENAPI_ARTIFACT_PATH,
+    OpenAPISchema,
+    install_openapi_schema,
+)
+from app.email_batches import email_batch_sender
+from app.email_queue import email_queue
+from app.known_emails import known_emails
+from app.profiler import ProfilerMiddleware, profiler
+from app.thumbnails import thumbnail_queue
+from app.warmup import warmup
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+# Only imported when enabled, sentry_sdk slows down every worker's start
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+    import sentry_sdk
+
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.WARMUP_ENABLED:
+        warmup.start(app)
+    elif settings.USER_EMAIL_FILTER_ENABLED:
+        known_emails.start()
+    if settings.emails_enabled:
+        email_queue.start()
+        email_batch_sender.resume()
+    if settings.THUMBNAILS_ENABLED:
+        thumbnail_queue.start()
+    yield
+    warmup.shutdown()
+    profiler.shutdown()
+    known_emails.shutdown()
+    email_batch_sender.shutdown()
+    email_queue.shutdown()
+    thumbnail_queue.shutdown()
+    mark_process_dead()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
 )
 
+# Compress responses, the OpenAPI document is compressed once and kept in memory
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        content_types=settings.COMPRESSION_CONTENT_TYPES,
+        cached_paths=[app.openapi_url] if app.openapi_url else [],
+    )
+
 # Set all CORS enabled origins
 if settings.all_cors_origins:
     app.add_middleware(
@@ -30,4 +82,25 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Requests are only tracked while a superuser runs a profile
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Added last so it is outermost and times the whole response
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+# Serve the schema written by app.export_openapi at deploy time, locally it is
+# always generated from the code so it never goes stale while developing
+install_openapi_schema(
+    app,
+    OpenAPISchema(
+        app,
+        artifact_path=None
+        if settings.ENVIRONMENT == "local"
+        else OPENAPI_ARTIFACT_PATH,
+    ),
+)
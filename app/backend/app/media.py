@@ -0,0 +1,112 @@
+"""
+Local files for uploaded item media.
+
+Media is addressed by a storage key, a relative POSIX path such as
+"videos/<item_id>/<upload_id>.mp4", turned into public URLs with media_url().
+Upload parts are written here under settings.MEDIA_ROOT, finished files are
+handed to the configured backend in app.storage.
+"""
+
+import mimetypes
+import os
+from collections.abc import AsyncIterator
+from pathlib import Path, PurePosixPath
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# flock keeps two requests from appending to the same upload at once. It is not
+# available on Windows, where concurrent PATCHes are only caught by the offset check.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, offset: int) -> None:
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadLocked(Exception):
+    pass
+
+
+def media_path(key: str) -> Path:
+    """
+    Resolve a storage key to a path, refusing keys that escape MEDIA_ROOT.
+    """
+    root = settings.media_root_path.resolve()
+    path = (root / PurePosixPath(key)).resolve()
+    if not path.is_relative_to(root):
+        raise ValueError(f"Invalid media key: {key}")
+    return path
+
+
+def media_url(key: str) -> str:
+    return f"{settings.API_V1_STR}/media/files/{key}"
+
+
+def upload_part_path(upload_id: str) -> Path:
+    return media_path(f"uploads/{upload_id}.part")
+
+
+def get_upload_offset(upload_id: str) -> int:
+    try:
+        return upload_part_path(upload_id).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def create_upload_part(upload_id: str) -> None:
+    path = upload_part_path(upload_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+async def append_upload_chunk(
+    upload_id: str, *, offset: int, length: int, chunks: AsyncIterator[bytes]
+) -> int:
+    """
+    Append a request body to the upload's part file, chunk by chunk.
+
+    The offset sent by the client must match the bytes already stored. Returns
+    the new offset. Nothing is kept if the body would go past the declared length.
+    """
+    path = upload_part_path(upload_id)
+    with open(path, "ab") as part:
+        if fcntl is not None:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadLocked()
+        current = os.fstat(part.fileno()).st_size
+        if current != offset:
+            raise UploadOffsetMismatch(current)
+        written = 0
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if offset + written + len(chunk) > length:
+                part.truncate(offset)
+                raise UploadTooLarge()
+            await run_in_threadpool(part.write, chunk)
+            written += len(chunk)
+        part.flush()
+        return offset + written
+
+
+def guess_extension(filename: str | None, content_type: str | None) -> str:
+    suffix = Path(filename).suffix.lower() if filename else ""
+    if suffix and suffix[1:].isalnum() and len(suffix) <= 6:
+        return suffix
+    return (content_type and mimetypes.guess_extension(content_type)) or ".bin"
+
+
+def delete_upload_part(upload_id: str) -> None:
+    upload_part_path(upload_id).unlink(missing_ok=True)
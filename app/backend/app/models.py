@@ -1,8 +1,10 @@
 import datetime
 import re
 import uuid
+from typing import Any, Literal
 
 from pydantic import EmailStr, field_validator
+from sqlalchemy import JSON, Column
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -85,6 +87,17 @@ class User(UserBase, table=True):
     items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
 
 
+# Emails added to the user table, by insert or update, in commit order. The
+# AUTOINCREMENT id is never reused, so other workers' email filters can catch
+# up from the last id they read
+class UserEmailChange(SQLModel, table=True):
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: int | None = Field(default=None, primary_key=True)
+    email: str = Field(max_length=255)
+    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+
 # Properties to return via API, id is always required
 class UserPublic(UserBase):
     id: str
@@ -125,6 +138,8 @@ class ItemTag(SQLModel, table=True):
 # Database model for Tag
 class Tag(TagBase, table=True):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True, max_length=36)
+    # Denormalized number of items linked through ItemTag, maintained in crud
+    item_count: int = Field(default=0, index=True)
     created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
     updated_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
     items: list["Item"] = Relationship(back_populates="tags", link_model=ItemTag)
@@ -133,6 +148,7 @@ class Tag(TagBase, table=True):
 # Properties to return via API, id is always required
 class TagPublic(TagBase):
     id: str
+    item_count: int = 0
     created_at: datetime.datetime
     updated_at: datetime.datetime
 
@@ -191,6 +207,180 @@ class ItemsPublic(SQLModel):
     count: int
 
 
+# Properties to receive when fetching several items at once
+class ItemsBatchGet(SQLModel):
+    ids: list[str] = Field(min_length=1, max_length=100)
+
+
+# Per-id result of a batch get, item is only set when status is "ok"
+class ItemBatchEntry(SQLModel):
+    id: str
+    status: Literal["ok", "not_found", "forbidden"]
+    item: ItemPublic | None = None
+
+
+class ItemsBatchPublic(SQLModel):
+    data: list[ItemBatchEntry]
+    count: int
+
+
+# Resumable (tus-style) video upload for an item, the bytes received so far
+# live in a part file under MEDIA_ROOT whose size is the current offset
+class VideoUpload(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True, max_length=36)
+    item_id: str = Field(
+        foreign_key="item.id", nullable=False, ondelete="CASCADE", max_length=36, index=True
+    )
+    length: int
+    filename: str | None = Field(default=None, max_length=255)
+    content_type: str | None = Field(default=None, max_length=255)
+    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+    completed_at: datetime.datetime | None = None
+
+
+# Poster frame waiting to be extracted by app.thumbnails. While a job is
+# running, next_attempt_at is the time after which another worker may take it
+# over
+class ThumbnailJob(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True, max_length=36)
+    item_id: str = Field(
+        foreign_key="item.id", nullable=False, ondelete="CASCADE", max_length=36, index=True
+    )
+    video_key: str = Field(max_length=1024)
+    # pending, running, done or failed
+    status: str = Field(default="pending", max_length=16)
+    attempts: int = 0
+    next_attempt_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc), index=True
+    )
+    last_error: str | None = Field(default=None, max_length=1024)
+    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+
+# Outgoing email waiting to be sent by the app.email_queue workers. While a job
+# is being sent, next_attempt_at is the time after which another worker may
+# take it over
+class EmailJob(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True, max_length=36)
+    email_to: str = Field(max_length=255)
+    subject: str = Field(max_length=998)
+    html_content: str
+    # pending, sending, sent or failed
+    status: str = Field(default="pending", max_length=16)
+    attempts: int = 0
+    next_attempt_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc), index=True
+    )
+    last_error: str | None = Field(default=None, max_length=1024)
+    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+    sent_at: datetime.datetime | None = None
+
+
+# Users a batch email goes to, unset fields do not filter
+class EmailBatchRecipients(SQLModel):
+    is_active: bool | None = True
+    is_superuser: bool | None = None
+    email_domain: str | None = Field(default=None, max_length=255)
+    created_after: datetime.datetime | None = None
+
+
+# Properties to receive when emailing many users with a built template
+class EmailBatchCreate(SQLModel):
+    template_name: str = Field(max_length=255)
+    subject: str = Field(min_length=1, max_length=998)
+    # Extra template variables, on top of project_name, email and full_name
+    context: dict[str, str] = Field(default_factory=dict)
+    recipients: EmailBatchRecipients = Field(default_factory=EmailBatchRecipients)
+
+
+# Batch email job, recipients are sent to in user id order and cursor is the
+# last id handled so an interrupted batch resumes where it stopped
+class EmailBatch(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True, max_length=36)
+    template_name: str = Field(max_length=255)
+    subject: str = Field(max_length=998)
+    context: dict[str, str] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    recipients: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    # pending, running or completed
+    status: str = Field(default="pending", max_length=16)
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    cursor: str | None = Field(default=None, max_length=36)
+    # The process sending a running batch, until its lease expires
+    owner: str | None = Field(default=None, max_length=255)
+    lease_expires_at: datetime.datetime | None = None
+    created_by_id: str | None = Field(
+        default=None, foreign_key="user.id", ondelete="SET NULL", max_length=36
+    )
+    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+    started_at: datetime.datetime | None = None
+    finished_at: datetime.datetime | None = None
+
+
+class EmailBatchPublic(SQLModel):
+    id: str
+    template_name: str
+    subject: str
+    status: str
+    total: int
+    sent: int
+    failed: int
+    created_at: datetime.datetime
+    started_at: datetime.datetime | None
+    finished_at: datetime.datetime | None
+
+
+# Properties to receive when asking for a direct-to-storage video upload
+class VideoPresignRequest(SQLModel):
+    length: int = Field(ge=1)
+    content_type: str = Field(max_length=255)
+    filename: str | None = Field(default=None, max_length=255)
+
+
+# Where and how to PUT the video, then attach it with the returned key
+class VideoPresignPublic(SQLModel):
+    key: str
+    upload_url: str
+    method: str = "PUT"
+    headers: dict[str, str]
+    expires_in: int
+
+
+# Properties to receive when attaching a directly uploaded video to its item
+class VideoAttach(SQLModel):
+    key: str = Field(max_length=255)
+
+
+# Result of one /health/ready check, value is e.g. a latency or a ratio
+class HealthCheck(SQLModel):
+    ok: bool
+    value: float | None = None
+    detail: str | None = None
+
+
+class HealthReport(SQLModel):
+    status: Literal["ok", "unavailable"]
+    checks: dict[str, HealthCheck]
+
+
+class ProfileStart(SQLModel):
+    # Share of requests to profile, in percent, unless a route is given
+    percent: float = Field(default=1.0, gt=0, le=100)
+    # Route template to profile every request of, e.g. /api/v1/items/{id}
+    route: str | None = Field(default=None, max_length=255)
+    duration_seconds: float = Field(default=60.0, gt=0, le=3600)
+
+
+class ProfileStatus(SQLModel):
+    active: bool
+    percent: float | None = None
+    route: str | None = None
+    seconds_left: float = 0.0
+    requests: int = 0
+    samples: int = 0
+
+
 # Generic message
 class Message(SQLModel):
     message: str
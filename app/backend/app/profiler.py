@@ -0,0 +1,358 @@
+"""
+Sampling profiler to find where request time goes in running workers.
+
+A superuser starts a profile of a share of the requests, or of every request
+to one route, for a limited time. While a profiled request is in flight a
+background thread samples the stacks of the worker's threads every
+PROFILER_INTERVAL_MS and counts them, in the collapsed stack format read by
+flame graph tools (flamegraph.pl, inferno, speedscope). Nothing is sampled
+while no profiled request runs, otherwise the cost is a check per request.
+
+The request starting or stopping a profile lands on any worker, so the
+profile is described by a control file in PROFILER_DIR, shared by the
+workers of an instance like PROMETHEUS_MULTIPROC_DIR. Unless set, it is a
+directory in the temp directory named after the user and the process that
+started the workers, created readable by that user only. Each worker checks it
+at most every SYNC_SECONDS while it serves requests, and writes its samples
+to its own file there every FLUSH_SECONDS. A download merges the files of
+every worker.
+
+Stacks are sampled per thread, not per request: requests running on the same
+worker at the same time as a profiled one show up in its samples too. Idle
+threads, waiting on a lock, a queue or the event loop's selector, are left
+out.
+"""
+
+import functools
+import json
+import os
+import random
+import stat
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import route_template
+from app.models import ProfileStatus
+
+# Innermost frames of threads blocked waiting for work, by file and function
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+}
+
+TRUNCATED = "[truncated]"
+
+CONTROL_FILE = "control.json"
+SYNC_SECONDS = 1.0
+FLUSH_SECONDS = 1.0
+
+
+def collapse_stack(frame: FrameType) -> str:
+    """
+    The frame's stack as module:function names, outermost first.
+    """
+    names = []
+    current: FrameType | None = frame
+    while current is not None:
+        code = current.f_code
+        qualname = getattr(code, "co_qualname", code.co_name)
+        names.append(f"{current.f_globals.get('__name__', '?')}:{qualname}")
+        current = current.f_back
+    return ";".join(reversed(names))
+
+
+def is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+@functools.cache
+def default_directory() -> Path:
+    """
+    PROFILER_DIR unless set, the workers of an instance have the same parent.
+    """
+    return Path(tempfile.gettempdir()) / f"profiler-{os.getuid()}-{os.getppid()}"
+
+
+def make_directory(path: Path) -> None:
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if path != default_directory():
+        return
+    # The name is predictable in a shared directory, another user could have
+    # created it first to read the stacks or plant a control file
+    info = path.lstat()
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise RuntimeError(f"{path} must be a directory only this user can access")
+
+
+def write_json(path: Path, data: Any) -> None:
+    # Replaced in one step, other workers never read a partial file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def read_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class Profiler:
+    def __init__(self, directory: Path | None = None) -> None:
+        self._directory = directory
+        self._lock = threading.Lock()
+        # Serializes applying the control file, which may start or join threads
+        self._control_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # Requests in flight while profiling, a route only matches once routed
+        self._requests: dict[int, Scope] = {}
+        self.stacks: Counter[str] = Counter()
+        self.profile_id: str | None = None
+        self.percent: float | None = None
+        self.route: str | None = None
+        # Wall clock time, it is shared with the other workers
+        self.deadline = 0.0
+        self.requests = 0
+        self.samples = 0
+        self._control_mtime: int | None = None
+        self._next_sync = 0.0
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is not None:
+            return self._directory
+        if settings.PROFILER_DIR:
+            return Path(settings.PROFILER_DIR)
+        return default_directory()
+
+    @property
+    def active(self) -> bool:
+        return time.time() < self.deadline
+
+    def start(self, *, percent: float, route: str | None, duration: float) -> None:
+        """
+        Replace the current profile with a new one, in every worker.
+        """
+        make_directory(self.directory)
+        for path in self.directory.glob("*.stacks.json"):
+            path.unlink(missing_ok=True)
+        control = {
+            "id": uuid.uuid4().hex,
+            "percent": None if route else percent,
+            "route": route,
+            "deadline": time.time() + duration,
+        }
+        write_json(self.directory / CONTROL_FILE, control)
+        self.sync(force=True)
+
+    def stop(self) -> None:
+        """
+        Stop sampling in every worker, the stacks so far are kept.
+        """
+        control = read_json(self.directory / CONTROL_FILE)
+        if control is not None and control["deadline"] > time.time():
+            control["deadline"] = time.time()
+            write_json(self.directory / CONTROL_FILE, control)
+        self.sync(force=True)
+
+    def shutdown(self) -> None:
+        """
+        Stop sampling in this worker only, e.g. when it exits.
+        """
+        with self._control_lock:
+            self._stop_sampling()
+
+    def sync(self, *, force: bool = False) -> None:
+        """
+        Apply the control file if it changed, at most every SYNC_SECONDS.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        self._next_sync = now + SYNC_SECONDS
+        path = self.directory / CONTROL_FILE
+        try:
+            mtime: int | None = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._control_mtime and not force:
+            return
+        self._control_mtime = mtime
+        self._apply(read_json(path))
+
+    def _apply(self, control: dict[str, Any] | None) -> None:
+        with self._control_lock:
+            if control is None:
+                self.deadline = 0.0
+                self._stop_sampling()
+                return
+            if control["id"] != self.profile_id:
+                self._stop_sampling()
+                with self._lock:
+                    self.profile_id = control["id"]
+                    self.stacks = Counter()
+                    self.requests = 0
+                    self.samples = 0
+            self.percent = control["percent"]
+            self.route = control["route"]
+            self.deadline = control["deadline"]
+            if not self.active:
+                self._stop_sampling()
+            elif self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="profiler", daemon=True
+                )
+                self._thread.start()
+
+    def _stop_sampling(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+        with self._lock:
+            self._requests.clear()
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Write this worker's samples to its file in the shared directory.
+        """
+        with self._lock:
+            if self.profile_id is None:
+                return
+            data = {
+                "requests": self.requests,
+                "samples": self.samples,
+                "stacks": dict(self.stacks),
+            }
+            # The pid tells workers apart, the id profilers within a process
+            name = f"{self.profile_id}.{os.getpid()}-{id(self)}.stacks.json"
+            path = self.directory / name
+        make_directory(self.directory)
+        write_json(path, data)
+
+    def _worker_profiles(self) -> list[dict[str, Any]]:
+        self.sync(force=True)
+        self.flush()
+        if self.profile_id is None:
+            return []
+        profiles = (
+            read_json(path)
+            for path in self.directory.glob(f"{self.profile_id}.*.stacks.json")
+        )
+        return [profile for profile in profiles if profile is not None]
+
+    def status(self) -> ProfileStatus:
+        """
+        The profile's status, with the requests and samples of every worker.
+        """
+        profiles = self._worker_profiles()
+        return ProfileStatus(
+            active=self.active,
+            percent=self.percent,
+            route=self.route,
+            seconds_left=round(max(self.deadline - time.time(), 0.0), 1),
+            requests=sum(profile["requests"] for profile in profiles),
+            samples=sum(profile["samples"] for profile in profiles),
+        )
+
+    def collapsed(self) -> str:
+        """
+        The stacks sampled by every worker, in the collapsed format.
+        """
+        stacks: Counter[str] = Counter()
+        for profile in self._worker_profiles():
+            stacks.update(profile["stacks"])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def _profiled(self, scope: Scope) -> bool:
+        return self.route is None or route_template(scope) == self.route
+
+    def enter(self, scope: Scope) -> bool:
+        """
+        Track the request if it may be profiled.
+        """
+        if self.route is None and random.random() * 100 >= (self.percent or 0.0):
+            return False
+        with self._lock:
+            self._requests[id(scope)] = scope
+        return True
+
+    def exit(self, scope: Scope) -> None:
+        with self._lock:
+            if self._requests.pop(id(scope), None) is not None and self._profiled(
+                scope
+            ):
+                self.requests += 1
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        stacks = [
+            collapse_stack(frame)
+            for ident, frame in sys._current_frames().items()
+            if ident != own and not is_idle(frame)
+        ]
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                # Bounded, a deep recursion must not grow it forever
+                if (
+                    stack in self.stacks
+                    or len(self.stacks) < settings.PROFILER_MAX_STACKS
+                ):
+                    self.stacks[stack] += 1
+                else:
+                    self.stacks[TRUNCATED] += 1
+
+    def _run(self) -> None:
+        interval = settings.PROFILER_INTERVAL_MS / 1000
+        next_flush = time.monotonic() + FLUSH_SECONDS
+        while not self._stop.wait(interval) and self.active:
+            with self._lock:
+                in_flight = any(map(self._profiled, self._requests.values()))
+            if in_flight:
+                self.sample()
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + FLUSH_SECONDS
+        self.flush()
+
+
+profiler = Profiler()
+
+
+class ProfilerMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            # A stat of the control file at most every SYNC_SECONDS
+            profiler.sync()
+        if scope["type"] != "http" or not profiler.active or not profiler.enter(scope):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.exit(scope)
@@ -0,0 +1,28 @@
+"""
+Recompute the denormalized Tag.item_count column from the itemtag table.
+
+Counts are maintained by app.crud on every ItemTag insert and delete, but rows
+changed outside of it (manual SQL, restores, bulk imports) can leave them out
+of sync. This rebuilds all counters in a single UPDATE.
+"""
+
+import logging
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.crud import recount_tag_item_counts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("Recomputing tag item counts")
+    with Session(engine) as session:
+        updated = recount_tag_item_counts(session=session)
+    logger.info(f"Updated item counts for {updated} tags")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,35 @@ This script creates random tags and items for development and testing.
 It can be run manually or automatically during database initialization
 by setting SEED_DB=true in the environment.
 
+With --bulk it creates users, tags and items at benchmark scale instead,
+generated in chunks and inserted with one executemany per table and chunk,
+each chunk in its own transaction:
+
+    python -m app.seed_data [--tags 20] [--items 50] [--seed 42]
+    python -m app.seed_data --bulk --users 1000 --tags 500 --items 100000 [--seed 42]
+
+The same --seed always generates the same rows.
+
 Faker docs:
 https://faker.readthedocs.io/en/master/locales/az_AZ.html#faker.providers.internet.az_AZ.Provider.image_url
 """
 
+import argparse
+import datetime
 import logging
 import random
+import uuid
+from collections import Counter
+from typing import Any
 
 from faker import Faker
-from sqlmodel import Session, select
+from sqlalchemy import Connection, bindparam, insert, update
+from sqlmodel import Session, col, select
 
 from app.core.db import engine
+from app.core.security import get_password_hash
 from app.crud import create_item, create_tag
-from app.models import ItemCreate, Tag, TagCreate, User
+from app.models import Item, ItemCreate, ItemTag, Tag, TagCreate, User, UserEmailChange
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,16 +47,19 @@ def seed_tags(session: Session, count: int = 20) -> list[Tag]:
     tags = []
 
     # Generate unique tag names
-    tag_names = set()
+    tag_names: set[str] = set()
     while len(tag_names) < count:
         tag_names.add(fake.word().capitalize())
 
-    for name in tag_names:
-        # Check if tag already exists
-        existing_tag = session.exec(select(Tag).where(Tag.name == name)).first()
+    # Reuse the tags that already exist, looked up in one query
+    existing_tags = {
+        tag.name: tag
+        for tag in session.exec(select(Tag).where(col(Tag.name).in_(tag_names))).all()
+    }
 
-        if existing_tag:
-            tags.append(existing_tag)
+    for name in tag_names:
+        if name in existing_tags:
+            tags.append(existing_tags[name])
             continue
 
         tag_in = TagCreate(
@@ -78,7 +97,6 @@ def seed_items(
             if random.random() > 0.1
             else None,
         )
-        tag_ids = (tag_ids if tag_ids else None,)
         item = create_item(session=session, item_in=item_in, owner_id=owner_id)
         logger.info(f"Created item {i + 1}/{count}: {item.title}")
 
@@ -88,7 +106,9 @@ def seed_database(num_tags: int = 20, num_items: int = 50) -> None:
     with Session(engine) as session:
         # Get the first superuser
         user = session.exec(
-            select(User).where(User.is_superuser == True).order_by(User.created_at)
+            select(User)
+            .where(col(User.is_superuser).is_(True))
+            .order_by(col(User.created_at))
         ).first()
 
         if not user:
@@ -106,9 +126,172 @@ def seed_database(num_tags: int = 20, num_items: int = 50) -> None:
         logger.info("Database seeding completed!")
 
 
+# Password of every bulk user, hashed once
+BULK_USER_PASSWORD = "Seed-user-passw0rd!"
+BULK_USER_EMAIL = "user{}@example.com"
+# Rows generated and inserted per transaction
+CHUNK_SIZE = 1000
+# created_at of bulk rows is spread over the year before this date
+BULK_EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def insert_rows(connection: Connection, model: Any, rows: list[dict[str, Any]]) -> None:
+    # An executemany on the table: compiled once and batched by the driver,
+    # where insert().values(rows) compiles a new statement per chunk
+    if rows:
+        connection.execute(insert(model.__table__), rows)
+
+
+def bulk_seed(
+    *,
+    users: int,
+    tags: int,
+    items: int,
+    seed: int = 42,
+    password: str = BULK_USER_PASSWORD,
+    email_format: str = BULK_USER_EMAIL,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """
+    Insert users, tags and items in chunks, then set the tags' item counts.
+    """
+    if items and not users:
+        raise ValueError("Items need at least one user to own them")
+    rng = random.Random(seed)
+    faker = Faker()
+    faker.seed_instance(seed)
+    hashed_password = get_password_hash(password)
+
+    def uid() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def created_at() -> datetime.datetime:
+        return BULK_EPOCH - datetime.timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+    user_ids = []
+    for start in range(0, users, chunk_size):
+        rows = []
+        for i in range(start, min(start + chunk_size, users)):
+            user_ids.append(uid())
+            created = created_at()
+            rows.append(
+                {
+                    "id": user_ids[-1],
+                    "email": email_format.format(i),
+                    "hashed_password": hashed_password,
+                    "full_name": faker.name(),
+                    "is_active": True,
+                    "is_superuser": False,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+            )
+        with engine.begin() as connection:
+            insert_rows(connection, User, rows)
+            # Core inserts skip the mapper events that log new emails
+            now = datetime.datetime.now(datetime.timezone.utc)
+            insert_rows(
+                connection,
+                UserEmailChange,
+                [{"email": row["email"], "created_at": now} for row in rows],
+            )
+    logger.info(f"Created {users} users")
+
+    tag_ids = []
+    for start in range(0, tags, chunk_size):
+        rows = []
+        for i in range(start, min(start + chunk_size, tags)):
+            tag_ids.append(uid())
+            created = created_at()
+            rows.append(
+                {
+                    "id": tag_ids[-1],
+                    # Suffixed, there are fewer distinct words than tags
+                    "name": f"{faker.word().capitalize()}-{i}",
+                    "description": faker.sentence()[:255],
+                    "color": faker.hex_color(),
+                    "item_count": 0,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+            )
+        with engine.begin() as connection:
+            insert_rows(connection, Tag, rows)
+    logger.info(f"Created {tags} tags")
+
+    item_counts: Counter[str] = Counter()
+    for start in range(0, items, chunk_size):
+        item_rows = []
+        link_rows = []
+        for _ in range(start, min(start + chunk_size, items)):
+            item_id = uid()
+            created = created_at()
+            title = faker.sentence(nb_words=rng.randint(3, 8)).rstrip(".")
+            description = faker.paragraph(nb_sentences=rng.randint(1, 3))[:255]
+            item_rows.append(
+                {
+                    "id": item_id,
+                    "title": title,
+                    "description": description,
+                    "image_url": None,
+                    "video_url": None,
+                    "video_thumbnail_url": None,
+                    "owner_id": rng.choice(user_ids),
+                    "created_at": created,
+                    "updated_at": created,
+                }
+            )
+            for tag_id in rng.sample(tag_ids, rng.randint(0, min(5, len(tag_ids)))):
+                link_rows.append({"item_id": item_id, "tag_id": tag_id})
+                item_counts[tag_id] += 1
+        with engine.begin() as connection:
+            insert_rows(connection, Item, item_rows)
+            insert_rows(connection, ItemTag, link_rows)
+        logger.info(f"Created {start + len(item_rows)}/{items} items")
+
+    # Counted while generating, a recount scans itemtag once per tag
+    with engine.begin() as connection:
+        connection.execute(
+            update(Tag)
+            .where(col(Tag.id) == bindparam("tag_id"))
+            .values(item_count=bindparam("item_count")),
+            [
+                {"tag_id": tag_id, "item_count": count}
+                for tag_id, count in item_counts.items()
+            ],
+        )
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--bulk", action="store_true")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.bulk:
+        if args.items and not args.users:
+            parser.error("--items needs at least one user, set --users")
+        # Echoing the parameters of every chunk takes longer than inserting it
+        engine.echo = False
+        logger.info("Starting bulk database seeding...")
+        bulk_seed(
+            users=args.users,
+            tags=args.tags,
+            items=args.items,
+            seed=42 if args.seed is None else args.seed,
+        )
+        return
+
+    if args.seed is not None:
+        random.seed(args.seed)
+        fake.seed_instance(args.seed)
     logger.info("Starting database seeding...")
-    seed_database(num_tags=20, num_items=50)
+    seed_database(num_tags=args.tags, num_items=args.items)
 
 
 if __name__ == "__main__":
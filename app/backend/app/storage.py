@@ -0,0 +1,393 @@
+"""
+Object storage for finished item media.
+
+Videos, thumbnails and images are written and read through a Storage driver,
+addressed by the same keys as app.media. The local driver keeps files under
+MEDIA_ROOT, the S3 driver talks to any S3-compatible service (AWS S3, MinIO,
+R2...). Upload parts and cached image variants always stay on local disk.
+
+Item URLs always point at our /media/files route, which serves local files
+itself and redirects to a presigned URL for remote ones, so switching
+STORAGE_BACKEND does not change stored URLs.
+"""
+
+import io
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+
+import jwt
+
+from app import media
+from app.core import security
+from app.core.config import settings
+
+# boto3 is optional, install it with: uv sync --extra s3
+try:
+    import boto3  # type: ignore
+    from botocore.config import Config  # type: ignore
+    from botocore.exceptions import ClientError  # type: ignore
+except ImportError:
+    boto3 = None
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectNotFound(Exception):
+    pass
+
+
+@dataclass
+class StoredObject:
+    size: int
+    modified: float
+    etag: str
+
+
+class Storage(ABC):
+    @abstractmethod
+    def put_stream(
+        self, key: str, chunks: Iterable[bytes], *, content_type: str | None = None
+    ) -> int:
+        """
+        Store the chunks under key, replacing any existing object. Returns the size.
+        """
+
+    def put_file(
+        self, key: str, path: Path, *, content_type: str | None = None
+    ) -> None:
+        """
+        Store a local file under key, the file is removed afterwards.
+        """
+        with open(path, "rb") as file:
+            self.put_stream(
+                key,
+                iter(partial(file.read, CHUNK_SIZE), b""),
+                content_type=content_type,
+            )
+        path.unlink()
+
+    @abstractmethod
+    def get_range(
+        self, key: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]:
+        """
+        Iterate over bytes [start, end) of the object, end defaults to its size.
+        """
+
+    @abstractmethod
+    def stat(self, key: str) -> StoredObject:
+        """
+        Size, modification time and etag of the object.
+        """
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+        except ObjectNotFound:
+            return False
+        return True
+
+    @abstractmethod
+    def presign(
+        self,
+        key: str,
+        *,
+        method: str = "GET",
+        content_type: str | None = None,
+        content_length: int | None = None,
+        expires_in: int | None = None,
+    ) -> str:
+        """
+        URL a client can GET or PUT the object at directly, without credentials.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Remove the object, if it exists.
+        """
+
+    def local_path(self, key: str) -> Path | None:
+        """
+        Path of the object on local disk, None for remote drivers.
+        """
+        return None
+
+
+class LocalStorage(Storage):
+    def put_stream(
+        self, key: str, chunks: Iterable[bytes], *, content_type: str | None = None
+    ) -> int:
+        path = media.media_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique across threads and processes, next to the object so it can
+        # be renamed over it
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        size = 0
+        try:
+            with open(tmp_path, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return size
+
+    def put_file(
+        self, key: str, path: Path, *, content_type: str | None = None
+    ) -> None:
+        destination = media.media_path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        # A rename when both are on the same filesystem, the usual case
+        shutil.move(path, destination)
+
+    def get_range(
+        self, key: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]:
+        try:
+            file = open(media.media_path(key), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(key)
+        with file:
+            file.seek(start)
+            if end is None:
+                end = os.fstat(file.fileno()).st_size
+            remaining = end - start
+            while remaining > 0:
+                chunk = file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def stat(self, key: str) -> StoredObject:
+        try:
+            stat = media.media_path(key).stat()
+        except (FileNotFoundError, NotADirectoryError):
+            raise ObjectNotFound(key)
+        return StoredObject(
+            size=stat.st_size,
+            modified=stat.st_mtime,
+            etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+        )
+
+    def presign(
+        self,
+        key: str,
+        *,
+        method: str = "GET",
+        content_type: str | None = None,
+        content_length: int | None = None,
+        expires_in: int | None = None,
+    ) -> str:
+        if method == "GET":
+            # Local media is served as is by the /media/files route
+            return media.media_url(key)
+        token = create_upload_token(
+            key,
+            content_type=content_type,
+            content_length=content_length,
+            expires_in=expires_in,
+        )
+        return f"{media.media_url(key)}?token={token}"
+
+    def delete(self, key: str) -> None:
+        media.media_path(key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Path | None:
+        return media.media_path(key)
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    File-like view of an iterable of chunks, for boto3's upload_fileobj.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: "memoryview | bytearray") -> int:  # type: ignore[override]
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self.size += n
+        return n
+
+
+class S3Storage(Storage):
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+    ) -> None:
+        if boto3 is None:
+            raise RuntimeError("S3 storage needs boto3: uv sync --extra s3")
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            # Path-style addressing works with MinIO and other S3 look-alikes
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+
+    def _extra_args(self, content_type: str | None) -> dict[str, str]:
+        return {"ContentType": content_type} if content_type else {}
+
+    def put_stream(
+        self, key: str, chunks: Iterable[bytes], *, content_type: str | None = None
+    ) -> int:
+        reader = _ChunkReader(chunks)
+        # Switches to a multipart upload for large bodies
+        self.client.upload_fileobj(
+            io.BufferedReader(reader, CHUNK_SIZE),
+            self.bucket,
+            key,
+            ExtraArgs=self._extra_args(content_type),
+        )
+        return reader.size
+
+    def put_file(
+        self, key: str, path: Path, *, content_type: str | None = None
+    ) -> None:
+        self.client.upload_file(
+            str(path), self.bucket, key, ExtraArgs=self._extra_args(content_type)
+        )
+        path.unlink()
+
+    def get_range(
+        self, key: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{end - 1 if end is not None else ''}"
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=key, Range=byte_range
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise ObjectNotFound(key)
+            raise
+        body = response["Body"]
+        try:
+            yield from body.iter_chunks(CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def stat(self, key: str) -> StoredObject:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise ObjectNotFound(key)
+            raise
+        return StoredObject(
+            size=response["ContentLength"],
+            modified=response["LastModified"].timestamp(),
+            etag=response["ETag"].strip('"'),
+        )
+
+    def presign(
+        self,
+        key: str,
+        *,
+        method: str = "GET",
+        content_type: str | None = None,
+        content_length: int | None = None,
+        expires_in: int | None = None,
+    ) -> str:
+        params: dict[str, str | int] = {"Bucket": self.bucket, "Key": key}
+        if method == "PUT":
+            # Signed, so the client must upload exactly this type and size
+            if content_type:
+                params["ContentType"] = content_type
+            if content_length is not None:
+                params["ContentLength"] = content_length
+        return str(
+            self.client.generate_presigned_url(
+                "put_object" if method == "PUT" else "get_object",
+                Params=params,
+                ExpiresIn=expires_in or settings.STORAGE_PRESIGN_EXPIRE_SECONDS,
+            )
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+def create_upload_token(
+    key: str,
+    *,
+    content_type: str | None = None,
+    content_length: int | None = None,
+    expires_in: int | None = None,
+) -> str:
+    """
+    Signed token allowing one PUT of key to the /media/files route.
+    """
+    expire = datetime.now(timezone.utc) + timedelta(
+        seconds=expires_in or settings.STORAGE_PRESIGN_EXPIRE_SECONDS
+    )
+    claims = {
+        "exp": expire,
+        "sub": key,
+        "purpose": "media_upload",
+        "content_type": content_type,
+        "content_length": content_length,
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=security.ALGORITHM)
+
+
+def verify_upload_token(token: str, key: str) -> dict[str, str | int | None] | None:
+    """
+    Claims of a valid upload token for key, None if it is invalid or expired.
+    """
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    if claims.get("purpose") != "media_upload" or claims.get("sub") != key:
+        return None
+    return claims
+
+
+_storages: dict[str, Storage] = {}
+
+
+def get_storage() -> Storage:
+    backend = settings.STORAGE_BACKEND
+    if backend not in _storages:
+        if backend == "s3":
+            _storages[backend] = S3Storage(
+                bucket=settings.S3_BUCKET,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                region=settings.S3_REGION,
+                access_key_id=settings.S3_ACCESS_KEY_ID,
+                secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            )
+        else:
+            _storages[backend] = LocalStorage()
+    return _storages[backend]
@@ -0,0 +1,117 @@
+import datetime
+import time
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.api.routes import emails
+from app.core.config import settings
+from app.email_batches import EmailBatchSender
+from app.models import EmailBatch, UserCreate
+from app.tests.utils.utils import random_lower_string, random_password
+
+
+@pytest.fixture(autouse=True)
+def emails_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SMTP_HOST", "smtp.example.com")
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "info@example.com")
+
+
+def test_create_email_batch(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    domain = f"{random_lower_string()[:12]}.example.com"
+    recipients = sorted(f"user{i}@{domain}" for i in range(5))
+    for email in recipients:
+        crud.create_user(
+            session=db, user_create=UserCreate(email=email, password=random_password())
+        )
+
+    sent: list[str] = []
+
+    def send(*, email_to: str, html_content: str, **_: Any) -> None:
+        assert email_to in html_content
+        sent.append(email_to)
+
+    monkeypatch.setattr(
+        emails,
+        "email_batch_sender",
+        EmailBatchSender(concurrency=2, page_size=2, smtp_factory=MagicMock, send=send),
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/emails/batches",
+        headers=superuser_token_headers,
+        json={
+            "template_name": "test_email.html",
+            "subject": "Announcement",
+            "recipients": {"email_domain": domain},
+        },
+    )
+    assert response.status_code == 202
+    batch = response.json()
+    assert batch["total"] == 5
+
+    deadline = time.monotonic() + 3
+    while batch["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.02)
+        batch = client.get(
+            f"{settings.API_V1_STR}/emails/batches/{batch['id']}",
+            headers=superuser_token_headers,
+        ).json()
+    assert batch["status"] == "completed"
+    assert batch["sent"] == 5
+    assert batch["failed"] == 0
+    assert sorted(sent) == recipients
+
+
+def test_create_email_batch_unknown_template(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/emails/batches",
+        headers=superuser_token_headers,
+        json={"template_name": "missing.html", "subject": "Announcement"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown email template"
+
+
+def test_create_email_batch_not_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/emails/batches",
+        headers=normal_user_token_headers,
+        json={"template_name": "test_email.html", "subject": "Announcement"},
+    )
+    assert response.status_code == 403
+
+
+def test_email_batch_claimed_by_one_sender(db: Session) -> None:
+    batch = EmailBatch(template_name="test_email.html", subject="Announcement")
+    db.add(batch)
+    db.commit()
+    first = EmailBatchSender(lease=60)
+    second = EmailBatchSender(lease=60)
+    assert first.claim(batch.id) is not None
+    # Held by the first sender, e.g. in another worker process
+    assert second.claim(batch.id) is None
+
+    # Its lease ran out, the process sending it died
+    db.refresh(batch)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    batch.lease_expires_at = now - datetime.timedelta(seconds=1)
+    db.add(batch)
+    db.commit()
+    claimed = second.claim(batch.id)
+    assert claimed is not None
+    assert claimed.owner == second.owner
+    # The first sender stops at its next page
+    assert not first._save(claimed)
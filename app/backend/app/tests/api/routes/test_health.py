@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.health import readiness
+from app.warmup import warmup
+
+
+@pytest.fixture(autouse=True)
+def clear_readiness() -> None:
+    assert warmup.done.wait(5)
+    readiness.clear()
+
+
+def test_liveness(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/health/live")
+    assert r.status_code == 200
+
+
+def test_readiness(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/health/ready")
+    assert r.status_code == 200
+    content = r.json()
+    assert content["status"] == "ok"
+    assert set(content["checks"]) == {"warmup", "pool", "password_hasher", "database"}
+    assert content["checks"]["database"]["value"] >= 0
+
+
+def test_readiness_cached(client: TestClient) -> None:
+    client.get(f"{settings.API_V1_STR}/health/ready")
+    with patch("app.health.check_database") as check:
+        r = client.get(f"{settings.API_V1_STR}/health/ready")
+    assert r.status_code == 200
+    check.assert_not_called()
+
+
+def test_readiness_pool_saturated(client: TestClient) -> None:
+    with (
+        patch("app.health.pool_saturation", return_value=1.0),
+        patch("app.health.check_database") as check_database,
+    ):
+        r = client.get(f"{settings.API_V1_STR}/health/ready")
+    assert r.status_code == 503
+    content = r.json()
+    assert content["status"] == "unavailable"
+    assert content["checks"]["pool"] == {"ok": False, "value": 1.0, "detail": None}
+    assert content["checks"]["database"]["detail"] == "Pool saturated"
+    # Not waiting on the pool for a connection
+    check_database.assert_not_called()
+
+
+def test_readiness_slow_database(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "HEALTH_DB_MAX_LATENCY_MS", 0.0)
+    r = client.get(f"{settings.API_V1_STR}/health/ready")
+    assert r.status_code == 503
+    assert r.json()["checks"]["database"]["ok"] is False
@@ -162,3 +162,72 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_read_items_batch(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Mine"},
+    )
+    own_id = r.json()["id"]
+    other_item = create_random_item(db)
+    missing_id = str(uuid.uuid4())
+    response = client.post(
+        f"{settings.API_V1_STR}/items/batch-get",
+        headers=normal_user_token_headers,
+        json={"ids": [own_id, other_item.id, missing_id]},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 3
+    statuses = {entry["id"]: entry["status"] for entry in content["data"]}
+    assert statuses == {
+        own_id: "ok",
+        other_item.id: "forbidden",
+        missing_id: "not_found",
+    }
+    assert content["data"][0]["item"]["title"] == "Mine"
+    assert content["data"][1]["item"] is None
+
+
+def test_read_items_with_fields(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"fields": "id,title,tags"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 1
+    assert set(content["data"][0]) == {"id", "title", "tags"}
+
+
+def test_read_items_with_single_field(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"fields": "id"},
+    )
+    assert response.status_code == 200
+    assert {"id": item.id} in response.json()["data"]
+
+
+def test_read_items_with_unknown_fields(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"fields": "title,hashed_password"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: hashed_password"
@@ -1,10 +1,13 @@
 from unittest.mock import patch
 
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app.core import security
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.rate_limit import rate_limiter
+from app.core.security import create_password_context, verify_password
 from app.crud import create_user
 from app.models import UserCreate
 from app.tests.utils.user import user_authentication_headers
@@ -51,7 +54,7 @@ def test_recovery_password(
     with (
         patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
         patch("app.core.config.settings.SMTP_USER", "admin@example.com"),
-        patch("app.api.routes.login.send_email") as mock_send_email,
+        patch("app.api.routes.login.email_queue") as mock_email_queue,
     ):
         email = "test@example.com"
         r = client.post(
@@ -60,7 +63,7 @@ def test_recovery_password(
         )
         assert r.status_code == 200
         assert r.json() == {"message": "Password recovery email sent"}
-        mock_send_email.assert_called_once()
+        mock_email_queue.enqueue.assert_called_once()
 
 
 def test_recovery_password_user_not_exits(
@@ -118,3 +121,88 @@ def test_reset_password_invalid_token(
     assert "detail" in response
     assert r.status_code == 400
     assert response["detail"] == "Invalid token"
+
+
+def test_login_rate_limited_per_email(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_EMAIL", 3)
+    rate_limiter.clear()
+    email = random_email()
+    login_data = {"username": email, "password": "incorrect"}
+    with patch(
+        "app.api.routes.login.crud.authenticate", return_value=None
+    ) as authenticate:
+        for _ in range(3):
+            r = client.post(
+                f"{settings.API_V1_STR}/login/access-token", data=login_data
+            )
+            assert r.status_code == 400
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+        assert r.status_code == 429
+        assert int(r.headers["retry-after"]) > 0
+        # Rejected before looking up or hashing anything
+        assert authenticate.call_count == 3
+    assert rate_limiter.stats["login_email", "rejected"] == 1
+    rate_limiter.clear()
+
+
+def test_login_success_resets_email_limit(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_EMAIL", 2)
+    rate_limiter.clear()
+    email = random_email()
+    password = random_password()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    url = f"{settings.API_V1_STR}/login/access-token"
+    r = client.post(url, data={"username": email, "password": "incorrect"})
+    assert r.status_code == 400
+    r = client.post(url, data={"username": email, "password": password})
+    assert r.status_code == 200
+    r = client.post(url, data={"username": email, "password": "incorrect"})
+    assert r.status_code == 400
+    r = client.post(url, data={"username": email, "password": password})
+    assert r.status_code == 200
+    rate_limiter.clear()
+
+
+def test_recovery_password_rate_limited(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_RECOVERY_PER_EMAIL", 2)
+    rate_limiter.clear()
+    email = random_email()
+    statuses = [
+        client.post(f"{settings.API_V1_STR}/password-recovery/{email}").status_code
+        for _ in range(3)
+    ]
+    assert statuses == [404, 404, 429]
+    rate_limiter.clear()
+
+
+def test_login_upgrades_password_hash(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        security, "pwd_context", create_password_context(bcrypt_rounds=4)
+    )
+    email = random_email()
+    password = random_password()
+    user = create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    assert user.hashed_password.startswith("$2b$04$")
+
+    monkeypatch.setattr(
+        security, "pwd_context", create_password_context(bcrypt_rounds=5)
+    )
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    assert r.status_code == 200
+    # Written back by a background task, run before TestClient returns
+    db.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+    assert verify_password(password, user.hashed_password)
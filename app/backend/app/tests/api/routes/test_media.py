@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import media
+from app.core.config import settings
+
+CONTENT = bytes(range(256)) * 1024
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def video_url() -> str:
+    key = "videos/item/clip.mp4"
+    path = media.media_path(key)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(CONTENT)
+    return media.media_url(key)
+
+
+def test_read_media_file(client: TestClient, video_url: str) -> None:
+    response = client.get(video_url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"]
+    assert response.headers["last-modified"]
+
+    response = client.head(video_url)
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+
+def test_read_media_file_range(client: TestClient, video_url: str) -> None:
+    size = len(CONTENT)
+    response = client.get(video_url, headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{size}"
+    assert response.headers["content-length"] == "100"
+
+    response = client.get(video_url, headers={"Range": "bytes=-70000"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-70000:]
+
+    response = client.get(video_url, headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+
+def test_read_media_file_conditional(client: TestClient, video_url: str) -> None:
+    response = client.get(video_url)
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = client.get(video_url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    response = client.get(video_url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    response = client.get(video_url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    response = client.get(
+        video_url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_read_media_file_not_public(client: TestClient, media_root: Path) -> None:
+    (media_root / "uploads").mkdir()
+    (media_root / "uploads" / "abc.part").write_bytes(b"partial")
+    for key in ["uploads/abc.part", "videos/missing.mp4", "videos/../uploads/abc.part"]:
+        response = client.get(media.media_url(key))
+        assert response.status_code == 404
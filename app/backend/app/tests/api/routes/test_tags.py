@@ -0,0 +1,79 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import ItemCreate
+from app.tests.utils.tag import create_random_tag
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def test_read_popular_tags(client: TestClient, db: Session) -> None:
+    user = create_random_user(db)
+    tag = create_random_tag(db)
+    for _ in range(2):
+        item_in = ItemCreate(title=random_lower_string(), tag_ids=[tag.id])
+        crud.create_item(session=db, item_in=item_in, owner_id=user.id)
+    response = client.get(f"{settings.API_V1_STR}/tags/popular", params={"limit": 5})
+    assert response.status_code == 200
+    content = response.json()
+    counts = [t["item_count"] for t in content["data"]]
+    assert counts == sorted(counts, reverse=True)
+    assert counts[0] >= 2
+
+    response = client.get(f"{settings.API_V1_STR}/tags/{tag.id}")
+    assert response.json()["item_count"] == 2
+
+
+def test_read_popular_tags_limit_bounds(client: TestClient) -> None:
+    for limit in (0, -1, 101, 1000000):
+        response = client.get(
+            f"{settings.API_V1_STR}/tags/popular", params={"limit": limit}
+        )
+        assert response.status_code == 422
+
+
+def test_read_items_by_tag_count(client: TestClient, db: Session) -> None:
+    user = create_random_user(db)
+    tag = create_random_tag(db)
+    for _ in range(3):
+        item_in = ItemCreate(title=random_lower_string(), tag_ids=[tag.id])
+        crud.create_item(session=db, item_in=item_in, owner_id=user.id)
+    response = client.get(f"{settings.API_V1_STR}/tags/{tag.id}/items")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 3
+    assert len(content["data"]) == 3
+
+
+def test_read_tags_with_fields(client: TestClient, db: Session) -> None:
+    create_random_tag(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/tags/", params={"fields": "name,item_count"}
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert set(content["data"][0]) == {"name", "item_count"}
+
+
+def test_read_tags_with_single_field(client: TestClient, db: Session) -> None:
+    create_random_tag(db)
+    response = client.get(f"{settings.API_V1_STR}/tags/", params={"fields": "name"})
+    assert response.status_code == 200
+    assert set(response.json()["data"][0]) == {"name"}
+
+
+def test_read_items_by_tag_with_fields(client: TestClient, db: Session) -> None:
+    user = create_random_user(db)
+    tag = create_random_tag(db)
+    item_in = ItemCreate(title=random_lower_string(), tag_ids=[tag.id])
+    crud.create_item(session=db, item_in=item_in, owner_id=user.id)
+    response = client.get(
+        f"{settings.API_V1_STR}/tags/{tag.id}/items",
+        params={"fields": "title,tags"},
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data[0]["title"] == item_in.title
+    assert [t["id"] for t in data[0]["tags"]] == [tag.id]
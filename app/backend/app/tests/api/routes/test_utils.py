@@ -0,0 +1,145 @@
+import stat
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.profiler import Profiler, default_directory
+from app.warmup import Warmup, warmup
+
+
+def test_health_check_waits_for_warmup(client: TestClient) -> None:
+    assert warmup.done.wait(5)
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert r.json() is True
+
+    warmup.done.clear()
+    try:
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+        assert r.status_code == 503
+    finally:
+        warmup.done.set()
+
+
+def test_warmup_steps() -> None:
+    stage = Warmup()
+    stage.run(app)
+    assert stage.done.is_set()
+    steps = {"mappers", "database", "serializers", "openapi", "tags"}
+    assert steps <= set(stage.timings)
+
+
+def busy_profiled_work(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_profiler_samples_profiled_requests(tmp_path: Path) -> None:
+    profiler = Profiler(tmp_path)
+    profiler.start(percent=100, route=None, duration=10)
+    try:
+        scope = {"type": "http", "path": "/"}
+        assert profiler.enter(scope)
+        busy_profiled_work(0.3)
+        profiler.exit(scope)
+    finally:
+        profiler.stop()
+    assert profiler.requests == 1
+    assert profiler.samples > 0
+    assert "busy_profiled_work" in profiler.collapsed()
+    line = profiler.collapsed().splitlines()[0]
+    assert int(line.rsplit(" ", 1)[1]) > 0
+
+
+def test_profiler_route_only_samples_matching_requests(tmp_path: Path) -> None:
+    profiler = Profiler(tmp_path)
+    profiler.start(percent=100, route="/api/v1/items/{id}", duration=10)
+    try:
+        # Not routed to the profiled route
+        scope = {"type": "http", "path": "/"}
+        assert profiler.enter(scope)
+        busy_profiled_work(0.1)
+        profiler.exit(scope)
+    finally:
+        profiler.stop()
+    assert profiler.requests == 0
+    assert profiler.samples == 0
+
+
+def test_profiler_shared_between_workers(tmp_path: Path) -> None:
+    # Two workers of the same instance, sharing the directory
+    first = Profiler(tmp_path)
+    second = Profiler(tmp_path)
+    first.start(percent=100, route=None, duration=10)
+    try:
+        second.sync(force=True)
+        assert second.active
+        scope = {"type": "http", "path": "/"}
+        assert second.enter(scope)
+        busy_profiled_work(0.3)
+        second.exit(scope)
+    finally:
+        first.stop()
+    # Stopped on its next request, which writes its samples out
+    second.sync(force=True)
+    assert not second.active
+    assert first.status().requests == 1
+    assert "busy_profiled_work" in first.collapsed()
+
+
+def test_profiler_default_directory_is_private(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert default_directory().parent == Path(tempfile.gettempdir())
+    directory = tmp_path / "profiler"
+    monkeypatch.setattr(settings, "PROFILER_DIR", None)
+    monkeypatch.setattr("app.profiler.default_directory", lambda: directory)
+    profiler = Profiler()
+    profiler.start(percent=100, route=None, duration=10)
+    profiler.stop()
+    assert profiler.directory == directory
+    assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+
+    # Created by someone else first, or opened up since
+    directory.chmod(0o777)
+    with pytest.raises(RuntimeError, match="only this user"):
+        profiler.start(percent=100, route=None, duration=10)
+
+
+def test_profile_endpoints(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    url = f"{settings.API_V1_STR}/utils/profile/"
+    with patch.object(settings, "PROFILER_ENABLED", False):
+        r = client.post(url, headers=superuser_token_headers, json={})
+        assert r.status_code == 404
+    with patch.object(settings, "PROFILER_ENABLED", True):
+        r = client.post(url, headers=normal_user_token_headers, json={})
+        assert r.status_code == 403
+
+        try:
+            r = client.post(url, headers=superuser_token_headers, json={"percent": 5})
+            assert r.status_code == 201
+            assert r.json()["active"] is True
+            assert r.json()["percent"] == 5
+
+            r = client.get(f"{url}status/", headers=superuser_token_headers)
+            assert r.json()["active"] is True
+        finally:
+            r = client.delete(url, headers=superuser_token_headers)
+        assert r.status_code == 200
+        assert r.json()["active"] is False
+
+        r = client.get(url, headers=superuser_token_headers)
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain")
+        assert "attachment" in r.headers["content-disposition"]
@@ -0,0 +1,156 @@
+import base64
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import Response
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models import Item
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    monkeypatch.setattr(settings, "THUMBNAILS_ENABLED", False)
+    return tmp_path
+
+
+def create_item(client: TestClient, headers: dict[str, str]) -> str:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/", headers=headers, json={"title": "Video"}
+    )
+    return str(r.json()["id"])
+
+
+def create_upload(
+    client: TestClient, headers: dict[str, str], item_id: str, length: int
+) -> str:
+    metadata = "filename " + base64.b64encode(b"clip.mp4").decode()
+    response: Response = client.post(
+        f"{settings.API_V1_STR}/items/{item_id}/video",
+        headers={**headers, "Upload-Length": str(length), "Upload-Metadata": metadata},
+    )
+    assert response.status_code == 201
+    assert response.headers["upload-offset"] == "0"
+    return response.headers["location"]
+
+
+def patch_chunk(
+    client: TestClient,
+    headers: dict[str, str],
+    location: str,
+    offset: int,
+    chunk: bytes,
+) -> Response:
+    response: Response = client.patch(
+        location,
+        headers={
+            **headers,
+            "Upload-Offset": str(offset),
+            "Content-Type": "application/offset+octet-stream",
+        },
+        content=chunk,
+    )
+    return response
+
+
+def test_resumable_video_upload(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    media_root: Path,
+) -> None:
+    video = b"0123456789" * 100
+    item_id = create_item(client, superuser_token_headers)
+    location = create_upload(client, superuser_token_headers, item_id, len(video))
+
+    response = patch_chunk(client, superuser_token_headers, location, 0, video[:400])
+    assert response.status_code == 204
+    assert response.headers["upload-offset"] == "400"
+
+    # A retried chunk at a stale offset is rejected with the current offset
+    response = patch_chunk(client, superuser_token_headers, location, 0, video[:400])
+    assert response.status_code == 409
+    assert response.headers["upload-offset"] == "400"
+
+    response = client.head(location, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.headers["upload-offset"] == "400"
+    assert response.headers["upload-length"] == str(len(video))
+
+    response = patch_chunk(client, superuser_token_headers, location, 400, video[400:])
+    assert response.status_code == 204
+    assert response.headers["upload-offset"] == str(len(video))
+
+    item = db.get(Item, item_id)
+    assert item is not None
+    db.refresh(item)
+    assert item.video_url is not None
+    key = item.video_url.removeprefix(f"{settings.API_V1_STR}/media/files/")
+    assert key.endswith(".mp4")
+    assert (media_root / key).read_bytes() == video
+
+
+def test_video_upload_chunk_too_large(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    item_id = create_item(client, superuser_token_headers)
+    location = create_upload(client, superuser_token_headers, item_id, 10)
+    response = patch_chunk(client, superuser_token_headers, location, 0, b"x" * 11)
+    assert response.status_code == 413
+    response = client.head(location, headers=superuser_token_headers)
+    assert response.headers["upload-offset"] == "0"
+
+
+def test_video_upload_not_enough_permissions(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    item_id = create_item(client, superuser_token_headers)
+    response = client.post(
+        f"{settings.API_V1_STR}/items/{item_id}/video",
+        headers={**normal_user_token_headers, "Upload-Length": "10"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough permissions"
+
+
+def test_presigned_video_upload(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    item_id = create_item(client, superuser_token_headers)
+    response = client.post(
+        f"{settings.API_V1_STR}/items/{item_id}/video/presign",
+        headers=superuser_token_headers,
+        json={"length": 4, "content_type": "video/mp4", "filename": "clip.mp4"},
+    )
+    assert response.status_code == 200
+    presigned = response.json()
+    assert presigned["method"] == "PUT"
+    assert presigned["key"].startswith(f"videos/{item_id}/")
+
+    attach_url = f"{settings.API_V1_STR}/items/{item_id}/video/attach"
+    response = client.post(
+        attach_url, headers=superuser_token_headers, json={"key": presigned["key"]}
+    )
+    assert response.status_code == 404
+
+    response = client.put(
+        presigned["upload_url"], content=b"data", headers=presigned["headers"]
+    )
+    assert response.status_code == 204
+    response = client.post(
+        attach_url, headers=superuser_token_headers, json={"key": presigned["key"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["video_url"].endswith(presigned["key"])
+    assert client.get(response.json()["video_url"]).content == b"data"
+
+    response = client.post(
+        attach_url, headers=superuser_token_headers, json={"key": "videos/other/x.mp4"}
+    )
+    assert response.status_code == 400
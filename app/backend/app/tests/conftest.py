@@ -1,30 +1,98 @@
+import atexit
+import os
+import shutil
+import tempfile
 from collections.abc import Generator
+from typing import Any
 
-import pytest
-from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, delete
+# Read by the settings, so before the app is imported. Each pytest-xdist worker
+# gets its own database and media, the configured ones are never touched
+WORKER = os.environ.get("PYTEST_XDIST_WORKER", "main")
+TEST_DIR = tempfile.mkdtemp(prefix=f"pytest-{WORKER}-")
+atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
+TEST_ENVIRONMENT = {
+    "SQLITE_DB_PATH": os.path.join(TEST_DIR, "test.db"),
+    "MEDIA_ROOT": os.path.join(TEST_DIR, "media"),
+    "PROFILER_DIR": os.path.join(TEST_DIR, "profiler"),
+    # Passwords are hashed on every login and user creation, the production
+    # cost would be most of the suite's time
+    "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4"),
+}
+previous_environment = {name: os.environ.get(name) for name in TEST_ENVIRONMENT}
+os.environ.update(TEST_ENVIRONMENT)
 
-from app.core.config import settings
-from app.core.db import engine, init_db
-from app.main import app
-from app.models import Item, User
-from app.tests.utils.user import authentication_token_from_email
-from app.tests.utils.utils import get_superuser_token_headers
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import engine, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.tests.utils.user import authentication_token_from_email  # noqa: E402
+from app.tests.utils.utils import get_superuser_token_headers  # noqa: E402
+
+# Only the app's settings should see them, not tests building their own
+for name, value in previous_environment.items():
+    if value is None:
+        del os.environ[name]
+    else:
+        os.environ[name] = value
+
+# Logging every statement slows the suite down, pytest shows none of it anyway
+engine.echo = False
 
 
 @pytest.fixture(scope="session", autouse=True)
 def db() -> Generator[Session, None, None]:
-    # Create all tables for testing
+    # The schema is built once per worker, from the models
     SQLModel.metadata.create_all(engine)
 
     with Session(engine) as session:
         init_db(session)
         yield session
-        statement = delete(Item)
-        session.execute(statement)
-        statement = delete(User)
-        session.execute(statement)
-        session.commit()
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def savepoint_engine(request: pytest.FixtureRequest) -> Generator[Any, None, None]:
+    # The schema must exist first; marks cannot be applied to fixtures
+    request.getfixturevalue("db")
+    # pysqlite only begins a transaction before DML, so SAVEPOINTs need the
+    # transaction to be started explicitly
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    test_engine = create_engine(
+        settings.SQLALCHEMY_DATABASE_URI, connect_args={"check_same_thread": False}
+    )
+
+    @event.listens_for(test_engine, "connect")
+    def do_connect(dbapi_connection: Any, _: Any) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(test_engine, "begin")
+    def do_begin(connection: Any) -> None:
+        connection.exec_driver_sql("BEGIN")
+
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def session(savepoint_engine: Any) -> Generator[Session, None, None]:
+    """
+    A session whose changes, commits included, are rolled back after the test.
+
+    Commits release a SAVEPOINT of a transaction that is never committed, so
+    what the test writes is only visible to this session. Use `db` instead
+    when the code under test opens its own sessions, from the API or a
+    background thread.
+    """
+    connection = savepoint_engine.connect()
+    transaction = connection.begin()
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as s:
+        yield s
+    transaction.rollback()
+    connection.close()
 
 
 @pytest.fixture(scope="module")
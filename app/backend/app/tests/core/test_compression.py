@@ -0,0 +1,60 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, parse_accept_encoding
+from app.core.config import settings
+
+
+def test_parse_accept_encoding() -> None:
+    assert parse_accept_encoding("gzip, br;q=0.5, deflate;q=0") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "deflate": 0.0,
+    }
+
+
+def test_openapi_is_compressed(client: TestClient) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/openapi.json", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()["info"]["title"] == settings.PROJECT_NAME
+
+
+def test_compression_thresholds() -> None:
+    app = FastAPI()
+    calls = []
+
+    @app.get("/small")
+    def small() -> dict[str, str]:
+        return {"ok": "yes"}
+
+    @app.get("/text")
+    def text() -> PlainTextResponse:
+        return PlainTextResponse("x" * 2048)
+
+    @app.get("/cached")
+    def cached() -> dict[str, str]:
+        calls.append(1)
+        return {"data": "x" * 2048}
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=1024,
+        content_types=["application/json"],
+        cached_paths=["/cached"],
+    )
+    client = TestClient(app)
+    headers = {"Accept-Encoding": "gzip"}
+
+    assert "content-encoding" not in client.get("/small", headers=headers).headers
+    assert "content-encoding" not in client.get("/text", headers=headers).headers
+
+    for _ in range(3):
+        response = client.get("/cached", headers=headers)
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == {"data": "x" * 2048}
+    assert len(calls) == 1
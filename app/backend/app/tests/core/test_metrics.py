@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.core.config import Settings, settings
+from app.core.metrics import remove_dead_processes
+
+
+def make_settings(**values: Any) -> Settings:
+    # The required values are the app's, the rest come from the environment
+    return Settings(
+        PROJECT_NAME=settings.PROJECT_NAME,
+        FIRST_SUPERUSER=settings.FIRST_SUPERUSER,
+        FIRST_SUPERUSER_PASSWORD=settings.FIRST_SUPERUSER_PASSWORD,
+        **values,
+    )
+
+
+def test_metrics(client: TestClient) -> None:
+    client.get(f"{settings.API_V1_STR}/health/live")
+    client.get(f"{settings.API_V1_STR}/items/does-not-exist")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        f'route="{settings.API_V1_STR}/health/live",status="200"}}'
+    ) in body
+    # Labelled with the template, not the id in the path
+    assert f'route="{settings.API_V1_STR}/items/{{id}}"' in body
+    assert "does-not-exist" not in body
+    assert "db_pool_checked_out" in body
+    assert "password_hash_queue_depth" in body
+
+
+def test_metrics_unmatched_route(client: TestClient) -> None:
+    client.get("/no-such-path")
+    r = client.get("/metrics")
+    assert 'route="unmatched",status="404"' in r.text
+    assert "no-such-path" not in r.text
+
+
+def test_metrics_token(client: TestClient) -> None:
+    with patch.object(settings, "METRICS_TOKEN", "scrape-token"):
+        assert client.get("/metrics").status_code == 401
+        r = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+        assert r.status_code == 401
+        r = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+        assert r.status_code == 200
+
+
+def test_metrics_need_token_outside_local() -> None:
+    assert make_settings(ENVIRONMENT="local").METRICS_ENABLED
+    assert not make_settings(ENVIRONMENT="production").METRICS_ENABLED
+    assert make_settings(
+        ENVIRONMENT="production", METRICS_TOKEN="scrape-token"
+    ).METRICS_ENABLED
+    with pytest.raises(ValidationError, match="METRICS_TOKEN is required"):
+        make_settings(ENVIRONMENT="production", METRICS_ENABLED=True)
+
+
+def test_metrics_drop_dead_workers(tmp_path: Path) -> None:
+    exited = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+    )
+    dead_pid = int(exited.stdout)
+    for pid in dead_pid, os.getpid():
+        (tmp_path / f"gauge_livesum_{pid}.db").write_bytes(b"")
+        (tmp_path / f"counter_{pid}.db").write_bytes(b"")
+
+    assert remove_dead_processes(str(tmp_path)) == [dead_pid]
+    # Counters keep adding up after a worker exits, only live gauges go
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [
+            f"counter_{dead_pid}.db",
+            f"counter_{os.getpid()}.db",
+            f"gauge_livesum_{os.getpid()}.db",
+        ]
+    )
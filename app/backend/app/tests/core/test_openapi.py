@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.openapi import FINGERPRINT_KEY, OpenAPISchema, write_openapi_artifact
+from app.main import app
+
+
+def test_openapi_etag(client: TestClient) -> None:
+    url = f"{settings.API_V1_STR}/openapi.json"
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_openapi_schema_from_artifact(tmp_path: Path) -> None:
+    artifact = write_openapi_artifact(app, tmp_path / "openapi.json")
+    schema = json.loads(artifact.read_text())
+    schema["info"]["description"] = "from artifact"
+    artifact.write_text(json.dumps(schema))
+    assert OpenAPISchema(app, artifact_path=artifact).get() == schema
+
+
+def test_openapi_schema_ignores_stale_artifact(tmp_path: Path) -> None:
+    artifact = write_openapi_artifact(app, tmp_path / "openapi.json")
+    schema = json.loads(artifact.read_text())
+    schema["info"]["version"] = "0.0.0-stale"
+    artifact.write_text(json.dumps(schema))
+    loaded = OpenAPISchema(app, artifact_path=artifact).get()
+    assert loaded["info"]["version"] == app.version
+
+
+def test_openapi_schema_ignores_artifact_for_other_routes(tmp_path: Path) -> None:
+    artifact = write_openapi_artifact(app, tmp_path / "openapi.json")
+    schema = json.loads(artifact.read_text())
+    # e.g. written before a route was added, with the same app version
+    schema[FINGERPRINT_KEY] = "0" * 64
+    schema["info"]["description"] = "from artifact"
+    artifact.write_text(json.dumps(schema))
+    loaded = OpenAPISchema(app, artifact_path=artifact).get()
+    assert loaded["info"].get("description") != "from artifact"
@@ -0,0 +1,53 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from starlette.types import Message
+
+from app.core.compression import CompressionMiddleware
+from app.core.ranges import RangeFileResponse, RangeNotSatisfiable, parse_range_header
+
+
+def test_parse_range_header() -> None:
+    assert parse_range_header("bytes=0-9", 100) == (0, 10)
+    assert parse_range_header("bytes=90-", 100) == (90, 100)
+    assert parse_range_header("bytes=-10", 100) == (90, 100)
+    assert parse_range_header("bytes=50-500", 100) == (50, 100)
+    assert parse_range_header("bytes=-500", 100) == (0, 100)
+    # Ignored, the whole file is sent
+    assert parse_range_header("items=0-9", 100) is None
+    assert parse_range_header("bytes=0-9,20-29", 100) is None
+    assert parse_range_header("bytes=9-0", 100) is None
+    assert parse_range_header("bytes=a-b", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=100-", 100)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=-0", 100)
+
+
+def test_pathsend_passes_through_compression(tmp_path: Path) -> None:
+    path = tmp_path / "clip.json"
+    path.write_bytes(b"{}" * 1024)
+    app = CompressionMiddleware(RangeFileResponse(path), minimum_size=1)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/clip.json",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "extensions": {"http.response.pathsend": {}},
+    }
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    assert [m["type"] for m in messages] == [
+        "http.response.start",
+        "http.response.pathsend",
+    ]
+    assert messages[0]["status"] == 200
+    assert messages[1]["path"] == str(path)
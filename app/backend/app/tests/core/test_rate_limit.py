@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+from starlette.requests import Request
+
+from app.api.deps import client_ip
+from app.core.config import settings
+from app.core.rate_limit import MemoryBackend, RedisBackend, SlidingWindowLimiter
+
+
+def test_limit_within_window() -> None:
+    limiter = SlidingWindowLimiter(MemoryBackend())
+    with patch("app.core.rate_limit.time.time", return_value=1000.0):
+        for _ in range(3):
+            assert limiter.check("login_ip", "1.2.3.4", limit=3, window=100) == 0
+            limiter.hit("login_ip", "1.2.3.4", window=100)
+        # 1000 is the start of a window, blocked for all of it
+        assert limiter.check("login_ip", "1.2.3.4", limit=3, window=100) == 100
+        assert limiter.check("login_ip", "5.6.7.8", limit=3, window=100) == 0
+    assert limiter.stats["login_ip", "allowed"] == 4
+    assert limiter.stats["login_ip", "rejected"] == 1
+
+
+def test_previous_window_fades() -> None:
+    limiter = SlidingWindowLimiter(MemoryBackend())
+    with patch("app.core.rate_limit.time.time", return_value=1050.0):
+        for _ in range(4):
+            limiter.hit("signup_ip", "ip", window=100)
+    with patch("app.core.rate_limit.time.time", return_value=1110.0):
+        # 4 * 0.9 counted from the previous window
+        assert limiter.retry_after("signup_ip", "ip", limit=3, window=100) == 15
+    with patch("app.core.rate_limit.time.time", return_value=1130.0):
+        # 4 * 0.7 < 3
+        assert limiter.retry_after("signup_ip", "ip", limit=3, window=100) == 0
+    with patch("app.core.rate_limit.time.time", return_value=1300.0):
+        limiter.hit("signup_ip", "ip", window=100)
+        assert limiter.backend.counts("signup_ip:ip", 100, 1300.0) == (0, 1)
+
+
+def test_reset_and_prune() -> None:
+    backend = MemoryBackend(max_keys=2)
+    limiter = SlidingWindowLimiter(backend)
+    with patch("app.core.rate_limit.time.time", return_value=1000.0):
+        limiter.hit("login_email", "a@example.com", window=100)
+        limiter.hit("login_email", "b@example.com", window=100)
+        limiter.reset("login_email", "a@example.com")
+        assert backend.counts("login_email:a@example.com", 100, 1000.0) == (0, 0)
+    with patch("app.core.rate_limit.time.time", return_value=1300.0):
+        limiter.hit("login_email", "c@example.com", window=100)
+        limiter.hit("login_email", "d@example.com", window=100)
+    # b was idle for two windows and pruned to make room
+    assert "login_email:b@example.com" not in backend._entries
+    assert len(backend._entries) == 2
+
+
+def test_redis_reset_deletes_window_keys() -> None:
+    with patch("app.core.rate_limit.redis"):
+        backend = RedisBackend("redis://localhost:6379/0")
+    backend.reset("login_email:a@example.com", 100, 1050.0)
+    backend.client.delete.assert_called_once_with(
+        "ratelimit:login_email:a@example.com:9",
+        "ratelimit:login_email:a@example.com:10",
+    )
+    backend.client.scan_iter.assert_not_called()
+
+
+def test_client_ip_behind_trusted_proxy() -> None:
+    def request(host: str, forwarded: str | None = None) -> Request:
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return Request({"type": "http", "client": (host, 1234), "headers": headers})
+
+    with patch.object(settings, "TRUSTED_PROXIES", ["172.16.0.0/12"]):
+        # Made up by the client, the proxy appended the real address
+        assert client_ip(request("172.18.0.5", "1.2.3.4, 5.6.7.8")) == "5.6.7.8"
+        assert client_ip(request("172.18.0.5", "5.6.7.8, 172.18.0.9")) == "5.6.7.8"
+        assert client_ip(request("172.18.0.5")) == "172.18.0.5"
+        # Not a proxy, the header is ignored
+        assert client_ip(request("5.6.7.8", "1.2.3.4")) == "5.6.7.8"
+    assert client_ip(request("172.18.0.5", "1.2.3.4")) == "172.18.0.5"
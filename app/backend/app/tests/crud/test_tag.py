@@ -0,0 +1,54 @@
+from sqlmodel import Session
+
+from app import crud
+from app.models import ItemCreate, ItemUpdate
+from app.tests.utils.tag import create_random_tag
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def test_create_item_increments_tag_count(session: Session) -> None:
+    user = create_random_user(session)
+    tag = create_random_tag(session)
+    item_in = ItemCreate(title=random_lower_string(), tag_ids=[tag.id, tag.id])
+    crud.create_item(session=session, item_in=item_in, owner_id=user.id)
+    session.refresh(tag)
+    assert tag.item_count == 1
+
+
+def test_update_item_moves_tag_count(session: Session) -> None:
+    user = create_random_user(session)
+    old_tag = create_random_tag(session)
+    new_tag = create_random_tag(session)
+    item_in = ItemCreate(title=random_lower_string(), tag_ids=[old_tag.id])
+    item = crud.create_item(session=session, item_in=item_in, owner_id=user.id)
+    crud.update_item(
+        session=session, db_item=item, item_in=ItemUpdate(tag_ids=[new_tag.id])
+    )
+    session.refresh(old_tag)
+    session.refresh(new_tag)
+    assert old_tag.item_count == 0
+    assert new_tag.item_count == 1
+
+
+def test_delete_item_decrements_tag_count(session: Session) -> None:
+    user = create_random_user(session)
+    tag = create_random_tag(session)
+    item_in = ItemCreate(title=random_lower_string(), tag_ids=[tag.id])
+    item = crud.create_item(session=session, item_in=item_in, owner_id=user.id)
+    crud.delete_item(session=session, db_item=item)
+    session.refresh(tag)
+    assert tag.item_count == 0
+
+
+def test_recount_tag_item_counts(session: Session) -> None:
+    user = create_random_user(session)
+    tag = create_random_tag(session)
+    item_in = ItemCreate(title=random_lower_string(), tag_ids=[tag.id])
+    crud.create_item(session=session, item_in=item_in, owner_id=user.id)
+    tag.item_count = 42
+    session.add(tag)
+    session.commit()
+    crud.recount_tag_item_counts(session=session)
+    session.refresh(tag)
+    assert tag.item_count == 1
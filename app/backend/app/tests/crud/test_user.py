@@ -1,9 +1,12 @@
+from unittest.mock import patch
+
 from fastapi.encoders import jsonable_encoder
 from sqlmodel import Session
 
 from app import crud
-from app.core.security import verify_password
-from app.models import User, UserCreate, UserUpdate
+from app.core.security import get_dummy_password_hash, verify_password
+from app.known_emails import BloomFilter, known_emails
+from app.models import User, UserCreate, UserEmailChange, UserUpdate
 from app.tests.utils.utils import random_email, random_lower_string, random_password
 
 
@@ -33,6 +36,65 @@ def test_not_authenticate_user(db: Session) -> None:
     assert user is None
 
 
+def test_not_authenticate_unknown_email_skips_lookup(db: Session) -> None:
+    known_emails.rebuild()
+    email = random_email()
+    with (
+        patch("app.crud.get_user_by_email") as get_user_by_email,
+        patch("app.crud.verify_dummy_password") as verify_dummy_password,
+    ):
+        user = crud.authenticate(session=db, email=email, password="password")
+    assert user is None
+    get_user_by_email.assert_not_called()
+    # Same bcrypt work as a wrong password for an existing user
+    verify_dummy_password.assert_called_once_with("password")
+
+
+def test_dummy_password_hash_made_at_startup() -> None:
+    # Hashed on import, the first unknown email only verifies like the others
+    with patch("app.core.security.pwd_context.hash") as hash_password:
+        dummy_hash = get_dummy_password_hash()
+    hash_password.assert_not_called()
+    assert not verify_password("password", dummy_hash)
+
+
+def test_known_emails_added_on_create_and_update(db: Session) -> None:
+    known_emails.rebuild()
+    email = random_email()
+    assert not known_emails.might_exist(email)
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=random_password())
+    )
+    assert known_emails.might_exist(email)
+    new_email = random_email()
+    crud.update_user(session=db, db_user=user, user_in=UserUpdate(email=new_email))
+    assert known_emails.might_exist(new_email)
+    assert crud.authenticate(session=db, email=new_email, password="wrong") is None
+
+
+def test_known_emails_added_by_other_workers(db: Session) -> None:
+    known_emails.rebuild()
+    email = random_email()
+    # Logged by another worker's insert, never added to this filter
+    db.add(UserEmailChange(email=email))
+    db.commit()
+    # Misses are answered from memory until the next refresh reads the log
+    assert not known_emails.might_exist(email)
+    known_emails.refresh()
+    assert known_emails.might_exist(email)
+    assert not known_emails.might_exist(random_email())
+
+
+def test_bloom_filter() -> None:
+    bloom = BloomFilter(1000, 0.01)
+    emails = [random_email() for _ in range(1000)]
+    for email in emails:
+        bloom.add(email)
+    assert all(email in bloom for email in emails)
+    false_positives = sum(random_email() in bloom for _ in range(2000))
+    assert false_positives < 100
+
+
 def test_check_if_user_is_active(db: Session) -> None:
     email = random_email()
     password = random_password()
@@ -0,0 +1,132 @@
+import datetime
+import time
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from sqlmodel import Session, delete
+
+from app.core.config import settings
+from app.email_queue import EmailQueue
+from app.models import EmailJob
+
+
+@pytest.fixture(autouse=True)
+def clean_jobs(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> Generator[None, None, None]:
+    monkeypatch.setattr(settings, "SMTP_HOST", "smtp.example.com")
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "info@example.com")
+    db.execute(delete(EmailJob))
+    db.commit()
+    yield
+    db.execute(delete(EmailJob))
+    db.commit()
+
+
+class Response:
+    def __init__(self, success: bool) -> None:
+        self.success = success
+        self.error = None if success else "451 try again later"
+        self.status_text = None
+
+
+def test_email_queue_reuses_connection_and_retries(db: Session) -> None:
+    connections = []
+    results = [False, True, True]
+
+    def send(*, smtp: Any, **_: Any) -> Response:
+        connections.append(smtp)
+        return Response(results.pop(0))
+
+    queue = EmailQueue(max_attempts=3, retry_delay=0, send=send)
+    first = queue.enqueue(
+        email_to="a@example.com", subject="A", html_content="<p>a</p>"
+    )
+    second = queue.enqueue(
+        email_to="b@example.com", subject="B", html_content="<p>b</p>"
+    )
+
+    smtp = MagicMock()
+    while queue.process_next(smtp):
+        pass
+
+    assert len(connections) == 3
+    assert all(connection is smtp for connection in connections)
+    # The connection is only reset after the failed message
+    assert smtp.close.call_count == 1
+    for job_id, attempts in [(first, 2), (second, 1)]:
+        job = db.get(EmailJob, job_id)
+        assert job is not None
+        db.refresh(job)
+        assert job.status == "sent"
+        assert job.attempts == attempts
+        assert job.html_content == ""
+
+
+def test_email_queue_gives_up(db: Session) -> None:
+    def send(**_: Any) -> None:
+        raise ConnectionRefusedError("Connection refused")
+
+    queue = EmailQueue(max_attempts=2, retry_delay=0, send=send)
+    job_id = queue.enqueue(email_to="a@example.com", subject="A", html_content="x")
+    while queue.process_next(MagicMock()):
+        pass
+
+    job = db.get(EmailJob, job_id)
+    assert job is not None
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.last_error == "Connection refused"
+
+
+def test_email_queue_takes_over_expired_lease(db: Session) -> None:
+    queue = EmailQueue(send=lambda **_: Response(True))
+    job_id = queue.enqueue(email_to="a@example.com", subject="A", html_content="x")
+    job = queue.claim()
+    assert job is not None and job.id == job_id
+    # Leased to the first worker
+    assert queue.claim() is None
+
+    db_job = db.get(EmailJob, job_id)
+    assert db_job is not None
+    db.refresh(db_job)
+    db_job.next_attempt_at = datetime.datetime.now(
+        datetime.timezone.utc
+    ) - datetime.timedelta(seconds=1)
+    db.add(db_job)
+    db.commit()
+    stale_job = job
+    job = queue.claim()
+    assert job is not None
+    assert job.attempts == 2
+
+    # The first worker finishing late doesn't overwrite the new owner's state
+    queue.complete(stale_job, None)
+    db.refresh(db_job)
+    assert db_job.status == "sending"
+    queue.complete(job, None)
+    db.refresh(db_job)
+    assert db_job.status == "sent"
+
+
+def test_email_queue_workers() -> None:
+    sent = []
+
+    def send(*, email_to: str, **_: Any) -> Response:
+        sent.append(email_to)
+        return Response(True)
+
+    queue = EmailQueue(workers=2, smtp_factory=MagicMock, send=send)
+    queue.start()
+    try:
+        for i in range(5):
+            queue.enqueue(email_to=f"{i}@example.com", subject="S", html_content="x")
+        deadline = time.monotonic() + 3
+        while len(sent) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.shutdown()
+    assert sorted(sent) == [f"{i}@example.com" for i in range(5)]
@@ -0,0 +1,30 @@
+from jinja2 import Template
+
+from app.utils import (
+    EMAIL_TEMPLATES_DIR,
+    get_email_template_environment,
+    precompile_email_templates,
+    render_email_template,
+)
+
+
+def test_precompile_email_templates() -> None:
+    assert precompile_email_templates() == len(list(EMAIL_TEMPLATES_DIR.glob("*.html")))
+    environment = get_email_template_environment()
+    # Compiled once, then served from the environment cache
+    template = environment.get_template("reset_password.html")
+    assert environment.get_template("reset_password.html") is template
+
+
+def test_render_email_template_matches_source() -> None:
+    context = {
+        "project_name": "Project",
+        "username": "user@example.com",
+        "email": "user@example.com",
+        "valid_hours": 48,
+        "link": "http://localhost/reset-password?token=abc",
+    }
+    source = (EMAIL_TEMPLATES_DIR / "reset_password.html").read_text()
+    assert render_email_template(
+        template_name="reset_password.html", context=context
+    ) == Template(source).render(context)
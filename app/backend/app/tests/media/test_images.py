@@ -0,0 +1,148 @@
+import io
+import os
+import socket
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud, images, media
+from app.core.config import settings
+from app.images import ImageCache, ImageUnavailable, read_source_image
+from app.models import ItemUpdate
+from app.tests.utils.item import create_random_item
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def write_png(key: str, size: tuple[int, int]) -> None:
+    path = media.media_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color="red").save(path, format="PNG")
+
+
+def test_read_item_image_resized(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    write_png(f"images/{item.id}.png", (400, 200))
+    crud.update_item(
+        session=db,
+        db_item=item,
+        item_in=ItemUpdate(image_url=media.media_url(f"images/{item.id}.png")),
+    )
+
+    url = f"{settings.API_V1_STR}/media/{item.id}/image?w=100"
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    with Image.open(io.BytesIO(response.content)) as image:
+        assert image.format == "WEBP"
+        assert image.size == (100, 50)
+
+    cached = list((settings.media_root_path / "cache" / "images").rglob("*.webp"))
+    assert len(cached) == 1
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.content == cached[0].read_bytes()
+
+
+def test_read_item_image_without_image(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/media/{item.id}/image",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Item has no image"
+
+
+def test_read_item_image_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/media/{item.id}/image",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough permissions"
+
+
+def test_image_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ImageCache(tmp_path, max_bytes=250)
+    first = cache.put("aa01", "webp", b"x" * 100)
+    os.utime(first, (1, 1))
+    second = cache.put("bb02", "webp", b"x" * 100)
+    os.utime(second, (2, 2))
+    # A hit makes the first entry the most recently used
+    assert cache.get("aa01", "webp") == first
+
+    third = cache.put("cc03", "webp", b"x" * 100)
+    assert first.exists()
+    assert not second.exists()
+    assert third.exists()
+    assert cache.get("bb02", "webp") is None
+
+
+def test_read_item_image_private_address(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    crud.update_item(
+        session=db,
+        db_item=item,
+        item_in=ItemUpdate(image_url="http://169.254.169.254/latest/meta-data/"),
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/media/{item.id}/image",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Image host is not allowed"
+
+
+def test_read_source_image_checks_redirects(monkeypatch: pytest.MonkeyPatch) -> None:
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(str(request.url))
+        return httpx.Response(302, headers={"location": "http://127.0.0.1/admin"})
+
+    def getaddrinfo(
+        host: str, port: int, *args: Any, **kwargs: Any
+    ) -> list[tuple[Any, ...]]:
+        if host == "images.example.com":
+            return [
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", port))
+            ]
+        return real_getaddrinfo(host, port, *args, **kwargs)
+
+    real_getaddrinfo = socket.getaddrinfo
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(
+        images,
+        "_http_client",
+        lambda: httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    with pytest.raises(ImageUnavailable, match="not allowed"):
+        read_source_image("http://images.example.com/cat.png")
+    # The redirect target was never requested
+    assert requested == ["http://images.example.com/cat.png"]
+
+
+def test_read_source_image_allowed_hosts(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "IMAGE_REMOTE_HOSTS", ["cdn.example.com"])
+    with pytest.raises(ImageUnavailable, match="not allowed"):
+        read_source_image("https://images.example.com/cat.png")
@@ -0,0 +1,93 @@
+import os
+import uuid
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request: pytest.FixtureRequest) -> Generator[storage.Storage, None, None]:
+    if request.param == "local":
+        yield storage.LocalStorage()
+        return
+    # Runs against MinIO, see "Media Storage" in the README
+    endpoint_url = os.environ.get("S3_TEST_ENDPOINT_URL")
+    if not endpoint_url:
+        pytest.skip("S3_TEST_ENDPOINT_URL is not set")
+    pytest.importorskip("boto3")
+    s3 = storage.S3Storage(
+        bucket="test",
+        endpoint_url=endpoint_url,
+        region="us-east-1",
+        access_key_id="minioadmin",
+        secret_access_key="minioadmin",
+    )
+    try:
+        s3.client.create_bucket(Bucket="test")
+    except s3.client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    yield s3
+
+
+def test_storage_round_trip(backend: storage.Storage, tmp_path: Path) -> None:
+    key = f"videos/{uuid.uuid4()}/clip.mp4"
+    data = os.urandom(3 * storage.CHUNK_SIZE + 100)
+
+    assert not backend.exists(key)
+    size = backend.put_stream(
+        key,
+        (data[i : i + 5000] for i in range(0, len(data), 5000)),
+        content_type="video/mp4",
+    )
+    assert size == len(data)
+    stored = backend.stat(key)
+    assert stored.size == len(data)
+    assert stored.etag
+    assert b"".join(backend.get_range(key)) == data
+    assert b"".join(backend.get_range(key, 10, 2_000_000)) == data[10:2_000_000]
+
+    part = tmp_path / "upload.part"
+    part.write_bytes(b"replaced")
+    backend.put_file(key, part, content_type="video/mp4")
+    assert not part.exists()
+    assert b"".join(backend.get_range(key)) == b"replaced"
+
+    backend.delete(key)
+    assert not backend.exists(key)
+    with pytest.raises(storage.ObjectNotFound):
+        backend.stat(key)
+
+
+def test_local_presigned_upload(client: TestClient) -> None:
+    backend = storage.LocalStorage()
+    key = "videos/item/presigned.mp4"
+    url = backend.presign(key, method="PUT", content_type="video/mp4", content_length=4)
+
+    response = client.put(url, content=b"data", headers={"Content-Type": "video/webm"})
+    assert response.status_code == 400
+    response = client.put(
+        url, content=b"toolong", headers={"Content-Type": "video/mp4"}
+    )
+    assert response.status_code == 413
+    response = client.put(
+        url.replace(key, "videos/item/other.mp4"),
+        content=b"data",
+        headers={"Content-Type": "video/mp4"},
+    )
+    assert response.status_code == 403
+    assert not backend.exists(key)
+
+    response = client.put(url, content=b"data", headers={"Content-Type": "video/mp4"})
+    assert response.status_code == 204
+    assert client.get(backend.presign(key)).content == b"data"
@@ -0,0 +1,166 @@
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlmodel import Session, select
+
+from app import crud, media
+from app.core.config import settings
+from app.models import Item, ItemUpdate, ThumbnailJob
+from app.tests.utils.item import create_random_item
+from app.thumbnails import ThumbnailQueue, extract_poster_frame, thumbnail_key
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def item_with_video(db: Session) -> tuple[Item, str]:
+    item = create_random_item(db)
+    video_key = f"videos/{item.id}/clip.mp4"
+    crud.update_item(
+        session=db,
+        db_item=item,
+        item_in=ItemUpdate(video_url=media.media_url(video_key)),
+    )
+    return item, video_key
+
+
+def job_statuses(db: Session, item: Item) -> list[str]:
+    db.expire_all()
+    return list(
+        db.exec(
+            select(ThumbnailJob.status).where(ThumbnailJob.item_id == item.id)
+        ).all()
+    )
+
+
+def wait_for(db: Session, item: Item) -> None:
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        if not {"pending", "running"} & set(job_statuses(db, item)):
+            return
+        time.sleep(0.01)
+
+
+def test_thumbnail_key() -> None:
+    assert thumbnail_key("videos/abc/def.mp4") == "thumbnails/abc/def.jpg"
+
+
+def test_poster_frame_input_restricted(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    commands = []
+
+    def run(command: list[str], **_: Any) -> subprocess.CompletedProcess[bytes]:
+        commands.append(command)
+        Path(command[-1]).write_bytes(b"jpeg")
+        return subprocess.CompletedProcess(command, 0, b"", b"")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    output_path = str(tmp_path / "frame.jpg")
+    extract_poster_frame(str(tmp_path / "clip.mp4"), output_path)
+    extract_poster_frame(
+        "https://bucket.example.com/clip.mp4?X-Amz-Signature=x", output_path
+    )
+
+    local, remote = commands
+    assert local[local.index("-protocol_whitelist") + 1] == "file"
+    assert remote[remote.index("-protocol_whitelist") + 1] == "http,https,tcp,tls"
+    for command in commands:
+        demuxers = command[command.index("-format_whitelist") + 1].split(",")
+        assert "mov" in demuxers
+        assert not {"hls", "concat", "image2"} & set(demuxers)
+        # Input options only apply to the input that follows them
+        assert command.index("-format_whitelist") < command.index("-i")
+
+
+@pytest.mark.skipif(
+    shutil.which(settings.FFMPEG_PATH) is None, reason="ffmpeg is not installed"
+)
+def test_poster_frame_rejects_playlists(tmp_path: Path) -> None:
+    # A concat playlist uploaded as a video, pointing at another file
+    other = tmp_path / "other.mp4"
+    other.write_bytes(b"")
+    playlist = tmp_path / "clip.mp4"
+    playlist.write_text(f"ffconcat version 1.0\nfile '{other}'\n")
+    with pytest.raises(RuntimeError):
+        extract_poster_frame(str(playlist), str(tmp_path / "frame.jpg"))
+
+
+def test_thumbnail_queue_retries_and_updates_item(db: Session) -> None:
+    calls = []
+
+    def extract(video_path: str, output_path: str, **_: Any) -> None:
+        calls.append(video_path)
+        if len(calls) == 1:
+            raise RuntimeError("ffmpeg crashed")
+        Path(output_path).write_bytes(b"jpeg")
+
+    item, video_key = item_with_video(db)
+    queue = ThumbnailQueue(
+        executor_factory=lambda: ThreadPoolExecutor(1),
+        extract=extract,
+        retry_delay=0.01,
+        poll_interval=0.01,
+    )
+    queue.start()
+    assert queue.enqueue(item.id, video_key)
+    wait_for(db, item)
+    queue.shutdown()
+
+    assert len(calls) == 2
+    assert job_statuses(db, item) == ["done"]
+    db.refresh(item)
+    assert item.video_thumbnail_url == media.media_url(thumbnail_key(video_key))
+
+    # Existing thumbnails are reused without running the extraction again
+    queue = ThumbnailQueue(
+        executor_factory=lambda: ThreadPoolExecutor(1), extract=extract
+    )
+    queue.start()
+    assert queue.enqueue(item.id, video_key)
+    wait_for(db, item)
+    queue.shutdown()
+    assert len(calls) == 2
+    assert job_statuses(db, item) == ["done", "done"]
+
+
+def test_thumbnail_jobs_resumed_after_restart(db: Session) -> None:
+    def extract(_video_path: str, output_path: str, **_: Any) -> None:
+        Path(output_path).write_bytes(b"jpeg")
+
+    first, first_key = item_with_video(db)
+    second, second_key = item_with_video(db)
+    # A worker that stopped before starting one job, and died running the other
+    stopped = ThumbnailQueue(lease=0)
+    assert stopped.enqueue(first.id, first_key)
+    assert not stopped.enqueue(first.id, first_key)
+    assert stopped.enqueue(second.id, second_key)
+    claimed = stopped.claim()
+    assert claimed is not None
+    assert set(job_statuses(db, first) + job_statuses(db, second)) == {
+        "pending",
+        "running",
+    }
+
+    queue = ThumbnailQueue(
+        executor_factory=lambda: ThreadPoolExecutor(1), extract=extract
+    )
+    queue.start()
+    wait_for(db, first)
+    wait_for(db, second)
+    queue.shutdown()
+
+    # The dead worker's result no longer counts once the job was taken over
+    stopped.complete(claimed, "ffmpeg crashed")
+    assert job_statuses(db, first) == job_statuses(db, second) == ["done"]
+    for item, video_key in (first, first_key), (second, second_key):
+        db.refresh(item)
+        assert item.video_thumbnail_url == media.media_url(thumbnail_key(video_key))
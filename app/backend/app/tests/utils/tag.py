@@ -0,0 +1,12 @@
+from sqlmodel import Session
+
+from app import crud
+from app.models import Tag, TagCreate
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_tag(db: Session) -> Tag:
+    # Tag names are capped at 50 characters
+    name = random_lower_string()
+    tag_in = TagCreate(name=name, description=random_lower_string())
+    return crud.create_tag(session=db, tag_in=tag_in)
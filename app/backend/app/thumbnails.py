@@ -0,0 +1,357 @@
+"""
+Background poster frame extraction for uploaded videos.
+
+Jobs are stored as ThumbnailJob rows when a video upload completes, so neither
+the upload request nor the event loop ever waits on ffmpeg. A dispatcher thread
+claims due jobs and runs them in a process pool. Each job stores its frame
+under a key derived from the video key, which makes re-running it a no-op, and
+failed jobs are retried with exponential backoff. Jobs live in the database,
+so they survive restarts, and a job whose worker died is taken over once its
+lease runs out.
+"""
+
+import datetime
+import logging
+import multiprocessing
+import os
+import subprocess
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from sqlalchemy import update
+from sqlmodel import Session, col, select
+
+from app import media, storage
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def thumbnail_key(video_key: str) -> str:
+    # videos/<item_id>/<name>.mp4 -> thumbnails/<item_id>/<name>.jpg
+    video = PurePosixPath(video_key)
+    return str(PurePosixPath("thumbnails", *video.parts[1:-1], f"{video.stem}.jpg"))
+
+
+def scratch_path(key: str) -> Path:
+    # Local file ffmpeg writes to before it is handed to storage
+    return media.media_path(f"tmp/{key}")
+
+
+# Demuxers of the containers videos are uploaded in. Playlist formats such as
+# hls or concat are left out, they would make ffmpeg open the files and URLs
+# listed in an uploaded "video"
+VIDEO_DEMUXERS = "mov,matroska,avi,mpegts,mpeg,flv,ogg"
+
+
+def extract_poster_frame(
+    video_path: str, output_path: str, *, ffmpeg: str = "ffmpeg", seek: float = 1.0
+) -> None:
+    """
+    Write a JPEG poster frame of the video, runs inside the process pool.
+    """
+    tmp_path = f"{output_path}.tmp"
+    # Presigned URLs are read over HTTP, local videos only as files
+    remote = video_path.startswith(("http://", "https://"))
+    protocols = "http,https,tcp,tls" if remote else "file"
+    command = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-protocol_whitelist", protocols, "-format_whitelist", VIDEO_DEMUXERS,
+        # Seek before the input so ffmpeg jumps to the nearest keyframe
+        "-ss", str(seek), "-i", video_path,
+        "-frames:v", "1", "-vf", "scale='min(640,iw)':-2", "-f", "image2",
+        tmp_path,
+    ]  # fmt: skip
+    result = subprocess.run(command, capture_output=True, timeout=120)
+    if result.returncode != 0 or not os.path.exists(tmp_path):
+        if seek > 0:
+            # Clips shorter than the seek position have no frame there
+            extract_poster_frame(video_path, output_path, ffmpeg=ffmpeg, seek=0)
+            return
+        raise RuntimeError(result.stderr.decode(errors="replace").strip())
+    os.replace(tmp_path, output_path)
+
+
+class ThumbnailQueue:
+    def __init__(
+        self,
+        *,
+        executor_factory: Callable[[], Executor] | None = None,
+        extract: Callable[..., None] = extract_poster_frame,
+        workers: int | None = None,
+        max_attempts: int = 3,
+        retry_delay: float = 2.0,
+        poll_interval: float = 5.0,
+        lease: float = 600.0,
+    ) -> None:
+        self._executor_factory = executor_factory or self._default_executor
+        self._executor: Executor | None = None
+        self._extract = extract
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        # ffmpeg may run twice for 120s, then the frame is uploaded
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _default_executor() -> Executor:
+        # spawn avoids forking a server process that is running threads
+        return ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._executor_factory()
+        return self._executor
+
+    def enqueue(self, item_id: str, video_key: str) -> bool:
+        """
+        Queue a thumbnail for the item's video, returns False if already queued.
+        """
+        with Session(engine) as session:
+            queued = session.exec(
+                select(ThumbnailJob.id)
+                .where(ThumbnailJob.item_id == item_id)
+                .where(ThumbnailJob.video_key == video_key)
+                .where(col(ThumbnailJob.status).in_(["pending", "running"]))
+            ).first()
+            if queued is not None:
+                return False
+            session.add(ThumbnailJob(item_id=item_id, video_key=video_key))
+            session.commit()
+        self._wake.set()
+        return True
+
+    def claim(self) -> ThumbnailJob | None:
+        """
+        Take the next due job, marking it as running for the lease duration.
+        """
+        now = _now()
+        with Session(engine) as session:
+            # Plain rows, so the values compared below are the ones read here
+            # and not reloaded after another worker's claim was committed
+            candidates = session.exec(
+                select(
+                    ThumbnailJob.id, ThumbnailJob.status, ThumbnailJob.next_attempt_at
+                )
+                # "running" jobs past their lease belong to a worker that died
+                .where(col(ThumbnailJob.status).in_(["pending", "running"]))
+                .where(ThumbnailJob.next_attempt_at <= now)
+                .order_by(col(ThumbnailJob.next_attempt_at))
+                .limit(5)
+            ).all()
+            for job_id, status, next_attempt_at in candidates:
+                # Only one worker wins the compare-and-set on status and lease
+                result = session.execute(
+                    update(ThumbnailJob)
+                    .where(
+                        col(ThumbnailJob.id) == job_id,
+                        col(ThumbnailJob.status) == status,
+                        col(ThumbnailJob.next_attempt_at) == next_attempt_at,
+                    )
+                    .values(
+                        status="running",
+                        attempts=ThumbnailJob.attempts + 1,
+                        next_attempt_at=now + datetime.timedelta(seconds=self.lease),
+                    )
+                )
+                session.commit()
+                if result.rowcount == 1:  # type: ignore[attr-defined]
+                    job = session.get_one(ThumbnailJob, job_id)
+                    session.expunge(job)
+                    return job
+        return None
+
+    def _start_job(self, job: ThumbnailJob, output_key: str) -> Future[None]:
+        backend = storage.get_storage()
+        if backend.exists(output_key):
+            # Extracted by an earlier attempt, only the item is left to update
+            done: Future[None] = Future()
+            done.set_result(None)
+            return done
+        # ffmpeg reads remote videos over HTTP from a presigned URL
+        source = backend.local_path(job.video_key) or backend.presign(job.video_key)
+        output_path = scratch_path(output_key)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        return self._get_executor().submit(
+            self._extract,
+            str(source),
+            str(output_path),
+            ffmpeg=settings.FFMPEG_PATH,
+        )
+
+    def _on_done(
+        self,
+        future: Future[None],
+        job: ThumbnailJob,
+        output_key: str,
+        slots: threading.Semaphore,
+    ) -> None:
+        try:
+            if future.cancelled():
+                # Shut down before it ran, the next start takes it up again
+                self.release(job)
+                return
+            error = future.exception()
+            if error is None:
+                try:
+                    self._finish(job, output_key)
+                except Exception as e:
+                    error = e
+            self.complete(
+                job, None if error is None else str(error) or type(error).__name__
+            )
+        except Exception:
+            logger.exception(f"Thumbnail job {job.id} failed")
+        finally:
+            slots.release()
+            self._wake.set()
+
+    def _finish(self, job: ThumbnailJob, output_key: str) -> None:
+        output_path = scratch_path(output_key)
+        if output_path.exists():
+            storage.get_storage().put_file(
+                output_key, output_path, content_type="image/jpeg"
+            )
+        with Session(engine) as session:
+            item = session.get(Item, job.item_id)
+            # Skip items deleted or given another video in the meantime
+            if item and item.video_url == media.media_url(job.video_key):
+                item.video_thumbnail_url = media.media_url(output_key)
+                session.add(item)
+                session.commit()
+
+    def complete(self, job: ThumbnailJob, error: str | None) -> None:
+        values: dict[str, Any]
+        if error is None:
+            values = {"status": "done", "last_error": None}
+        elif job.attempts >= self.max_attempts:
+            logger.error(
+                f"Thumbnail for item {job.item_id} failed {job.attempts} times: {error}"
+            )
+            values = {"status": "failed", "last_error": error[:1024]}
+        else:
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            logger.warning(
+                f"Thumbnail for item {job.item_id} failed, retrying in {delay}s: {error}"
+            )
+            values = {
+                "status": "pending",
+                "last_error": error[:1024],
+                "next_attempt_at": _now() + datetime.timedelta(seconds=delay),
+            }
+        self._update(job, values)
+
+    def release(self, job: ThumbnailJob) -> None:
+        """
+        Give a claimed job back without counting the attempt.
+        """
+        self._update(
+            job,
+            {
+                "status": "pending",
+                "attempts": job.attempts - 1,
+                "next_attempt_at": _now(),
+            },
+        )
+
+    def _update(self, job: ThumbnailJob, values: dict[str, Any]) -> None:
+        with Session(engine) as session:
+            # Left alone if the lease ran out and another worker took it over
+            session.execute(
+                update(ThumbnailJob)
+                .where(
+                    col(ThumbnailJob.id) == job.id,
+                    col(ThumbnailJob.status) == "running",
+                    col(ThumbnailJob.attempts) == job.attempts,
+                )
+                .values(**values)
+            )
+            session.commit()
+
+    def _dispatch(self, slots: threading.Semaphore) -> bool:
+        """
+        Start the next due job on one of the slots, returns False if none was.
+        """
+        job = self.claim()
+        if job is None:
+            return False
+        output_key = thumbnail_key(job.video_key)
+        try:
+            future = self._start_job(job, output_key)
+        except Exception as e:
+            # The storage couldn't be reached, retried like a failed extraction
+            self.complete(job, str(e) or type(e).__name__)
+            return False
+        future.add_done_callback(lambda f: self._on_done(f, job, output_key, slots))
+        return True
+
+    def _run(self, slots: threading.Semaphore) -> None:
+        while not self._stop.is_set():
+            # Cleared before looking for work, so no enqueue is missed
+            self._wake.clear()
+            # Jobs are only claimed when the pool can start them, so their
+            # lease doesn't run out while they wait for a process
+            if not slots.acquire(timeout=self.poll_interval):
+                continue
+            started = False
+            try:
+                if not self._stop.is_set():
+                    started = self._dispatch(slots)
+            except Exception:
+                logger.exception("Thumbnail dispatcher failed")
+            if started:
+                continue
+            slots.release()
+            if not self._stop.is_set():
+                self._wake.wait(self.poll_interval)
+
+    def start(self) -> None:
+        """
+        Start taking jobs, including those left pending by the previous run.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            slots = threading.Semaphore(self.workers or settings.THUMBNAIL_WORKERS)
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(slots,),
+                name="thumbnail-dispatcher",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop taking jobs, those not started yet are left for the next start.
+        """
+        with self._lock:
+            self._stop.set()
+            self._wake.set()
+            if self._thread is not None:
+                self._thread.join(timeout)
+                self._thread = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+thumbnail_queue = ThumbnailQueue()
@@ -0,0 +1,134 @@
+"""
+Warmup run when a worker starts, so its first requests don't pay for setup.
+
+The steps open the database pool's connections, configure the SQLAlchemy
+mappers, build the response models' serializers, load the OpenAPI schema and
+read the tag lists into the database page cache and the compiled statement
+cache. They run in a background thread, the worker is live right away and
+the readiness check only passes once warmup is done.
+"""
+
+import datetime
+import logging
+import threading
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.security import get_dummy_password_hash
+from app.known_emails import known_emails
+from app.models import Item, ItemsPublic, Tag, TagsPublic
+from app.utils import precompile_email_templates
+
+logger = logging.getLogger(__name__)
+
+
+def open_pool_connections() -> int:
+    """
+    Connect up to WARMUP_DB_CONNECTIONS pool connections, returned to the pool.
+    """
+    size = settings.WARMUP_DB_CONNECTIONS
+    pool_size = getattr(engine.pool, "size", None)
+    if callable(pool_size):
+        size = min(size, pool_size())
+    # All held at once, otherwise the pool hands back the same connection
+    with ExitStack() as stack:
+        for _ in range(size):
+            connection = stack.enter_context(engine.connect())
+            connection.execute(text("SELECT 1"))
+    return size
+
+
+def build_serializers() -> None:
+    # Validating and dumping ORM objects once builds the from_attributes
+    # paths the list endpoints use
+    now = datetime.datetime.now(datetime.timezone.utc)
+    tag = Tag(id="warmup", name="warmup", created_at=now, updated_at=now)
+    item = Item(
+        id="warmup",
+        title="warmup",
+        owner_id="warmup",
+        created_at=now,
+        updated_at=now,
+        tags=[tag],
+    )
+    ItemsPublic.model_validate(
+        {"data": [item], "count": 1}, from_attributes=True
+    ).model_dump_json()
+    TagsPublic.model_validate(
+        {"data": [tag], "count": 1}, from_attributes=True
+    ).model_dump_json()
+
+
+def load_tag_catalog() -> int:
+    with Session(engine) as session:
+        crud.get_popular_tags(session=session)
+        tags = crud.get_tags(session=session)
+        session.exec(select(func.count()).select_from(Tag)).one()
+    return len(tags)
+
+
+class Warmup:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        # Seconds taken by each step, for the logs and the health endpoints
+        self.timings: dict[str, float] = {}
+        self._thread: threading.Thread | None = None
+
+    def steps(self, app: FastAPI) -> list[tuple[str, Callable[[], object]]]:
+        steps: list[tuple[str, Callable[[], object]]] = [
+            ("mappers", configure_mappers),
+            ("database", open_pool_connections),
+            ("serializers", build_serializers),
+            ("openapi", app.openapi),
+            ("tags", load_tag_catalog),
+            ("password_hash", get_dummy_password_hash),
+        ]
+        if settings.USER_EMAIL_FILTER_ENABLED:
+            steps.append(("user_email_filter", known_emails.start))
+        if settings.emails_enabled:
+            steps.append(("email_templates", precompile_email_templates))
+        return steps
+
+    def run(self, app: FastAPI) -> None:
+        try:
+            for name, step in self.steps(app):
+                start = time.perf_counter()
+                try:
+                    step()
+                except Exception:
+                    # Not fatal, the first request will do it instead
+                    logger.exception(f"Warmup step {name} failed")
+                self.timings[name] = time.perf_counter() - start
+            steps = ", ".join(
+                f"{name} {seconds:.3f}s" for name, seconds in self.timings.items()
+            )
+            logger.info(f"Warmup done in {sum(self.timings.values()):.3f}s: {steps}")
+        finally:
+            self.done.set()
+
+    def start(self, app: FastAPI) -> None:
+        if self._thread is not None:
+            return
+        self.done.clear()
+        self.timings = {}
+        self._thread = threading.Thread(
+            target=self.run, args=(app,), name="warmup", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+warmup = Warmup()
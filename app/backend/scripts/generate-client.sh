@@ -4,7 +4,7 @@ set -e
 set -x
 
 # cd app/backend
-uv run python -c "import app.main; import json; print(json.dumps(app.main.app.openapi()))" >./openapi.json
+uv run python -m app.export_openapi --output ./openapi.json
 
 mv openapi.json ../expo/
 
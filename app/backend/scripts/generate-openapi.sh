@@ -3,12 +3,16 @@
 set -e
 set -x
 
-# Generate OpenAPI YAML file
+# Generate the OpenAPI JSON artifact once and convert it to YAML
+uv run python -m app.export_openapi
+
 uv run --with pyyaml python -c "
-import app.main
+import json
 import yaml
 
-openapi_schema = app.main.app.openapi()
+with open('app/openapi.json') as f:
+    openapi_schema = json.load(f)
+
 yaml_output = yaml.dump(openapi_schema, default_flow_style=False, sort_keys=False, allow_unicode=True)
 
 with open('openapi.yaml', 'w') as f:
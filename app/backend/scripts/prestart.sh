@@ -14,6 +14,9 @@ fi
 # Run migrations
 alembic upgrade head
 
+# Precompute the OpenAPI schema so workers don't generate it on first request
+python -m app.export_openapi
+
 # Create initial data in DB
 # i.e. make sure there is at least one user in the db for login
 python app/initial_data.py